@@ -0,0 +1,155 @@
+"""
+БЕНЧМАРК: ИСХОДЯЩИЕ ЗАПРОСЫ К BOT API ЧЕРЕЗ РАЗНЫЕ СЕССИИ
+
+Поднимает локальную заглушку Bot API (aiohttp) и гоняет через нее то, что делают
+обработчики: sendMessage, editMessageText, answerCallbackQuery от двух ботов сразу.
+Сравниваются:
+- default:      у каждого бота своя AiohttpSession aiogram (как было в run_bot)
+- shared:       одна bot_session.SharedAiohttpSession на оба бота (как сейчас в main.py)
+- no-keepalive: соединение на каждый запрос (нижняя граница - цена без переиспользования)
+
+Заглушка считает новые соединения и может имитировать:
+- --latency: время ответа Bot API на запрос
+- --handshake: цену нового соединения (TCP + TLS до api.telegram.org - несколько RTT),
+  добавляется к первому запросу каждого соединения
+- --idle: паузу между волнами запросов (соединения старше keep-alive закрываются)
+Запуск: python benchmarks/bench_bot_session.py [--users 200] [--rounds 5] [--handshake 0.05] [--idle 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from bot_session import BOT_API_LATENCY, SharedAiohttpSession
+from loadtest import percentile
+
+TOKENS = ("42:MAIN", "43:DICT")
+_MESSAGE = {"message_id": 1, "date": 1700000000, "chat": {"id": 1, "type": "private"}, "text": "ok"}
+RESULTS = {"sendMessage": _MESSAGE, "editMessageText": _MESSAGE, "answerCallbackQuery": True}
+
+
+class FakeBotApi:
+    """Заглушка Bot API: отвечает успехом, считает соединения"""
+
+    def __init__(self, latency: float, handshake: float):
+        self.latency = latency
+        self.handshake = handshake
+        self.connections = 0
+        self._seen = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        transport = id(request.transport)
+        if transport not in self._seen:
+            self._seen.add(transport)
+            self.connections += 1
+            if self.handshake:
+                await asyncio.sleep(self.handshake)
+        await request.read()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"ok": True, "result": RESULTS[request.match_info["method"]]})
+
+
+async def user_flow(bot: Bot, latencies: List[float]):
+    """Ответ на сообщение, правка карточки и ответ на нажатие кнопки"""
+    for call in (
+        lambda: bot.send_message(chat_id=1, text="📖 word"),
+        lambda: bot.edit_message_text(chat_id=1, message_id=1, text="📖 next word"),
+        lambda: bot.answer_callback_query(callback_query_id="1"),
+    ):
+        started = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - started)
+
+
+async def bench(variant: str, base_url: str, server: FakeBotApi) -> Dict[str, float]:
+    if variant == "shared":
+        shared = SharedAiohttpSession(limit=args.limit, keepalive=args.keepalive, base_url=base_url)
+        sessions = [shared]
+        bots = [Bot(token=token, session=shared) for token in TOKENS]
+    else:
+        api = TelegramAPIServer.from_base(base_url)
+        sessions = [AiohttpSession(api=api) for _ in TOKENS]
+        if variant == "no-keepalive":
+            for session in sessions:
+                session._connector_init["force_close"] = True
+        bots = [Bot(token=token, session=session) for token, session in zip(TOKENS, sessions)]
+
+    server.connections, server._seen = 0, set()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    busy = 0.0
+    try:
+        for round_ in range(args.rounds):
+            if round_ and args.idle:
+                await asyncio.sleep(args.idle)
+            wave = time.perf_counter()
+            await asyncio.gather(*(user_flow(bots[i % len(bots)], latencies) for i in range(args.users)))
+            busy += time.perf_counter() - wave
+    finally:
+        for session in sessions:
+            await session.close()
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "rate": len(latencies) / busy,
+        "connections": server.connections,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+async def run():
+    server = FakeBotApi(args.latency, args.handshake)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", server.handle)
+    runner = web.AppRunner(app, keepalive_timeout=args.server_keepalive)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"users: {args.users}, rounds: {args.rounds}, latency: {args.latency * 1000:.0f} ms, "
+          f"handshake: {args.handshake * 1000:.0f} ms, idle: {args.idle:.0f} s")
+    print(f"{'variant':<14}{'calls':>8}{'p50, ms':>10}{'p99, ms':>10}{'calls/s':>10}{'connections':>13}")
+    try:
+        for variant in args.variants:
+            result = await bench(variant, base_url, server)
+            print(f"{variant:<14}{result['calls']:>8}{result['p50'] * 1000:>10.2f}{result['p99'] * 1000:>10.2f}"
+                  f"{result['rate']:>10.0f}{result['connections']:>13}", flush=True)
+    finally:
+        await runner.cleanup()
+
+    # Метрика по методам (заполняется только общей сессией)
+    print("\nbot_api_request_duration_seconds (shared), mean per method:")
+    for key, counts in BOT_API_LATENCY._counts.items():
+        method, result = key
+        print(f"  {method:<22}{result:<6}{BOT_API_LATENCY._sums[key] / sum(counts) * 1000:>8.2f} ms  x{sum(counts)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="одновременных пользователей в волне")
+    parser.add_argument("--rounds", type=int, default=5, help="волн запросов")
+    parser.add_argument("--latency", type=float, default=0.02, help="время ответа заглушки, с")
+    parser.add_argument("--handshake", type=float, default=0.05, help="цена нового соединения, с")
+    parser.add_argument("--idle", type=float, default=0.0, help="пауза между волнами, с")
+    parser.add_argument("--limit", type=int, default=100, help="соединений в общей сессии")
+    parser.add_argument("--keepalive", type=float, default=60.0, help="keep-alive общей сессии, с")
+    parser.add_argument("--server-keepalive", type=float, default=75.0, help="keep-alive заглушки, с")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--variants", type=lambda value: value.split(","), default=["default", "shared", "no-keepalive"])
+    args = parser.parse_args()
+    asyncio.run(run())
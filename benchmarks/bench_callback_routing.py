@@ -0,0 +1,129 @@
+"""
+МИКРОБЕНЧМАРК: СТОИМОСТЬ МАРШРУТИЗАЦИИ НАЖАТИЯ КНОПКИ
+
+Сравнивает:
+- before: прежняя схема - цепочка из 17 обработчиков с фильтрами F.data == ... / startswith(...)
+  и фильтром состояния, aiogram проверяет их по очереди
+- after: один обработчик DictCallback.filter() + поиск в DICT_CALLBACK_ROUTES (код из main.py)
+
+Обработчики заменены заглушками, поэтому измеряется только маршрутизация.
+Запуск: python benchmarks/bench_callback_routing.py [--iterations 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import F, Router
+from aiogram.types import CallbackQuery, User
+
+import main
+from callbacks import DictAction, dict_button_data
+
+VIEW = main.WordsViewState.viewing_words.state
+
+# Сценарии: (название, старая callback_data, новая callback_data, состояние пользователя)
+CASES = [
+    ("next_word", "next_word", dict_button_data(DictAction.NEXT_WORD), VIEW),
+    ("prev_word", "prev_word", dict_button_data(DictAction.PREV_WORD), VIEW),
+    ("next_letter", "next_letter", dict_button_data(DictAction.NEXT_LETTER), VIEW),
+    ("show_info", "show_info", dict_button_data(DictAction.SHOW_INFO), VIEW),
+    ("cancel_edit", "cancel_edit", dict_button_data(DictAction.CANCEL_EDIT),
+     main.EditState.waiting_edit_pos.state),
+    ("pos_noun", "pos_noun", dict_button_data(DictAction.POS, "noun"),
+     main.WordStates.waiting_for_pos.state),
+]
+
+# Доля нажатий в типичном трафике: навигация преобладает
+WEIGHTS = {"next_word": 0.45, "prev_word": 0.25, "next_letter": 0.1, "show_info": 0.1,
+           "cancel_edit": 0.05, "pos_noun": 0.05}
+
+
+async def noop(*args, **kwargs):
+    return None
+
+
+class FakeState:
+    """Минимальная замена FSMContext: только текущее состояние"""
+
+    def __init__(self, raw_state: str):
+        self.raw_state = raw_state
+
+    async def get_state(self):
+        return self.raw_state
+
+
+def build_before() -> Router:
+    """Копия прежней цепочки фильтров router_dict (в том же порядке)"""
+    router = Router()
+    ws, es, ps = main.WordsViewState, main.EditState, main.WordStates
+    cb = router.callback_query
+    cb(F.data == "prev_word", ws.viewing_words)(noop)
+    cb(F.data == "next_word", ws.viewing_words)(noop)
+    cb(F.data == "prev_letter", ws.viewing_words)(noop)
+    cb(F.data == "next_letter", ws.viewing_words)(noop)
+    cb(F.data == "cancel_words", ws.viewing_words)(noop)
+    cb(F.data == "delete_word", ws.viewing_words)(noop)
+    cb(F.data == "edit_word", ws.viewing_words)(noop)
+    cb(F.data.startswith("edit_word_"), es.waiting_edit_word)(noop)
+    cb(F.data == "cancel_edit", es.waiting_edit_word)(noop)
+    cb(F.data == "cancel_edit", es.waiting_edit_value)(noop)
+    cb(F.data == "cancel_edit", es.waiting_edit_pos)(noop)
+    cb(F.data == "show_info", ws.viewing_words)(noop)
+    cb(F.data == "go_back", ws.viewing_words)(noop)
+    cb(F.data.startswith("newpos_"), es.waiting_edit_pos)(noop)
+    cb(F.data == "pos_other", ps.waiting_for_pos)(noop)
+    cb(F.data == "pos_cancel", ps.waiting_for_pos)(noop)
+    cb(F.data.startswith("pos_"), ps.waiting_for_pos)(noop)
+    return router
+
+
+def build_after() -> Router:
+    """Единый обработчик из main.py, таблица с заглушками вместо реальных обработчиков"""
+    for action, (_, states, pass_data) in list(main.DICT_CALLBACK_ROUTES.items()):
+        main.DICT_CALLBACK_ROUTES[action] = (noop, states, pass_data)
+    router = Router()
+    router.callback_query(main.DictCallback.filter())(main.dict_callback_dispatcher)
+    return router
+
+
+def make_callback(data: str) -> CallbackQuery:
+    return CallbackQuery(
+        id="1",
+        from_user=User(id=1, is_bot=False, first_name="bench"),
+        chat_instance="1",
+        data=data,
+    )
+
+
+async def measure(router: Router, data: str, raw_state: str, iterations: int) -> float:
+    """Среднее время маршрутизации одного нажатия, мкс"""
+    event = make_callback(data)
+    state = FakeState(raw_state)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await router.propagate_event("callback_query", event, raw_state=raw_state, state=state)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def run(iterations: int):
+    before, after = build_before(), build_after()
+    mix_before = mix_after = 0.0
+    print(f"{'case':<14}{'before, us':>12}{'after, us':>12}{'speedup':>10}")
+    for name, old_data, new_data, raw_state in CASES:
+        t_before = await measure(before, old_data, raw_state, iterations)
+        t_after = await measure(after, new_data, raw_state, iterations)
+        mix_before += t_before * WEIGHTS[name]
+        mix_after += t_after * WEIGHTS[name]
+        print(f"{name:<14}{t_before:>12.2f}{t_after:>12.2f}{t_before / t_after:>9.2f}x")
+    print(f"{'weighted mix':<14}{mix_before:>12.2f}{mix_after:>12.2f}{mix_before / mix_after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    asyncio.run(run(parser.parse_args().iterations))
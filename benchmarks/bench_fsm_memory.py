@@ -0,0 +1,130 @@
+"""
+БЕНЧМАРК: ПАМЯТЬ СЕССИЙ БОТА-СЛОВАРЯ (MemoryStorage ПРОТИВ fsm_storage.ExpiringMemoryStorage)
+
+Создает --sessions одновременных сессий теми же вызовами FSMContext, что и обработчики:
+- list:    открыт /list (words, current_index, current_letter) - --words слов в списке
+- edit:    открыт /list и начато редактирование (+7 ключей editing_*/original_*)
+- add:     добавление слова (word, value, suggested_*)
+- quiz:    идет тест /quiz (20 вопросов)
+- cleared: сессия завершена (state.clear()) - MemoryStorage все равно хранит пустую запись
+Каждый вариант меряется в отдельном процессе: прирост RSS после создания сессий.
+Для ExpiringMemoryStorage дополнительно - после истечения ttl и фоновой очистки.
+Запуск: python benchmarks/bench_fsm_memory.py [--sessions 100000] [--words 50]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from fsm_storage import ExpiringMemoryStorage
+
+MIX = (("list", 0.4), ("edit", 0.1), ("add", 0.1), ("quiz", 0.05), ("cleared", 0.35))
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def user_words(user_id: int, count: int):
+    """Словарь пользователя в том виде, в котором его возвращает get_words_from_db"""
+    return [(f"word{user_id}_{i}", "noun", f"перевод {i}") for i in range(count)]
+
+
+async def fill_session(state: FSMContext, kind: str, user_id: int, words: int):
+    if kind in ("list", "edit"):
+        rows = user_words(user_id, words)
+        await state.update_data(words=rows, current_index=0, current_letter="W")
+        await state.set_state("WordsViewState:viewing_words")
+        if kind == "edit" and rows:
+            word, pos, value = rows[0]
+            await state.update_data(
+                editing_word=word, editing_pos=pos, editing_value=value, editing_index=0,
+                original_word=word, original_pos=pos, original_value=value
+            )
+            await state.set_state("EditState:waiting_edit_word")
+    elif kind == "add":
+        await state.update_data(word=f"word{user_id}", value=None)
+        await state.update_data(suggested_pos="noun", suggested_value=f"перевод {user_id}")
+        await state.set_state("WordStates:waiting_for_pos")
+    elif kind == "quiz":
+        quiz = [[f"word{user_id}_{i}", "noun", [f"перевод {i + j}" for j in range(4)], i % 4] for i in range(20)]
+        await state.set_state("QuizState:answering")
+        await state.update_data(quiz=quiz, quiz_index=0, quiz_score=0)
+    else:
+        await state.update_data(word=f"word{user_id}")
+        await state.clear()
+
+
+async def measure(variant: str, sessions: int, words: int) -> dict:
+    rng = random.Random(1)
+    kinds = [kind for kind, _ in MIX]
+    weights = [share for _, share in MIX]
+    if variant == "before":
+        storage = MemoryStorage()
+    else:
+        storage = ExpiringMemoryStorage(ttl=1.0, max_sessions=0, max_words=0)
+
+    gc.collect()
+    baseline = rss_bytes()
+    started = time.perf_counter()
+    for i in range(sessions):
+        user_id = 1_000_000 + i
+        state = FSMContext(storage, StorageKey(bot_id=42, chat_id=user_id, user_id=user_id))
+        await fill_session(state, rng.choices(kinds, weights)[0], user_id, words)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    result = {"rss": rss_bytes() - baseline, "seconds": elapsed}
+
+    if variant == "after":
+        # Все сессии простаивают дольше ttl - фоновая очистка их забывает
+        await asyncio.sleep(storage.ttl + 0.1)
+        storage.sweep()
+        gc.collect()
+        result["rss_swept"] = rss_bytes() - baseline
+        result["left"] = len(storage)
+    return result
+
+
+def run_variant(variant: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--variant", variant, "--sessions", str(args.sessions), "--words", str(args.words)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=50, help="слов в открытом списке /list")
+    parser.add_argument("--variant", choices=("before", "after"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(asyncio.run(measure(args.variant, args.sessions, args.words))))
+        sys.exit()
+
+    print(f"sessions: {args.sessions}, words per open list: {args.words}, mix: "
+          + ", ".join(f"{kind} {share:.0%}" for kind, share in MIX))
+    before, after = run_variant("before"), run_variant("after")
+    print(f"{'variant':<42}{'RSS, MiB':>10}{'per session, B':>16}{'fill, s':>9}")
+    for name, rss, seconds in (
+        ("MemoryStorage", before["rss"], before["seconds"]),
+        ("ExpiringMemoryStorage", after["rss"], after["seconds"]),
+        (f"ExpiringMemoryStorage after ttl ({after['left']} left)", after["rss_swept"], None),
+    ):
+        fill = f"{seconds:>9.1f}" if seconds is not None else f"{'':>9}"
+        print(f"{name:<42}{rss / 2 ** 20:>10.1f}{rss / args.sessions:>16.0f}{fill}")
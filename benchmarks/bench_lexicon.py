@@ -0,0 +1,104 @@
+"""
+БЕНЧМАРК: ОТКРЫТИЕ И ПОИСК В ОФЛАЙН-СЛОВАРЕ
+
+Собирает синтетический словарь на N слов во временный файл и сравнивает:
+- mmap: Lexicon.open + Lexicon.lookup (двоичный поиск по отображенному файлу)
+- dict: разбор того же словаря из TSV в dict при каждом запуске процесса
+Измеряются время загрузки, поиск существующего и отсутствующего слова
+и прирост частной памяти процесса.
+Запуск: python benchmarks/bench_lexicon.py [--entries 300000] [--lookups 200000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexicon import Lexicon, build_lexicon, normalize_key
+
+POS = ("noun", "verb", "adjective", "adverb")
+
+
+def synthetic_entries(count: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    seen = set()
+    while len(seen) < count:
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(3, 12)))
+        if word in seen:
+            continue
+        seen.add(word)
+        yield word, rng.choice(POS), f"перевод слова {word}, значение {rng.randint(1, 999)}"
+
+
+def rss_kib() -> int:
+    """
+    Частная (анонимная) память процесса, Linux
+    Страницы отображенного файла сюда не входят - они общие для всех процессов
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    return 0
+
+
+def timed(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(args):
+    rng = random.Random(1)
+    entries = list(synthetic_entries(args.entries, rng))
+    words = [word for word, _, _ in entries]
+    hits = [rng.choice(words) for _ in range(1024)]
+    misses = [word + "zz" for word in hits]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lexicon_path = os.path.join(tmp, "lexicon.bin")
+        tsv_path = os.path.join(tmp, "lexicon.tsv")
+        with open(lexicon_path, "wb") as f:
+            f.write(build_lexicon(entries))
+        with open(tsv_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{w}\t{p}\t{t}\n" for w, p, t in entries)
+        del entries, words
+
+        rss_before = rss_kib()
+        started = time.perf_counter()
+        lexicon = Lexicon.open(lexicon_path)
+        mmap_load = (time.perf_counter() - started) * 1000
+        mmap_hit = timed(lambda i: lexicon.lookup(hits[i & 1023]), args.lookups)
+        mmap_miss = timed(lambda i: lexicon.lookup(misses[i & 1023]), args.lookups)
+        mmap_rss = rss_kib() - rss_before
+
+        rss_before = rss_kib()
+        started = time.perf_counter()
+        table = {}
+        with open(tsv_path, encoding="utf-8") as f:
+            for line in f:
+                word, pos, translation = line.rstrip("\n").split("\t")
+                table.setdefault(normalize_key(word), (pos, translation))
+        dict_load = (time.perf_counter() - started) * 1000
+        dict_hit = timed(lambda i: table.get(normalize_key(hits[i & 1023])), args.lookups)
+        dict_miss = timed(lambda i: table.get(normalize_key(misses[i & 1023])), args.lookups)
+        dict_rss = rss_kib() - rss_before
+
+        size = os.path.getsize(lexicon_path) / 1024 / 1024
+
+    print(f"entries: {args.entries}, file: {size:.1f} MiB")
+    print(f"{'':6} {'load, ms':>10} {'hit, µs':>10} {'miss, µs':>10} {'private +MiB':>13}")
+    print(f"{'mmap':6} {mmap_load:10.2f} {mmap_hit:10.2f} {mmap_miss:10.2f} {mmap_rss / 1024:13.1f}")
+    print(f"{'dict':6} {dict_load:10.2f} {dict_hit:10.2f} {dict_miss:10.2f} {dict_rss / 1024:13.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=300_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    main(parser.parse_args())
@@ -0,0 +1,139 @@
+"""
+БЕНЧМАРК: ОБЫЧНАЯ ТАБЛИЦА words ПРОТИВ HASH-СЕКЦИЙ ПО user_id (word_schema.flat_ddl)
+
+Для каждого числа секций (0 - без секционирования) в отдельной схеме Postgres (bench_pN)
+создается таблица words и заполняется rows синтетическими строками прямо на сервере
+(generate_series), затем измеряются задержки запросов одного пользователя:
+- list:   словарь пользователя (get_words_from_db)
+- exists: проверка дубликата (check_word_exists)
+- write:  добавление и удаление слова
+Пользователи выбираются случайно по всему диапазону - при таблице больше памяти
+это честно показывает чтения с диска.
+
+Нужен доступ к Postgres (настройки POSTGRES_* как у main.py), схемы bench_p* пересоздаются.
+На 100M строк нужно ~20 ГБ диска на каждую раскладку и десятки минут на загрузку.
+Запуск: python benchmarks/bench_partitions.py --rows 10000000 --partitions 0,16,64 [--keep]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import asyncpg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import word_schema
+from loadtest import percentile
+
+QUERIES = {
+    "list": "SELECT word, part_of_speech, translation FROM words WHERE user_id = $1 ORDER BY word",
+    "exists": "SELECT 1 FROM words WHERE user_id = $1 AND word = $2 LIMIT 1",
+}
+INSERT_SQL = "INSERT INTO words (user_id, word, part_of_speech, translation) VALUES ($1, $2, 'noun', 'бенчмарк')"
+DELETE_SQL = "DELETE FROM words WHERE user_id = $1 AND word = $2"
+
+# Загрузка кусками по пользователям, чтобы не держать одну огромную транзакцию
+_FILL_SQL = """
+    INSERT INTO words (user_id, word, part_of_speech, translation, created_at)
+    SELECT u, 'word' || w, (ARRAY['noun', 'verb', 'adjective', 'adverb'])[1 + (u + w) % 4],
+           'перевод ' || w, NOW() - (w || ' minutes')::interval
+    FROM generate_series($1::bigint, $2::bigint) u, generate_series(1, $3) w
+"""
+
+
+async def connect(schema: str) -> asyncpg.Connection:
+    return await asyncpg.connect(
+        host=main.POSTGRES_HOST, port=main.POSTGRES_PORT, user=main.POSTGRES_USER,
+        password=main.POSTGRES_PASSWORD, database=main.POSTGRES_DB,
+        server_settings={"search_path": schema},
+    )
+
+
+async def fill(conn: asyncpg.Connection, users: int, per_user: int):
+    chunk = max(1, 1_000_000 // per_user)
+    for first in range(1, users + 1, chunk):
+        await conn.execute(_FILL_SQL, first, min(first + chunk - 1, users), per_user)
+
+
+async def measure(conn: asyncpg.Connection, users: int, per_user: int, queries: int, rng: random.Random):
+    statements = {name: await conn.prepare(sql) for name, sql in QUERIES.items()}
+    insert, delete = await conn.prepare(INSERT_SQL), await conn.prepare(DELETE_SQL)
+    latencies = {"list": [], "exists": [], "write": []}
+    for _ in range(queries):
+        user_id = rng.randint(1, users)
+        word = f"word{rng.randint(1, per_user)}"
+
+        started = time.perf_counter()
+        await statements["list"].fetch(user_id)
+        latencies["list"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await statements["exists"].fetchval(user_id, word)
+        latencies["exists"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        async with conn.transaction():
+            await insert.fetch(user_id, "бенчмарк")
+            await delete.fetch(user_id, "бенчмарк")
+        latencies["write"].append(time.perf_counter() - started)
+    return {name: sorted(values) for name, values in latencies.items()}
+
+
+async def bench(partitions: int, users: int, per_user: int):
+    schema = f"bench_p{partitions}"
+    conn = await connect(schema)
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+        await conn.execute(word_schema.flat_ddl(partitions))
+        started = time.perf_counter()
+        await fill(conn, users, per_user)
+        await conn.execute("VACUUM ANALYZE words")
+        load_time = time.perf_counter() - started
+
+        total = await conn.fetchval("SELECT pg_total_relation_size('words')")
+        if partitions:
+            total = await conn.fetchval(
+                "SELECT SUM(pg_total_relation_size(inhrelid)) FROM pg_inherits WHERE inhparent = 'words'::regclass"
+            )
+        # Единица работы VACUUM и REINDEX - одна секция
+        largest = total / max(partitions, 1)
+
+        latencies = await measure(conn, users, per_user, args.queries, random.Random(1))
+        return load_time, total, largest, latencies
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await conn.close()
+
+
+async def run():
+    per_user = args.words_per_user
+    users = max(1, args.rows // per_user)
+    print(f"rows: {users * per_user}, users: {users}, words per user: {per_user}, queries: {args.queries}")
+    header = f"{'partitions':>10} {'load, s':>8} {'total, GiB':>10} {'vacuum unit, MiB':>16}"
+    for name in ("list", "exists", "write"):
+        header += f" {name + ' p50/p99, ms':>22}"
+    print(header)
+    for partitions in args.partitions:
+        load_time, total, largest, latencies = await bench(partitions, users, per_user)
+        line = f"{partitions:>10} {load_time:8.0f} {total / 2 ** 30:10.2f} {largest / 2 ** 20:16.0f}"
+        for name in ("list", "exists", "write"):
+            values = latencies[name]
+            line += f" {percentile(values, 50) * 1000:>11.3f}/{percentile(values, 99) * 1000:<10.3f}"
+        print(line, flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--words-per-user", type=int, default=100)
+    parser.add_argument("--partitions", type=lambda value: [int(p) for p in value.split(",")], default=[0, 16, 64])
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--keep", action="store_true", help="не удалять схемы bench_p* после прогона")
+    args = parser.parse_args()
+    asyncio.run(run())
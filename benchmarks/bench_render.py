@@ -0,0 +1,129 @@
+"""
+БЕНЧМАРК: ВРЕМЯ CPU НА ОТРИСОВКУ КАРТОЧЕК И МЕНЮ
+
+Сравнивает:
+- before: прежний код - клавиатура InlineKeyboardMarkup и f-строка собираются на каждый вызов
+- after: render.py - готовые замороженные клавиатуры и шаблоны из mssgs.py
+
+Дополнительно измеряется show_current_word целиком (с MemoryStorage и заглушкой
+вместо Telegram), т.е. время CPU обработчика на одно обновление;
+для «before» в main подставляется прежняя сборка карточки.
+Запуск: python benchmarks/bench_render.py [--iterations 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+import main
+import render
+from callbacks import DictAction, dict_button_data
+from mssgs import WELCOME
+
+
+def legacy_word_card(word, pos, value, current_index, total):
+    """Прежняя сборка краткой карточки из show_current_word"""
+    text = (
+        f"📖 <b>Слово</b>: {word}\n"
+        f"🔢 <b>Номер слова:</b> {current_index + 1} out of {total}\n"
+        f"🔤 <b>Часть речи слова:</b> {pos}\n"
+    )
+    if value:
+        shortened_value = value[:23] + '...' if len(value) > 23 else value
+        text += f"💡 <b>Краткое значение:</b> {shortened_value}"
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="ℹ️ Инфо", callback_data=dict_button_data(DictAction.SHOW_INFO))],
+        [
+            InlineKeyboardButton(text="⬅️", callback_data=dict_button_data(DictAction.PREV_WORD)),
+            InlineKeyboardButton(text="➡️", callback_data=dict_button_data(DictAction.NEXT_WORD))
+        ],
+        [
+            InlineKeyboardButton(text="⬆️ Буква", callback_data=dict_button_data(DictAction.PREV_LETTER)),
+            InlineKeyboardButton(text="Буква ⬇️", callback_data=dict_button_data(DictAction.NEXT_LETTER))
+        ],
+        [
+            InlineKeyboardButton(text="✏️ Изменить", callback_data=dict_button_data(DictAction.EDIT_WORD)),
+            InlineKeyboardButton(text="🗑️ Удалить", callback_data=dict_button_data(DictAction.DELETE_WORD))
+        ],
+        [InlineKeyboardButton(text="❌ Отменить", callback_data=dict_button_data(DictAction.CANCEL_WORDS))]
+    ])
+    return text, keyboard, keyboard.model_dump_json(exclude_none=True)
+
+
+def legacy_greeting(name):
+    """Прежняя сборка меню основного бота из start / go_back"""
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="📚 Бот-словарь", url="https://t.me/lllang_dictbot"),
+            InlineKeyboardButton(text="🛠 Поддержка", url="https://t.me/NonGrata4Life")
+        ],
+        [InlineKeyboardButton(text="ℹ️ О боте", callback_data="about")],
+    ])
+    return f"👋 Привет, <b>{name}</b>!\n\n{WELCOME}", keyboard
+
+
+def new_word_card(word, pos, value, current_index, total):
+    text, keyboard = render.render_word_card(word, pos, value, current_index, total)
+    return text, keyboard, render.serialize_keyboard(keyboard)
+
+
+def new_greeting(name):
+    return render.render_greeting(name), render.MAIN_MENU_KEYBOARD
+
+
+def bench(func, args, iterations):
+    """Среднее время вызова, мкс"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(*args)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def bench_handler(iterations):
+    """Время show_current_word целиком (edit=True), мкс на вызов"""
+    state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=1, user_id=1))
+    words = [(f"word{i}", "noun", "перевод слова номер %d" % i) for i in range(500)]
+    await state.update_data(words=words, current_index=0, current_letter="W")
+    message = MagicMock()
+    message.chat.id, message.message_id = 1, 1
+    message.edit_text = AsyncMock()
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        # Разные индексы, чтобы кеш показанного не пропускал отрисовку
+        await state.update_data(current_index=i % len(words))
+        await main.show_current_word(message, state, edit=True)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(iterations):
+    card_args = ("embrace", "verb", "обнимать, охватывать, принимать", 41, 500)
+    rows = [
+        ("word card", bench(legacy_word_card, card_args, iterations), bench(new_word_card, card_args, iterations)),
+        ("greeting", bench(legacy_greeting, ("Anna",), iterations), bench(new_greeting, ("Anna",), iterations)),
+    ]
+    print(f"{'case':<22}{'before, us':>12}{'after, us':>12}{'speedup':>10}")
+    for name, before, after in rows:
+        print(f"{name:<22}{before:>12.2f}{after:>12.2f}{before / after:>9.2f}x")
+    after = asyncio.run(bench_handler(iterations))
+    # Прежний вариант обработчика: сборка клавиатуры и ее сериализация на каждый вызов
+    main.render_word_card = lambda *args: legacy_word_card(*args[:5])[:2]
+    main.serialize_keyboard = lambda keyboard: keyboard.model_dump_json(exclude_none=True)
+    before = asyncio.run(bench_handler(iterations))
+    print(f"{'show_current_word':<22}{before:>12.2f}{after:>12.2f}{before / after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    run(parser.parse_args().iterations)
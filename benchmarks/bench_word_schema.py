@@ -0,0 +1,119 @@
+"""
+БЕНЧМАРК: ПЛОСКАЯ СХЕМА words ПРОТИВ ОБЩИХ ЛЕКСЕМ (word_schema.py)
+
+В отдельных схемах Postgres (bench_flat, bench_lexemes) создаются обе раскладки
+и заполняются одинаковыми синтетическими словарями:
+- слова выбираются из общего словаря по закону Ципфа (частые слова есть почти у всех)
+- у доли строк перевод свой, у остальных - общий для слова
+Сравниваются размер таблиц и индексов и задержка запроса get_words_from_db
+(один и тот же SQL: в схеме lexemes он идет через представление words).
+
+Нужен доступ к Postgres (настройки POSTGRES_* как у main.py), схемы bench_* пересоздаются.
+Запуск: python benchmarks/bench_word_schema.py [--users 20000] [--words-per-user 50] [--vocabulary 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import asyncpg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import word_schema
+from loadtest import percentile
+
+POS = ("noun", "verb", "adjective", "adverb")
+SELECT_WORDS = "SELECT word, part_of_speech, translation FROM words WHERE user_id = $1 ORDER BY word"
+
+
+def generate(users: int, per_user: int, vocabulary: int, own_share: float, rng: random.Random):
+    words = [f"word{i:06d}" for i in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    records = []
+    for user_id in range(1, users + 1):
+        chosen = set(rng.choices(words, weights, k=per_user))
+        for word in chosen:
+            translation = f"перевод {word}"
+            if rng.random() < own_share:
+                translation = f"мой перевод {word} {user_id}"
+            records.append((user_id, word, POS[hash(word) % len(POS)], translation))
+    return records
+
+
+async def connect(schema: str) -> asyncpg.Connection:
+    return await asyncpg.connect(
+        host=main.POSTGRES_HOST, port=main.POSTGRES_PORT, user=main.POSTGRES_USER,
+        password=main.POSTGRES_PASSWORD, database=main.POSTGRES_DB,
+        server_settings={"search_path": schema},
+    )
+
+
+async def sizes(conn: asyncpg.Connection, tables):
+    total = {"table": 0, "indexes": 0}
+    for table in tables:
+        total["table"] += await conn.fetchval("SELECT pg_table_size($1::regclass)", table)
+        total["indexes"] += await conn.fetchval("SELECT pg_indexes_size($1::regclass)", table)
+    return total
+
+
+async def bench_layout(layout: str, records, users: int, queries: int, rng: random.Random):
+    schema = f"bench_{layout}"
+    conn = await connect(schema)
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+        await word_schema.ensure_schema(conn, layout)
+        started = time.perf_counter()
+        await word_schema.import_words(conn, layout, records)
+        load_time = time.perf_counter() - started
+        await conn.execute("VACUUM ANALYZE")
+
+        tables = ["words"] if layout == "flat" else ["user_words", "lexemes", "pos_codes"]
+        size = await sizes(conn, tables)
+
+        latencies = []
+        statement = await conn.prepare(SELECT_WORDS)
+        for _ in range(queries):
+            user_id = rng.randint(1, users)
+            started = time.perf_counter()
+            await statement.fetch(user_id)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        return {
+            "load_s": load_time,
+            "table_mib": size["table"] / 2 ** 20,
+            "index_mib": size["indexes"] / 2 ** 20,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await conn.close()
+
+
+async def run():
+    rng = random.Random(1)
+    records = generate(args.users, args.words_per_user, args.vocabulary, args.own_translations, rng)
+    print(f"rows: {len(records)}, users: {args.users}, vocabulary: {args.vocabulary}")
+    print(f"{'layout':8} {'load, s':>8} {'table, MiB':>11} {'index, MiB':>11} {'p50, ms':>8} {'p99, ms':>8}")
+    for layout in word_schema.LAYOUTS:
+        result = await bench_layout(layout, records, args.users, args.queries, random.Random(2))
+        print(f"{layout:8} {result['load_s']:8.1f} {result['table_mib']:11.1f} {result['index_mib']:11.1f} "
+              f"{result['p50_ms']:8.3f} {result['p99_ms']:8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--words-per-user", type=int, default=50)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--own-translations", type=float, default=0.1, help="доля строк со своим переводом")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--keep", action="store_true", help="не удалять схемы bench_* после прогона")
+    args = parser.parse_args()
+    asyncio.run(run())
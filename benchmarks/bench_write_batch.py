@@ -0,0 +1,130 @@
+"""
+БЕНЧМАРК: ЗАПИСЬ ИЗМЕНЕНИЙ СЛОВАРЯ ПО ОДНОЙ ТРАНЗАКЦИИ ПРОТИВ ПАЧЕК (write_batcher)
+
+Имитирует занятие: --writers учеников одновременно меняют словари теми же функциями,
+что и обработчики (main.add_word_to_db / update_word_in_db / delete_word_from_db).
+Каждый ученик --cycles раз добавляет слово, правит его перевод и удаляет предыдущее слово.
+Сравниваются:
+- direct:  каждое изменение - своя транзакция на своем соединении (WRITE_BATCHING=0)
+- batched: изменения идут через WriteBatcher (WRITE_BATCHING=1, параметры --batch/--delay/--workers)
+После каждого варианта проверяется итог: у каждого ученика ровно одно слово с последним переводом,
+счетчики статистики совпадают со словами.
+
+Нужен доступ к Postgres (настройки POSTGRES_* как у main.py); слова учеников удаляются после прогона.
+Запуск: python benchmarks/bench_write_batch.py [--writers 300] [--cycles 10] [--batch 100] [--delay 0.005]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import word_schema
+import word_stats
+from loadtest import percentile
+from write_batcher import WRITE_BATCH_SIZE, WriteBatcher
+
+# Ученики получают id начиная с этого значения (их слова удаляются после прогона)
+USER_ID_BASE = 9_100_000_000
+
+
+async def cleanup():
+    table = word_schema.USER_ROWS_TABLE[main.WORDS_SCHEMA]
+    async with main.db_pool.acquire() as conn:
+        for name in (table, "word_changes", "word_stats", "word_stats_weekly"):
+            await conn.execute(f"DELETE FROM {name} WHERE user_id >= $1", USER_ID_BASE)
+
+
+async def writer(user_id: int, latencies: List[float]):
+    for cycle in range(args.cycles):
+        word = f"wb{cycle:04d}"
+        calls = [
+            lambda: main.add_word_to_db(user_id, word, "noun", "перевод"),
+            lambda: main.update_word_in_db(user_id, word, word, "noun", f"перевод {cycle}"),
+        ]
+        if cycle:
+            calls.append(lambda: main.delete_word_from_db(user_id, f"wb{cycle - 1:04d}"))
+        for call in calls:
+            started = time.perf_counter()
+            if not await call():
+                raise RuntimeError(f"write failed for user {user_id}")
+            latencies.append(time.perf_counter() - started)
+
+
+async def check(user_ids: List[int]):
+    """Итог: одно последнее слово у каждого ученика и верные счетчики"""
+    last = f"wb{args.cycles - 1:04d}"
+    async with main.db_pool.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT user_id, word, translation FROM words WHERE user_id = ANY($1::bigint[])", user_ids
+        )
+        stats = [await word_stats.get_stats(conn, user_id) for user_id in user_ids]
+    wrong = [row for row in rows if (row["word"], row["translation"]) != (last, f"перевод {args.cycles - 1}")]
+    if len(rows) != len(user_ids) or wrong:
+        raise AssertionError(f"unexpected words after run: {len(rows)} rows, {len(wrong)} wrong")
+    if any(item.total != 1 for item in stats):
+        raise AssertionError("word statistics do not match the words")
+
+
+async def bench(variant: str) -> Dict[str, float]:
+    await cleanup()
+    if variant == "batched":
+        main.write_batcher = WriteBatcher(main.db_pool, args.batch, args.delay, args.workers)
+        main.write_batcher.start()
+    batches_before = sum(sum(counts) for counts in WRITE_BATCH_SIZE._counts.values())
+    user_ids = [USER_ID_BASE + i for i in range(args.writers)]
+    latencies: List[float] = []
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(writer(user_id, latencies) for user_id in user_ids))
+        elapsed = time.perf_counter() - started
+    finally:
+        if main.write_batcher:
+            await main.write_batcher.stop()
+            main.write_batcher = None
+    await check(user_ids)
+    batches = sum(sum(counts) for counts in WRITE_BATCH_SIZE._counts.values()) - batches_before
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "rate": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "transactions": batches if variant == "batched" else len(latencies),
+    }
+
+
+async def run():
+    await main.init_db()
+    # Вариант direct - без очереди, даже если WRITE_BATCHING=1 в окружении
+    if main.write_batcher:
+        await main.write_batcher.stop()
+        main.write_batcher = None
+    print(f"writers: {args.writers}, cycles: {args.cycles}, schema: {main.WORDS_SCHEMA}, "
+          f"batch: {args.batch}, delay: {args.delay * 1000:.1f} ms, workers: {args.workers}")
+    print(f"{'variant':<10}{'ops':>8}{'ops/s':>10}{'p50, ms':>10}{'p99, ms':>10}{'transactions':>14}")
+    try:
+        for variant in args.variants:
+            result = await bench(variant)
+            print(f"{variant:<10}{result['ops']:>8}{result['rate']:>10.0f}{result['p50'] * 1000:>10.2f}"
+                  f"{result['p99'] * 1000:>10.2f}{result['transactions']:>14}", flush=True)
+    finally:
+        await cleanup()
+        await main.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=300, help="одновременных учеников")
+    parser.add_argument("--cycles", type=int, default=10, help="циклов добавить-править-удалить на ученика")
+    parser.add_argument("--batch", type=int, default=main.WRITE_BATCH_MAX, help="изменений в пачке")
+    parser.add_argument("--delay", type=float, default=main.WRITE_BATCH_DELAY, help="ожидание пополнения пачки, с")
+    parser.add_argument("--workers", type=int, default=main.WRITE_BATCH_WORKERS, help="одновременных пачек")
+    parser.add_argument("--variants", type=lambda value: value.split(","), default=["direct", "batched"])
+    args = parser.parse_args()
+    asyncio.run(run())
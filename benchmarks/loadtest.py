@@ -0,0 +1,336 @@
+"""
+НАГРУЗОЧНЫЙ СТЕНД ДЛЯ ОБОИХ БОТОВ
+
+Подает синтетические обновления (Message / CallbackQuery) в Dispatcher'ы,
+собранные из router_main и router_dict, без обращения к Telegram:
+- исходящие запросы к Bot API перехватывает RecordingSession (записывает метод и отвечает заглушкой)
+- база данных - настоящий локальный Postgres (настройки POSTGRES_* как у main.py),
+  словари виртуальных пользователей заполняются заранее заданными размерами
+
+Сценарии (flows): start, list, navigate, add_word, edit, delete.
+Отчет - JSON: обновлений в секунду, p50/p99/среднее по каждому сценарию и счетчики вызовов Bot API.
+
+Запуск:
+    python benchmarks/loadtest.py --users 200 --duration 60 --dict-sizes 10,100,1000 --output report.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message, User
+
+import main
+import word_schema
+import word_stats
+from fsm_storage import ExpiringMemoryStorage
+from callbacks import DictAction, dict_button_data
+
+# Виртуальные пользователи получают id начиная с этого значения (их слова удаляются после прогона)
+USER_ID_BASE = 9_000_000_000
+BOT_TOKEN = "4242:LOADTEST"
+BOT_ID = 4242
+
+# Доли сценариев в смешанной нагрузке
+DEFAULT_MIX = {"start": 0.05, "list": 0.15, "navigate": 0.45, "add_word": 0.15, "edit": 0.1, "delete": 0.1}
+
+
+class RecordingSession(BaseSession):
+    """
+    Сессия Bot API без сети: записывает вызовы и возвращает правдоподобные ответы
+    Отправленные сообщения получают возрастающие message_id
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.calls: Counter = Counter()
+        # Последнее отправленное ботом сообщение в каждом чате
+        self.last_message_id: Dict[int, int] = {}
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        """Обработчики не скачивают файлы - пустое содержимое"""
+        return
+        yield
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        name = method.__api_method__
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if name in ("sendMessage", "editMessageText"):
+            chat_id = getattr(method, "chat_id", None) or 0
+            if name == "sendMessage":
+                message_id = self.last_message_id[chat_id] = next(self._message_ids)
+            else:
+                message_id = method.message_id
+            return Message(
+                message_id=message_id,
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=chat_id, type="private"),
+                from_user=User(id=BOT_ID, is_bot=True, first_name="bot"),
+                text=getattr(method, "text", None),
+            )
+        return True
+
+
+class VirtualUser:
+    """Состояние одного виртуального пользователя"""
+
+    def __init__(self, user_id: int, dict_size: int):
+        self.user_id = user_id
+        self.dict_size = dict_size
+        self.bot_message_id = 1
+        self.added = 0
+
+
+async def delete_users(conn, condition: str, value: Any):
+    """
+    Удаляет все данные пользователей, отобранных условием по user_id (например "user_id >= $1", $1 - value):
+    слова, журнал изменений, счетчики статистики, а в схеме lexemes - и лексемы, которые были только у них
+    """
+    if main.WORDS_SCHEMA == "lexemes":
+        await conn.execute(f"""
+            WITH gone AS (DELETE FROM user_words WHERE {condition} RETURNING user_id, lexeme_id)
+            DELETE FROM lexemes l
+            WHERE l.id IN (SELECT lexeme_id FROM gone)
+              AND NOT EXISTS (
+                  SELECT 1 FROM user_words u
+                  WHERE u.lexeme_id = l.id AND u.user_id NOT IN (SELECT user_id FROM gone)
+              )
+        """, value)
+    else:
+        await conn.execute(f"DELETE FROM words WHERE {condition}", value)
+    for table in ("word_changes", "word_stats", "word_stats_weekly"):
+        await conn.execute(f"DELETE FROM {table} WHERE {condition}", value)
+
+
+class LoadHarness:
+    """
+    Стенд: диспетчеры, фиктивный бот, заполнение БД и генерация обновлений
+    Используется и этим скриптом, и soak-тестом
+    """
+
+    def __init__(self, users: int, dict_sizes: List[int], api_latency: float = 0.0, seed: int = 1):
+        self.session = RecordingSession(latency=api_latency)
+        self.bot = Bot(token=BOT_TOKEN, session=self.session)
+        # Хранилище как у бота (без фоновой очистки: истекшие сессии убираются при обращении)
+        self.storage = ExpiringMemoryStorage(
+            ttl=main.FSM_SESSION_TTL, max_sessions=main.FSM_MAX_SESSIONS, max_words=main.FSM_MAX_WORDS
+        )
+        self.dp_main = Dispatcher()
+        self.dp_main.include_router(main.router_main)
+        self.dp_dict = Dispatcher(storage=self.storage)
+        self.dp_dict.include_router(main.router_dict)
+        self.users = [
+            VirtualUser(USER_ID_BASE + i, dict_sizes[i % len(dict_sizes)]) for i in range(users)
+        ]
+        self.random = random.Random(seed)
+        self._update_ids = itertools.count(1)
+        # Результаты: сценарий -> список задержек (с), ошибки по сценариям
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    # = ПОДГОТОВКА БАЗЫ =
+
+    async def setup(self):
+        await main.init_db()
+        await self.cleanup()
+        records = []
+        for user in self.users:
+            for i in range(user.dict_size):
+                records.append((user.user_id, f"lt{i:06d}", "noun", f"перевод {i}"))
+        async with main.db_pool.acquire() as conn:
+            await word_schema.import_words(conn, main.WORDS_SCHEMA, records)
+            # Массовая загрузка идет мимо счетчиков статистики - пересчитываем
+            async with conn.transaction():
+                await word_stats.rebuild(conn, [user.user_id for user in self.users])
+
+    async def cleanup(self):
+        async with main.db_pool.acquire() as conn:
+            await delete_users(conn, "user_id >= $1", USER_ID_BASE)
+
+    async def teardown(self):
+        await self.cleanup()
+        await main.close_db()
+
+    # = ГЕНЕРАЦИЯ ОБНОВЛЕНИЙ =
+
+    def _user(self, user: VirtualUser) -> Dict[str, Any]:
+        return {"id": user.user_id, "is_bot": False, "first_name": "Load"}
+
+    def _chat(self, user: VirtualUser) -> Dict[str, Any]:
+        return {"id": user.user_id, "type": "private"}
+
+    def message_update(self, user: VirtualUser, text: str) -> Dict[str, Any]:
+        update_id = next(self._update_ids)
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": self._chat(user),
+                "from": self._user(user),
+                "text": text,
+            },
+        }
+
+    def callback_update(self, user: VirtualUser, data: str) -> Dict[str, Any]:
+        update_id = next(self._update_ids)
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(user),
+                "chat_instance": "loadtest",
+                "data": data,
+                "message": {
+                    "message_id": user.bot_message_id,
+                    "date": int(time.time()),
+                    "chat": self._chat(user),
+                    "from": {"id": BOT_ID, "is_bot": True, "first_name": "bot"},
+                    "text": "card",
+                },
+            },
+        }
+
+    async def feed(self, flow: str, dp: Dispatcher, update: Dict[str, Any]):
+        """Подает одно обновление и записывает его задержку в сценарий flow"""
+        start = time.perf_counter()
+        try:
+            await dp.feed_raw_update(self.bot, update)
+        except Exception:
+            self.errors[flow] += 1
+            logging.exception("Update failed in flow %s", flow)
+        self.latencies[flow].append(time.perf_counter() - start)
+
+    # = СЦЕНАРИИ =
+
+    async def flow_start(self, user: VirtualUser):
+        await self.feed("start", self.dp_main, self.message_update(user, "/start"))
+
+    async def flow_list(self, user: VirtualUser):
+        await self.feed("list", self.dp_dict, self.message_update(user, "/list"))
+        # Сообщение со словарем - последнее отправленное ботом
+        user.bot_message_id = self.session.last_message_id.get(user.user_id, user.bot_message_id)
+
+    async def flow_navigate(self, user: VirtualUser, taps: int = 5):
+        await self.flow_list(user)
+        for _ in range(taps):
+            action = self.random.choice((DictAction.NEXT_WORD, DictAction.NEXT_WORD, DictAction.PREV_WORD,
+                                         DictAction.NEXT_LETTER, DictAction.SHOW_INFO, DictAction.GO_BACK))
+            await self.feed("navigate", self.dp_dict, self.callback_update(user, dict_button_data(action)))
+
+    async def flow_add_word(self, user: VirtualUser):
+        user.added += 1
+        text = f"ltadd{user.added:06d}: новое слово"
+        await self.feed("add_word", self.dp_dict, self.message_update(user, text))
+        await self.feed("add_word", self.dp_dict, self.callback_update(user, dict_button_data(DictAction.POS, "noun")))
+
+    async def flow_edit(self, user: VirtualUser):
+        await self.flow_list(user)
+        await self.feed("edit", self.dp_dict, self.callback_update(user, dict_button_data(DictAction.EDIT_WORD)))
+        await self.feed("edit", self.dp_dict,
+                        self.callback_update(user, dict_button_data(DictAction.EDIT_FIELD, "value")))
+        await self.feed("edit", self.dp_dict, self.message_update(user, f"значение {self.random.random():.6f}"))
+
+    async def flow_delete(self, user: VirtualUser):
+        await self.flow_list(user)
+        await self.feed("delete", self.dp_dict, self.callback_update(user, dict_button_data(DictAction.DELETE_WORD)))
+        await self.feed("delete", self.dp_dict, self.callback_update(user, dict_button_data(DictAction.CANCEL_WORDS)))
+
+    async def run_user(self, user: VirtualUser, deadline: float, mix: Dict[str, float]):
+        """Выполняет случайные сценарии для одного пользователя до deadline"""
+        flows, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            flow = self.random.choices(flows, weights)[0]
+            await getattr(self, f"flow_{flow}")(user)
+
+    async def run(self, duration: float, mix: Optional[Dict[str, float]] = None) -> float:
+        """Запускает всех пользователей параллельно, возвращает фактическую длительность"""
+        mix = mix or DEFAULT_MIX
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(self.run_user(user, deadline, mix) for user in self.users))
+        return time.monotonic() - started
+
+    # = ОТЧЕТ =
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        flows = {}
+        total = 0
+        for flow, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            total += len(values)
+            flows[flow] = {
+                "updates": len(values),
+                "errors": self.errors[flow],
+                "updates_per_sec": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+            }
+        return {
+            "elapsed_sec": round(elapsed, 3),
+            "users": len(self.users),
+            "updates": total,
+            "updates_per_sec": round(total / elapsed, 2),
+            "errors": sum(self.errors.values()),
+            "flows": flows,
+            "bot_api_calls": dict(self.session.calls),
+        }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Перцентиль отсортированного списка (ближайший ранг)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run(args):
+    harness = LoadHarness(args.users, [int(x) for x in args.dict_sizes.split(",")], args.api_latency, args.seed)
+    await harness.setup()
+    try:
+        elapsed = await harness.run(args.duration)
+    finally:
+        await harness.teardown()
+
+    report = harness.report(elapsed)
+    report["config"] = vars(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность, секунд")
+    parser.add_argument("--dict-sizes", default="10,100,1000", help="размеры словарей через запятую")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка фиктивного Bot API, секунд")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл для JSON-отчета")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,428 @@
+"""
+SOAK-ТЕСТ: МНОГОЧАСОВОЙ ПРОГОН ОБОИХ БОТОВ И HTTP API С ПОИСКОМ УТЕЧЕК
+
+Часами гоняет синтетическую нагрузку по тому же стенду, что и loadtest.py (LoadHarness:
+router_main и router_dict без Telegram, настоящий локальный Postgres), и одновременно -
+HTTP-клиентов WebApp по приложению main.create_http_app() (/api/words, /api/words/changes,
+/api/words/suggest, /api/stats) и открытые WebApp: потоки /api/words/stream, которые держатся
+--stream-hold секунд и переоткрываются для другого пользователя.
+Пользователи сменяются: каждый раунд (--round секунд) --churn часть пользователей уходит,
+вместо них приходят новые - так копятся сессии и кеши, если их никто не забывает.
+
+Каждые --sample-interval секунд записывается:
+- RSS процесса и объем памяти под наблюдением tracemalloc
+- число живых задач asyncio, открытых потоков WebApp
+- сессии и слова в хранилище состояний бота-словаря (fsm_storage)
+- размер и простой пула соединений, размеры кешей main.py (автодополнение, снимки, отрисовка)
+- обновлений и HTTP-запросов в секунду, p99 обновлений за интервал
+
+Пределы кешей main.py уменьшаются (--cache-users, --cache-renders), чтобы за прогрев кеши
+заполнились до предела. Прогрев (--warmup) по умолчанию - больше из времени жизни сессии
+с периодом очистки, времени, за которое сменой пользователей набирается --cache-users человек,
+и 10 минут (за столько RSS под нагрузкой выходит на плато: распределитель памяти набирает арены).
+После прогрева для каждой величины считается наклон прямой по замерам (рост в час).
+Главные места роста выделений - сравнение снимка tracemalloc в конце прогрева со снимком после
+прогона (--snapshot-interval - еще и по ходу). Снимок сам поднимает RSS до нового максимума,
+поэтому тренды считаются по замерам после первого снимка.
+Тест завершается с кодом 1, если рост больше допустимого или были ошибки.
+
+Нужен доступ к Postgres (настройки POSTGRES_* как у main.py); слова виртуальных пользователей
+удаляются после прогона. Для быстрой проверки самого теста:
+    FSM_SESSION_TTL=30 FSM_SWEEP_INTERVAL=5 python benchmarks/soak.py --duration 1200 --users 50 \
+        --sample-interval 15 --round 10 --cache-users 100 --cache-renders 2000
+Запуск:
+    python benchmarks/soak.py --duration 10800 --users 100 --output soak.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import math
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import word_schema
+import word_stats
+from bench_fsm_memory import rss_bytes
+from live_updates import LIVE_STREAMS
+from loadtest import USER_ID_BASE, LoadHarness, VirtualUser, delete_users, percentile
+
+MIB = 2 ** 20
+# Собственные выделения tracemalloc и импорта не показываем среди мест роста
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+# Время выхода RSS на плато под нагрузкой, с
+RSS_SETTLE = 600
+# Величина замера -> (параметр с допустимым ростом в час, единица)
+TRENDS = {
+    "rss_mib": ("max_rss_growth", "MiB/h"),
+    "traced_mib": ("max_traced_growth", "MiB/h"),
+    "tasks": ("max_task_growth", "tasks/h"),
+    "fsm_sessions": ("max_session_growth", "sessions/h"),
+}
+
+
+def slope_per_hour(points: List[tuple]) -> float:
+    """Наклон прямой наименьших квадратов по точкам (секунды, значение), в единицах в час"""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread * 3600
+
+
+class Soak:
+    """Стенд soak-теста: нагрузка, HTTP-клиенты, замеры и проверка трендов"""
+
+    def __init__(self, args):
+        self.args = args
+        self.dict_sizes = [int(x) for x in args.dict_sizes.split(",")]
+        self.harness = LoadHarness(args.users, self.dict_sizes, args.api_latency, args.seed)
+        self.next_user_id = USER_ID_BASE + args.users
+        self.warmup = args.warmup if args.warmup is not None else self.default_warmup(args)
+        self.runner: Optional[web.AppRunner] = None
+        self.stop = asyncio.Event()
+        self.started = 0.0
+        self.samples: List[Dict[str, Any]] = []
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_at = 0.0
+        # Тренды считаются по замерам позже этого момента (конец прогрева или первый снимок)
+        self.trend_after: Optional[float] = None
+        self.top_growth: List[Dict[str, Any]] = []
+        # HTTP: запросы по адресу и ошибки
+        self.http_requests: Dict[str, int] = defaultdict(int)
+        self.http_errors: Dict[str, int] = defaultdict(int)
+        self._http_total = 0
+        self.stream_events = 0
+        self.updates_total = 0
+        self.errors_total = 0
+        # Пользователи с открытым WebApp (поток держит один клиент)
+        self.streaming: set = set()
+
+    @staticmethod
+    def default_warmup(args) -> float:
+        """Время, за которое истекают первые сессии, кеши заполняются сменой пользователей и RSS выходит на плато"""
+        per_round = int(args.users * args.churn)
+        rounds = math.ceil(max(0, args.cache_users - args.users) / per_round) if per_round else 0
+        return max(main.FSM_SESSION_TTL + main.FSM_SWEEP_INTERVAL, (rounds + 1) * args.round, RSS_SETTLE)
+
+    # = ПОДГОТОВКА И ЗАВЕРШЕНИЕ =
+
+    async def setup(self):
+        await self.harness.setup()
+        # Кеши с пределом должны заполниться за прогрев: дальнейший рост - утечка, а не заполнение
+        main.suggest_cache.max_users = self.args.cache_users
+        main.word_snapshots.max_users = self.args.cache_users
+        main.RENDERED_CACHE_SIZE = self.args.cache_renders
+        # Фоновая очистка сессий - как у работающего бота
+        self.harness.storage.start()
+        self.runner = web.AppRunner(await main.create_http_app())
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", self.args.port).start()
+
+    async def teardown(self):
+        if self.runner:
+            await self.runner.cleanup()
+        await self.harness.storage.close()
+        await self.harness.teardown()
+
+    # = СМЕНА ПОЛЬЗОВАТЕЛЕЙ =
+
+    async def rotate_users(self):
+        """Заменяет --churn часть пользователей новыми (со своими словарями)"""
+        count = int(len(self.harness.users) * self.args.churn)
+        if not count:
+            return
+        retired, kept = self.harness.users[:count], self.harness.users[count:]
+        fresh = []
+        for _ in range(count):
+            size = self.dict_sizes[self.next_user_id % len(self.dict_sizes)]
+            fresh.append(VirtualUser(self.next_user_id, size))
+            self.next_user_id += 1
+        records = [
+            (user.user_id, f"lt{i:06d}", "noun", f"перевод {i}") for user in fresh for i in range(user.dict_size)
+        ]
+        retired_ids = [user.user_id for user in retired]
+        async with main.db_pool.acquire() as conn:
+            await word_schema.import_words(conn, main.WORDS_SCHEMA, records)
+            async with conn.transaction():
+                await word_stats.rebuild(conn, [user.user_id for user in fresh])
+            await delete_users(conn, "user_id = ANY($1::bigint[])", retired_ids)
+        # Состояние самого стенда об ушедших пользователях
+        for user_id in retired_ids:
+            self.harness.session.last_message_id.pop(user_id, None)
+        self.harness.users = kept + fresh
+
+    async def drive(self):
+        """Нагрузка на ботов раундами со сменой пользователей"""
+        deadline = self.started + self.args.duration
+        while time.monotonic() < deadline:
+            await self.harness.run(min(self.args.round, deadline - time.monotonic()))
+            await self.rotate_users()
+
+    # = HTTP-КЛИЕНТЫ WEBAPP =
+
+    async def http_client(self, http: aiohttp.ClientSession, number: int):
+        base = f"http://127.0.0.1:{self.args.port}"
+        random = self.harness.random
+        while not self.stop.is_set():
+            user = random.choice(self.harness.users)
+            path = random.choice(("/api/words", "/api/words/changes", "/api/words/suggest", "/api/stats"))
+            query = f"user_id={user.user_id}"
+            if path == "/api/words/suggest":
+                query += "&q=lt0"
+            elif path == "/api/words/changes":
+                query += f"&since={random.choice((0, 1))}"
+            try:
+                async with http.get(f"{base}{path}?{query}") as response:
+                    await response.read()
+                    if response.status != 200:
+                        self.http_errors[path] += 1
+                        logging.warning("HTTP client %s: %s returned %s", number, path, response.status)
+            except Exception as e:
+                self.http_errors[path] += 1
+                logging.warning("HTTP client %s: %s failed: %r", number, path, e)
+            self.http_requests[path] += 1
+            await asyncio.sleep(self.args.http_pause)
+
+    async def _read_stream(self, response: aiohttp.ClientResponse):
+        async for line in response.content:
+            if line.startswith(b"data:"):
+                self.stream_events += 1
+
+    async def stream_client(self, http: aiohttp.ClientSession, number: int):
+        """Открытый WebApp: поток живых обновлений держится --stream-hold секунд, затем - другой пользователь"""
+        path = "/api/words/stream"
+        random = self.harness.random
+        while not self.stop.is_set():
+            idle = [user for user in self.harness.users if user.user_id not in self.streaming]
+            user = random.choice(idle or self.harness.users)
+            self.streaming.add(user.user_id)
+            try:
+                async with http.get(f"http://127.0.0.1:{self.args.port}{path}?user_id={user.user_id}",
+                                    timeout=aiohttp.ClientTimeout(total=None)) as response:
+                    if response.status != 200:
+                        self.http_errors[path] += 1
+                        logging.warning("Stream client %s: %s returned %s", number, path, response.status)
+                    else:
+                        # Закрытие по сроку - обычное завершение, как у закрытого WebApp
+                        try:
+                            await asyncio.wait_for(self._read_stream(response), self.args.stream_hold)
+                        except asyncio.TimeoutError:
+                            pass
+            except Exception as e:
+                self.http_errors[path] += 1
+                logging.warning("Stream client %s: %s failed: %r", number, path, e)
+            finally:
+                self.streaming.discard(user.user_id)
+            self.http_requests[path] += 1
+
+    # = ЗАМЕРЫ =
+
+    def _allocation_growth(self):
+        """Снимок tracemalloc и сравнение с первым снимком после прогрева"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+        if self.baseline is None:
+            self.baseline = snapshot
+            return
+        self.top_growth = [
+            {"where": str(stat.traceback), "size_diff_kib": round(stat.size_diff / 1024, 1),
+             "count_diff": stat.count_diff}
+            for stat in snapshot.compare_to(self.baseline, "lineno")[:self.args.top]
+            if stat.size_diff > 0
+        ]
+
+    async def snapshot(self):
+        # Снимок и сравнение занимают секунды - в потоке, чтобы не останавливать обработку обновлений
+        self._snapshot_at = time.monotonic()
+        await asyncio.to_thread(self._allocation_growth)
+
+    async def take_sample(self, interval: float) -> Dict[str, Any]:
+        started = time.perf_counter()
+        gc.collect()
+        latencies = self.harness.latencies
+        # Задержки стенд копит без ограничения - забираем их каждый замер
+        self.harness.latencies = defaultdict(list)
+        values = sorted(value for flow in latencies.values() for value in flow)
+        errors = sum(self.harness.errors.values())
+        http_total = sum(self.http_requests.values())
+        sample = {
+            "elapsed": round(time.monotonic() - self.started, 1),
+            "rss_mib": round(rss_bytes() / MIB, 2),
+            "traced_mib": round(tracemalloc.get_traced_memory()[0] / MIB, 2) if tracemalloc.is_tracing() else 0.0,
+            "tasks": len(asyncio.all_tasks()),
+            "live_streams": int(LIVE_STREAMS.value()),
+            "fsm_sessions": len(self.harness.storage),
+            "fsm_words": self.harness.storage.words,
+            "pool_size": main.db_pool.get_size(),
+            "pool_idle": main.db_pool.get_idle_size(),
+            "suggest_indexes": len(main.suggest_cache._indexes),
+            "word_snapshots": len(main.word_snapshots._snapshots),
+            "rendered": len(main._rendered),
+            "updates_per_sec": round(len(values) / interval, 1),
+            "update_p99_ms": round(percentile(values, 99) * 1000, 2),
+            "http_per_sec": round((http_total - self._http_total) / interval, 1),
+            "errors": errors,
+        }
+        self.updates_total += len(values)
+        self._http_total = http_total
+        self.errors_total = errors
+
+        if sample["elapsed"] >= self.warmup:
+            if self.trend_after is None:
+                self.trend_after = sample["elapsed"]
+                if tracemalloc.is_tracing():
+                    await self.snapshot()
+            elif (self.args.snapshot_interval and tracemalloc.is_tracing()
+                  and time.monotonic() - self._snapshot_at >= self.args.snapshot_interval):
+                await self.snapshot()
+        sample["sample_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return sample
+
+    async def sampler(self):
+        last = time.monotonic()
+        print(f"users: {self.args.users}, warmup: {self.warmup:.0f} s, tracemalloc frames: {self.args.tracemalloc_frames}")
+        print(f"{'elapsed':>8}{'rss MiB':>9}{'traced':>8}{'tasks':>7}{'streams':>8}{'sessions':>9}{'fsm words':>10}"
+              f"{'pool':>7}{'upd/s':>8}{'p99 ms':>8}{'http/s':>8}{'errors':>7}{'sample ms':>10}", flush=True)
+        while True:
+            try:
+                await asyncio.wait_for(self.stop.wait(), self.args.sample_interval)
+                # Нагрузка уже остановлена - такой замер исказил бы тренды
+                return
+            except asyncio.TimeoutError:
+                pass
+            now = time.monotonic()
+            sample = await self.take_sample(now - last)
+            last = now
+            self.samples.append(sample)
+            print(f"{sample['elapsed']:>8.0f}{sample['rss_mib']:>9.1f}{sample['traced_mib']:>8.1f}"
+                  f"{sample['tasks']:>7}{sample['live_streams']:>8}{sample['fsm_sessions']:>9}"
+                  f"{sample['fsm_words']:>10}{sample['pool_size'] - sample['pool_idle']:>3}/{sample['pool_size']:<3}"
+                  f"{sample['updates_per_sec']:>8.0f}{sample['update_p99_ms']:>8.1f}{sample['http_per_sec']:>8.0f}"
+                  f"{sample['errors']:>7}{sample['sample_ms']:>10.0f}", flush=True)
+
+    # = ПРОВЕРКА =
+
+    def checks(self) -> List[Dict[str, Any]]:
+        steady = [sample for sample in self.samples
+                  if self.trend_after is not None and sample["elapsed"] > self.trend_after]
+        results = []
+        if len(steady) < 3:
+            logging.warning("Only %s samples after warmup - trends are not checked", len(steady))
+        else:
+            for key, (limit_name, unit) in TRENDS.items():
+                if key == "traced_mib" and not tracemalloc.is_tracing():
+                    continue
+                growth = slope_per_hour([(sample["elapsed"], sample[key]) for sample in steady])
+                limit = getattr(self.args, limit_name)
+                results.append({"check": key, "growth": round(growth, 2), "limit": limit, "unit": unit,
+                                "passed": growth <= limit})
+        http_errors = sum(self.http_errors.values())
+        for key, value in (("update_errors", self.errors_total), ("http_errors", http_errors)):
+            results.append({"check": key, "growth": value, "limit": self.args.max_errors, "unit": "total",
+                            "passed": value <= self.args.max_errors})
+        return results
+
+    async def run(self) -> Dict[str, Any]:
+        await self.setup()
+        self.started = time.monotonic()
+        sampler = asyncio.create_task(self.sampler(), name="soak-sampler")
+        http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        clients = [asyncio.create_task(self.http_client(http, i)) for i in range(self.args.http_clients)]
+        streams = [asyncio.create_task(self.stream_client(http, i)) for i in range(self.args.stream_clients)]
+        try:
+            await self.drive()
+        finally:
+            self.stop.set()
+            for task in streams:
+                task.cancel()
+            await asyncio.gather(*clients, *streams, return_exceptions=True)
+            await http.close()
+            await sampler
+            if self.baseline is not None:
+                await self.snapshot()
+            await self.teardown()
+        checks = self.checks()
+        return {
+            "passed": all(check["passed"] for check in checks),
+            "checks": checks,
+            "top_allocation_growth": self.top_growth,
+            "updates": self.updates_total,
+            "http_requests": dict(self.http_requests),
+            "http_errors": dict(self.http_errors),
+            "stream_events": self.stream_events,
+            "warmup": self.warmup,
+            "flow_errors": dict(self.harness.errors),
+            "samples": self.samples,
+            "config": vars(self.args),
+        }
+
+
+async def run(args) -> bool:
+    if args.tracemalloc_frames:
+        tracemalloc.start(args.tracemalloc_frames)
+    report = await Soak(args).run()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    print("\ntop allocation growth since warmup:")
+    for item in report["top_allocation_growth"]:
+        print(f"  {item['size_diff_kib']:>10.1f} KiB {item['count_diff']:>+9} blocks  {item['where']}")
+    print("\nchecks:")
+    for check in report["checks"]:
+        print(f"  {'ok  ' if check['passed'] else 'FAIL'} {check['check']:<16}{check['growth']:>10} {check['unit']:<12}"
+              f"(limit {check['limit']})")
+    print("PASSED" if report["passed"] else "FAILED")
+    return report["passed"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=3 * 3600, help="длительность, секунд")
+    parser.add_argument("--users", type=int, default=100, help="одновременных виртуальных пользователей")
+    parser.add_argument("--dict-sizes", default="10,100,1000", help="размеры словарей через запятую")
+    # Как у настоящего Bot API: нагрузка, которую процесс выдерживает часами, а не предельная
+    parser.add_argument("--api-latency", type=float, default=0.1, help="задержка фиктивного Bot API, секунд")
+    parser.add_argument("--round", type=float, default=60.0, help="длительность раунда между сменами пользователей, с")
+    parser.add_argument("--churn", type=float, default=0.1, help="доля пользователей, сменяемых за раунд")
+    parser.add_argument("--http-clients", type=int, default=10, help="одновременных HTTP-клиентов WebApp")
+    parser.add_argument("--http-pause", type=float, default=0.05, help="пауза клиента между запросами, с")
+    parser.add_argument("--stream-clients", type=int, default=10, help="одновременно открытых WebApp (потоков)")
+    parser.add_argument("--stream-hold", type=float, default=30.0, help="сколько секунд держится поток, с")
+    parser.add_argument("--port", type=int, default=8091, help="порт HTTP-приложения")
+    parser.add_argument("--sample-interval", type=float, default=60.0, help="период замеров, с")
+    parser.add_argument("--warmup", type=float, help="прогрев без проверки трендов, с")
+    parser.add_argument("--snapshot-interval", type=float, default=0.0,
+                        help="период снимков tracemalloc по ходу прогона, с (0 - только после прогона)")
+    parser.add_argument("--cache-users", type=int, default=200,
+                        help="предел пользователей в кешах автодополнения и снимков словарей")
+    parser.add_argument("--cache-renders", type=int, default=10000, help="предел кеша показанных сообщений")
+    parser.add_argument("--tracemalloc-frames", type=int, default=1, help="глубина стека tracemalloc (0 - выключен)")
+    parser.add_argument("--top", type=int, default=10, help="мест роста выделений в отчете")
+    parser.add_argument("--max-rss-growth", type=float, default=16.0, help="допустимый рост RSS, MiB/ч")
+    parser.add_argument("--max-traced-growth", type=float, default=8.0, help="допустимый рост tracemalloc, MiB/ч")
+    parser.add_argument("--max-task-growth", type=float, default=5.0, help="допустимый рост числа задач в час")
+    parser.add_argument("--max-session-growth", type=float, default=50.0, help="допустимый рост числа сессий в час")
+    parser.add_argument("--max-errors", type=int, default=0, help="допустимое число ошибок обновлений и HTTP")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл для JSON-отчета")
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(0 if asyncio.run(run(parser.parse_args())) else 1)
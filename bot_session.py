@@ -0,0 +1,58 @@
+"""
+ОБЩАЯ HTTP-СЕССИЯ ДЛЯ ЗАПРОСОВ К BOT API
+
+Ответы пользователю (answer, edit_text, answerCallbackQuery) - исходящие запросы к Bot API,
+и в обработчиках бота-словаря они занимают большую часть времени. Поэтому оба бота
+(и рассылка напоминаний) работают через одну SharedAiohttpSession:
+- один пул соединений с ограничением limit: соединения с api.telegram.org открываются
+  один раз и переиспользуются обоими ботами (без TLS-рукопожатия на каждый ответ)
+- keep-alive: простаивающее соединение держится keepalive секунд
+- DNS-кеш: адрес сервера Bot API запрашивается раз в dns_ttl секунд
+- timeout: предел одного запроса (long polling добавляет к нему свое время ожидания)
+- base_url: свой сервер Bot API (telegram-bot-api или заглушка в бенчмарке)
+Время каждого запроса пишется в метрику bot_api_request_duration_seconds по методу.
+"""
+
+import time
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.methods import TelegramMethod
+
+from metrics import Histogram
+
+BOT_API_LATENCY = Histogram(
+    "bot_api_request_duration_seconds", "Время запроса к Bot API по методу и результату", ["method", "result"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+class SharedAiohttpSession(AiohttpSession):
+    """
+    Сессия aiogram с настроенным пулом соединений, общая для нескольких Bot
+
+    Закрывается владельцем (main) после остановки всех ботов, а не каждым ботом при остановке
+    (start_polling(..., close_bot_session=False)).
+    """
+
+    def __init__(self, limit: int = 100, keepalive: float = 60.0, dns_ttl: int = 3600,
+                 timeout: float = 30.0, base_url: str = "", **kwargs: Any):
+        api = TelegramAPIServer.from_base(base_url) if base_url else PRODUCTION
+        super().__init__(limit=limit, api=api, timeout=timeout, **kwargs)
+        self._connector_init.update(
+            keepalive_timeout=keepalive,
+            ttl_dns_cache=dns_ttl,
+            use_dns_cache=True,
+        )
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        started = time.perf_counter()
+        result = "error"
+        try:
+            response = await super().make_request(bot, method, timeout)
+            result = "ok"
+            return response
+        finally:
+            BOT_API_LATENCY.observe(time.perf_counter() - started, method=method.__api_method__, result=result)
@@ -0,0 +1,55 @@
+"""
+СХЕМА CALLBACK-ДАННЫХ БОТА-СЛОВАРЯ
+
+Все кнопки бота-словаря упаковывают в callback_data одну структуру DictCallback:
+действие (DictAction) и необязательный аргумент (часть речи, поле для редактирования).
+Один обработчик в main.py разбирает ее и находит нужную функцию поиском в словаре,
+вместо перебора цепочки фильтров F.data == ... для каждого нажатия.
+"""
+
+from enum import Enum
+
+from aiogram.filters.callback_data import CallbackData
+
+
+class DictAction(str, Enum):
+    """Действия кнопок бота-словаря (значения короткие - лимит callback_data 64 байта)"""
+    # Просмотр словаря
+    SHOW_INFO = "info"
+    GO_BACK = "back"
+    PREV_WORD = "prev"
+    NEXT_WORD = "next"
+    PREV_LETTER = "prevl"
+    NEXT_LETTER = "nextl"
+    CANCEL_WORDS = "close"
+    DELETE_WORD = "del"
+    # Редактирование
+    EDIT_WORD = "edit"
+    EDIT_FIELD = "field"
+    NEW_POS = "newpos"
+    CANCEL_EDIT = "cedit"
+    # Добавление нового слова
+    POS = "pos"
+    POS_OTHER = "posother"
+    POS_CANCEL = "poscancel"
+    # Подсказка офлайн-словаря: сохранить как предложено / выбрать часть речи самому
+    LEX_ACCEPT = "lexok"
+    LEX_MANUAL = "lexpos"
+    # Тест /quiz: ответ (arg - "номер вопроса.номер варианта") и завершение
+    QUIZ_ANSWER = "qa"
+    QUIZ_STOP = "qstop"
+
+
+class DictCallback(CallbackData, prefix="d"):
+    """
+    callback_data кнопок бота-словаря
+    - action: что сделать
+    - arg: аргумент действия (часть речи, поле для редактирования, ответ в тесте)
+    """
+    action: DictAction
+    arg: str = ""
+
+
+def dict_button_data(action: DictAction, arg: str = "") -> str:
+    """Упакованная строка callback_data для кнопки"""
+    return DictCallback(action=action, arg=arg).pack()
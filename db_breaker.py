@@ -0,0 +1,175 @@
+"""
+РЕЖИМ ТОЛЬКО ДЛЯ ЧТЕНИЯ ПРИ НЕДОСТУПНОЙ БАЗЕ
+
+Если Postgres завис, каждое db_pool.acquire() ждет соединения без срока, и обработчики обоих
+ботов копятся в памяти, пока сервер не оживет. CircuitBreaker вокруг функций работы с БД:
+1. Сроки: соединение из пула - не дольше acquire_timeout, запрос - не дольше command_timeout
+   пула (задается при создании пула в main.init_db)
+2. Ошибки соединения и сроков подряд считаются; после failure_threshold таких ошибок
+   выключатель размыкается: следующие reset_timeout секунд обращения к базе сразу получают
+   DatabaseUnavailable, без ожидания
+3. Затем одно обращение пропускается как проба: успех замыкает выключатель, ошибка - снова
+   размыкает на reset_timeout
+Ошибки самих запросов (дубликат слова и т.п.) - ответ живой базы и сбоем не считаются.
+У основного сервера и реплики свои выключатели (name): недоступная реплика не отключает записи,
+чтения в это время идут на основной сервер (main._read).
+
+Пока база недоступна, /list и /api/words отдают последний прочитанный словарь пользователя
+из WordSnapshots, а изменения отклоняются сразу с понятным сообщением.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+
+import asyncpg
+from asyncpg.pool import Pool
+
+from metrics import Counter, Gauge
+
+DB_BREAKER_OPEN = Gauge("db_breaker_open", "Выключатель базы разомкнут (1) или замкнут (0)", ["server"])
+DB_UNAVAILABLE = Counter(
+    "db_unavailable_total", "Обращения к базе, завершенные DatabaseUnavailable", ["server", "reason"]
+)
+DB_SNAPSHOT_READS = Counter("db_snapshot_reads_total", "Словари, отданные из снимка при недоступной базе")
+
+# Ошибки, означающие недоступность базы, а не ошибку запроса
+FAILURES = (
+    asyncio.TimeoutError,
+    OSError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.TooManyConnectionsError,
+    asyncpg.QueryCanceledError,
+)
+
+
+class DatabaseUnavailable(Exception):
+    """База недоступна (выключатель разомкнут или истек срок обращения)"""
+
+
+class CircuitBreaker:
+    """
+    Выключатель обращений к базе
+
+    Параметры:
+    - failure_threshold: ошибок подряд до размыкания
+    - reset_timeout: сколько секунд после размыкания не обращаться к базе
+    - acquire_timeout: предел ожидания соединения из пула, секунд
+    - name: сервер за выключателем (метка метрик и журнала)
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0, acquire_timeout: float = 2.0,
+                 name: str = "primary"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.acquire_timeout = acquire_timeout
+        self.name = name
+        self._failures = 0
+        # Момент размыкания (None - замкнут) и идет ли проба
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def closed(self) -> bool:
+        return self._opened_at is None
+
+    def _enter(self) -> bool:
+        """Пропускает обращение или отклоняет его; True - это проба после размыкания"""
+        if self._opened_at is None:
+            return False
+        if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+            DB_UNAVAILABLE.inc(server=self.name, reason="open")
+            raise DatabaseUnavailable(f"{self.name} database circuit breaker is open")
+        self._probing = True
+        return True
+
+    def _succeeded(self):
+        self._failures = 0
+        if self._opened_at is not None:
+            logging.warning("%s database is available again, circuit breaker closed", self.name.capitalize())
+            self._opened_at = None
+            DB_BREAKER_OPEN.set(0, server=self.name)
+
+    def _failed(self, error: BaseException):
+        self._failures += 1
+        DB_UNAVAILABLE.inc(server=self.name, reason=type(error).__name__)
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logging.error("%s database unavailable after %s failures (%r), circuit breaker opened",
+                              self.name.capitalize(), self._failures, error)
+            self._opened_at = time.monotonic()
+            DB_BREAKER_OPEN.set(1, server=self.name)
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Обращение к базе внутри блока: сбой соединения или срока -> DatabaseUnavailable"""
+        probe = self._enter()
+        try:
+            yield
+        except FAILURES as e:
+            self._failed(e)
+            raise DatabaseUnavailable(str(e) or type(e).__name__) from e
+        except asyncpg.PostgresError:
+            # Ответ живой базы
+            self._succeeded()
+            raise
+        else:
+            self._succeeded()
+        finally:
+            if probe:
+                self._probing = False
+
+    @asynccontextmanager
+    async def acquire(self, pool: Pool) -> AsyncIterator[asyncpg.Connection]:
+        """Соединение из пула с предельным ожиданием, под защитой выключателя"""
+        async with self.guard():
+            async with pool.acquire(timeout=self.acquire_timeout) as conn:
+                yield conn
+
+
+class WordSnapshots:
+    """
+    Последний прочитанный из базы словарь пользователя (LRU)
+    Снимок забывается при изменении словаря: после записи следующее чтение идет в базу,
+    поэтому снимок не старше последнего изменения, о котором знает процесс
+    - max_users / max_words: бюджет снимков (0 - без ограничения)
+    """
+
+    def __init__(self, max_users: int = 10_000, max_words: int = 1_000_000):
+        self.max_users = max_users
+        self.max_words = max_words
+        self._snapshots: "OrderedDict[int, List[Tuple[str, str, str]]]" = OrderedDict()
+        self._words = 0
+
+    def put(self, user_id: int, words: List[Tuple[str, str, str]]):
+        self.forget(user_id)
+        self._snapshots[user_id] = words
+        self._words += len(words)
+        while len(self._snapshots) > 1 and (
+            (self.max_users and len(self._snapshots) > self.max_users)
+            or (self.max_words and self._words > self.max_words)
+        ):
+            _, dropped = self._snapshots.popitem(last=False)
+            self._words -= len(dropped)
+
+    def get(self, user_id: int) -> Optional[List[Tuple[str, str, str]]]:
+        words = self._snapshots.get(user_id)
+        if words is not None:
+            self._snapshots.move_to_end(user_id)
+            DB_SNAPSHOT_READS.inc()
+        return words
+
+    def forget(self, user_id: Optional[int] = None):
+        """Забывает снимок пользователя (None - всех)"""
+        if user_id is None:
+            self._snapshots.clear()
+            self._words = 0
+            return
+        words = self._snapshots.pop(user_id, None)
+        if words is not None:
+            self._words -= len(words)
@@ -0,0 +1,145 @@
+"""
+ЧТЕНИЕ С РЕПЛИКИ С ГАРАНТИЕЙ «ВИЖУ СВОИ ЗАПИСИ»
+
+Если задан POSTGRES_REPLICA_HOST, чтения словаря (список слов, проверка дубликата,
+/api/words и синхронизация WebApp) идут на реплику, записи - на основной сервер.
+
+Реплика отстает от основного сервера, поэтому:
+1. После записи пользователь «закрепляется» за основным сервером на окно window секунд
+   (wrote(user_id)) - его следующие чтения не увидят старый словарь
+2. Фоновая проверка каждые check_interval секунд запоминает позицию журнала (WAL)
+   основного сервера и сравнивает с позицией, которую уже применила реплика.
+   Отставание - возраст самой старой позиции, до которой реплика еще не дошла
+   (так оно не растет, когда записей просто нет). Если оно не меньше окна
+   (или реплика недоступна) - все чтения идут на основной сервер, пока реплика не догонит
+Закрепление хранится в памяти процесса; записи других процессов приходят через
+LISTEN/NOTIFY (LIVE_UPDATES_NOTIFY=1) и тоже закрепляют пользователя.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Tuple
+
+import asyncpg
+from asyncpg.pool import Pool
+
+from metrics import Counter, Gauge
+
+DB_READS = Counter("db_reads_total", "Чтения словаря по серверу, на который они направлены", ["target"])
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Отставание реплики (-1 - реплика недоступна)")
+
+# Позиции журнала в байтах (pg_lsn как число)
+_PRIMARY_LSN_SQL = "SELECT (pg_current_wal_lsn() - '0/0')::bigint"
+_REPLAYED_LSN_SQL = "SELECT (pg_last_wal_replay_lsn() - '0/0')::bigint"
+# Сколько замеров позиции хранить, если реплика не догоняет
+MAX_POSITIONS = 3600
+
+
+class ReadRouter:
+    """
+    Выбор пула для чтения
+    - primary: пул основного сервера (все записи)
+    - replica: пул реплики (None - все чтения тоже с основного сервера)
+    - window: сколько секунд после записи чтения пользователя идут на основной сервер
+    """
+
+    def __init__(self, primary: Pool, replica: Optional[Pool] = None,
+                 window: float = 5.0, check_interval: float = 1.0):
+        self.primary = primary
+        self.replica = replica
+        self.window = window
+        self.check_interval = check_interval
+        # user_id -> момент, до которого чтения идут на основной сервер (по возрастанию)
+        self._pinned: "OrderedDict[int, float]" = OrderedDict()
+        # До этого момента все чтения идут на основной сервер (после пропуска уведомлений)
+        self._pinned_all_until = 0.0
+        self._replica_ok = replica is not None
+        # (момент замера, позиция журнала основного сервера), которые реплика еще не применила
+        self._positions: Deque[Tuple[float, int]] = deque(maxlen=MAX_POSITIONS)
+        self._task: Optional[asyncio.Task] = None
+
+    def wrote(self, user_id: Optional[int]):
+        """
+        Отмечает запись пользователя (вызывать после фиксации транзакции)
+        None - изменения могли быть у любого пользователя
+        """
+        if self.replica is None:
+            return
+        now = time.monotonic()
+        if user_id is None:
+            self._pinned_all_until = now + self.window
+            return
+        self._pinned[user_id] = now + self.window
+        self._pinned.move_to_end(user_id)
+        # Истекшие закрепления - в начале словаря
+        while self._pinned:
+            user, deadline = next(iter(self._pinned.items()))
+            if deadline > now:
+                break
+            del self._pinned[user]
+
+    def pool_for(self, user_id: Optional[int] = None) -> Pool:
+        """Пул для чтения данных пользователя (None - чтение не привязано к пользователю)"""
+        now = time.monotonic()
+        if self._replica_ok and now >= self._pinned_all_until:
+            deadline = self._pinned.get(user_id) if user_id is not None else None
+            if deadline is None or deadline <= now:
+                DB_READS.inc(target="replica")
+                return self.replica
+        DB_READS.inc(target="primary")
+        return self.primary
+
+    async def _check(self):
+        errors = (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError)
+        try:
+            async with self.primary.acquire(timeout=self.check_interval) as conn:
+                position = await conn.fetchval(_PRIMARY_LSN_SQL, timeout=self.check_interval)
+        except errors:
+            # Основной сервер недоступен - оценить отставание не с чем, оставляем прежнее решение
+            return
+        now = time.monotonic()
+        self._positions.append((now, position))
+        try:
+            async with self.replica.acquire(timeout=self.check_interval) as conn:
+                replayed = await conn.fetchval(_REPLAYED_LSN_SQL, timeout=self.check_interval)
+        except errors as e:
+            if self._replica_ok:
+                logging.warning("Read replica unavailable, reading from primary: %s", e)
+            self._replica_ok = False
+            REPLICA_LAG.set(-1)
+            return
+        # replayed = None - сервер не реплика (например, тот же сервер в тестовом окружении)
+        while self._positions and (replayed is None or self._positions[0][1] <= replayed):
+            self._positions.popleft()
+        lag = now - self._positions[0][0] if self._positions else 0.0
+        REPLICA_LAG.set(lag)
+        healthy = lag < self.window
+        if healthy != self._replica_ok:
+            if healthy:
+                logging.info("Read replica caught up (lag %.1fs), routing reads to it", lag)
+            else:
+                logging.warning("Read replica lag %.1fs exceeds %.1fs, reading from primary", lag, self.window)
+        self._replica_ok = healthy
+
+    async def _run(self):
+        while True:
+            try:
+                await self._check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Replica lag check failed")
+                self._replica_ok = False
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        if self.replica is not None:
+            self._task = asyncio.create_task(self._run(), name="replica-lag-check")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,243 @@
+"""
+ХРАНИЛИЩЕ СОСТОЯНИЙ БОТА-СЛОВАРЯ С ИСТЕЧЕНИЕМ И БЮДЖЕТОМ ПАМЯТИ
+
+MemoryStorage aiogram хранит состояние каждого пользователя до перезапуска:
+открыл /list и не нажал ❌ - весь словарь пользователя остается в памяти навсегда.
+ExpiringMemoryStorage вместо этого:
+1. Хранит данные в DictSession - объекте с __slots__ и известными полями
+   (без словаря на каждого пользователя; список слов - кортеж точного размера)
+2. Забывает сессии, к которым не обращались ttl секунд: фоновая очистка раз в
+   sweep_interval секунд просматривает только истекшие сессии (они в начале очереди)
+3. Держит бюджет: не больше max_sessions сессий и max_words слов во всех списках /list;
+   при превышении забываются давно не использованные сессии
+Забытая сессия - пустое состояние: кнопки старого сообщения просто перестают отвечать
+(как после перезапуска бота), пользователь начинает заново с /list.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from metrics import Counter, Gauge
+
+FSM_SESSIONS = Gauge("fsm_sessions", "Сессии бота-словаря в памяти")
+FSM_SESSION_WORDS = Gauge("fsm_session_words", "Слов во всех сохраненных списках /list")
+FSM_EVICTIONS = Counter("fsm_evictions_total", "Забытые сессии по причине", ["reason"])
+
+
+@dataclass(slots=True)
+class DictSession:
+    """Состояние и данные одного пользователя (None - значение не задано)"""
+    state: Optional[str] = None
+    # Просмотр словаря (/list)
+    words: Optional[Tuple[Tuple[str, str, str], ...]] = None
+    current_index: Optional[int] = None
+    current_letter: Optional[str] = None
+    # Редактирование слова: новые и исходные значения
+    editing_word: Optional[str] = None
+    editing_pos: Optional[str] = None
+    editing_value: Optional[str] = None
+    editing_index: Optional[int] = None
+    original_word: Optional[str] = None
+    original_pos: Optional[str] = None
+    original_value: Optional[str] = None
+    # Добавление слова и подсказка офлайн-словаря
+    word: Optional[str] = None
+    value: Optional[str] = None
+    suggested_pos: Optional[str] = None
+    suggested_value: Optional[str] = None
+    # Тест /quiz
+    quiz: Optional[list] = None
+    quiz_index: Optional[int] = None
+    quiz_score: Optional[int] = None
+    # Ключи, которых нет среди полей (новые обработчики) - обычный словарь, создается по необходимости
+    extra: Optional[Dict[str, Any]] = None
+    # Момент последнего обращения (time.monotonic)
+    touched: float = 0.0
+
+    def words_count(self) -> int:
+        return len(self.words) if self.words else 0
+
+    def is_empty(self) -> bool:
+        return self.state is None and not self.extra and all(getattr(self, name) is None for name in DATA_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in DATA_FIELDS if getattr(self, name) is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def update(self, data: Mapping[str, Any]):
+        for name, value in data.items():
+            if name in _DATA_FIELD_SET:
+                if name == "words" and value is not None:
+                    value = tuple(value)
+                setattr(self, name, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[name] = value
+
+    def clear_data(self):
+        for name in DATA_FIELDS:
+            setattr(self, name, None)
+        self.extra = None
+
+
+# Поля с данными обработчиков (без служебных state, extra, touched)
+DATA_FIELDS = tuple(f.name for f in fields(DictSession) if f.name not in ("state", "extra", "touched"))
+_DATA_FIELD_SET = frozenset(DATA_FIELDS)
+
+
+class ExpiringMemoryStorage(BaseStorage):
+    """
+    Хранилище состояний в памяти процесса
+
+    Параметры:
+    - ttl: сессия без обращений дольше ttl секунд забывается (0 - не забывать)
+    - max_sessions: не больше сессий в памяти (0 - без ограничения)
+    - max_words: не больше слов во всех списках /list (0 - без ограничения)
+    - sweep_interval: период фоновой очистки, секунд
+    """
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 0, max_words: int = 0,
+                 sweep_interval: float = 60.0):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_words = max_words
+        self.sweep_interval = sweep_interval
+        # ключ -> сессия, в порядке последнего обращения (давние - в начале)
+        self._sessions: "OrderedDict[Hashable, DictSession]" = OrderedDict()
+        self._words = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(key: StorageKey) -> Hashable:
+        # Кортеж вместо StorageKey: у dataclass ключа есть __dict__, кортеж заметно меньше
+        return (key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny)
+
+    def _get(self, key: StorageKey) -> Optional[DictSession]:
+        """Сессия по ключу (с отметкой обращения); истекшая, но еще не убранная, не возвращается"""
+        storage_key = self._key(key)
+        session = self._sessions.get(storage_key)
+        if session is None:
+            return None
+        now = time.monotonic()
+        if self.ttl and now - session.touched > self.ttl:
+            self._drop(storage_key, "ttl")
+            return None
+        session.touched = now
+        self._sessions.move_to_end(storage_key)
+        return session
+
+    def _drop(self, storage_key: Hashable, reason: Optional[str] = None):
+        session = self._sessions.pop(storage_key)
+        self._words -= session.words_count()
+        if reason:
+            FSM_EVICTIONS.inc(reason=reason)
+
+    def _change(self, key: StorageKey, change) -> DictSession:
+        """Применяет change к сессии (создает ее при необходимости), следит за бюджетом"""
+        session = self._get(key)
+        storage_key = self._key(key)
+        if session is None:
+            session = self._sessions[storage_key] = DictSession(touched=time.monotonic())
+        self._words -= session.words_count()
+        change(session)
+        self._words += session.words_count()
+        # Пустая сессия не занимает память
+        if session.is_empty():
+            self._drop(storage_key)
+        else:
+            self._enforce_budget()
+        return session
+
+    def _enforce_budget(self):
+        # Текущая сессия - в конце очереди и забывается последней
+        while self._sessions and (
+            (self.max_sessions and len(self._sessions) > self.max_sessions)
+            or (self.max_words and self._words > self.max_words and len(self._sessions) > 1)
+        ):
+            self._drop(next(iter(self._sessions)), "budget")
+
+    # = ИНТЕРФЕЙС BaseStorage =
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        self._change(key, lambda session: setattr(session, "state", value))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        session = self._get(key)
+        return session.state if session else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        def replace(session: DictSession):
+            session.clear_data()
+            session.update(data)
+        self._change(key, replace)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        session = self._get(key)
+        return session.to_dict() if session else {}
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        # Только переданные поля, без пересборки всех данных через get_data/set_data
+        return self._change(key, lambda session: session.update(data)).to_dict()
+
+    async def close(self) -> None:
+        await self.stop()
+
+    # = ФОНОВАЯ ОЧИСТКА =
+
+    def sweep(self) -> int:
+        """Забывает истекшие сессии, возвращает их число"""
+        if not self.ttl:
+            return 0
+        deadline = time.monotonic() - self.ttl
+        expired = 0
+        while self._sessions:
+            storage_key, session = next(iter(self._sessions.items()))
+            if session.touched > deadline:
+                break
+            self._drop(storage_key, "ttl")
+            expired += 1
+        return expired
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                expired = self.sweep()
+                if expired:
+                    logging.debug("Expired %s dictionary bot sessions", expired)
+            except Exception:
+                logging.exception("FSM session sweep failed")
+            FSM_SESSIONS.set(len(self._sessions))
+            FSM_SESSION_WORDS.set(self._words)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="fsm-session-sweeper")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __bool__(self) -> bool:
+        # Dispatcher берет storage or MemoryStorage(): пустое хранилище не должно быть ложным
+        return True
+
+    @property
+    def words(self) -> int:
+        """Слов во всех сохраненных списках /list"""
+        return self._words
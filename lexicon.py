@@ -0,0 +1,174 @@
+"""
+ОФЛАЙН-СЛОВАРЬ EN→RU ДЛЯ ПОДСКАЗОК ПРИ ДОБАВЛЕНИИ СЛОВА
+
+Когда пользователь присылает слово без значения, бот ищет его здесь и предлагает
+часть речи и перевод - сохранить можно одной кнопкой.
+
+Словарь - один бинарный файл (собирается tools/build_lexicon.py), отсортированный по ключу.
+Файл отображается в память (mmap) и не разбирается при загрузке: открытие занимает
+миллисекунды при любом размере, а страницы файла общие для всех процессов на машине.
+Поиск - двоичный поиск по таблице смещений, читаются только нужные страницы.
+
+Формат (little-endian):
+    заголовок   MAGIC, число записей (u32), длина таблицы частей речи (u16)
+    части речи  названия через "\\n" (utf-8)
+    смещения    u32 на запись - начало записи относительно начала области записей
+    записи      длина ключа (u8), ключ (utf-8), код части речи (u8), длина перевода (u16), перевод (utf-8)
+Ключи - нормализованные слова (normalize_key), порядок - по байтам utf-8.
+"""
+
+import logging
+import mmap
+import re
+import struct
+import sys
+import unicodedata
+from typing import List, NamedTuple, Optional, Tuple
+
+MAGIC = b"LXC1"
+_HEADER = struct.Struct("<4sIH")
+_OFFSET = struct.Struct("<I")
+_TRANSLATION_LEN = struct.Struct("<H")
+
+# Ограничения формата
+MAX_KEY_BYTES = 255
+MAX_TRANSLATION_BYTES = 65535
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_key(word: str) -> str:
+    """Ключ поиска: NFKC, без регистра, одиночные пробелы"""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", word).casefold()).strip()
+
+
+class LexiconEntry(NamedTuple):
+    part_of_speech: str
+    translation: str
+
+
+class Lexicon:
+    """Словарь в отображенном в память файле"""
+
+    def __init__(self, buffer, path: str = ""):
+        self.path = path
+        self._buffer = buffer
+        magic, self._count, pos_len = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a lexicon file")
+        pos_start = _HEADER.size
+        self._pos_names = bytes(buffer[pos_start:pos_start + pos_len]).decode("utf-8").split("\n")
+        self._offsets_start = pos_start + pos_len
+        self._records_start = self._offsets_start + _OFFSET.size * self._count
+        # Таблица смещений как массив u32 без копирования (на big-endian - через struct)
+        self._offsets = None
+        if sys.byteorder == "little":
+            self._offsets = memoryview(buffer)[self._offsets_start:self._records_start].cast("I")
+
+    @classmethod
+    def open(cls, path: str) -> Optional["Lexicon"]:
+        """Отображает файл в память; None, если файла нет (подсказки просто отключаются)"""
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            logging.info("Lexicon file %s not found, suggestions disabled", path)
+            return None
+        lexicon = cls(buffer, path)
+        logging.info("Lexicon loaded: %s entries from %s", len(lexicon), path)
+        return lexicon
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, index: int) -> int:
+        if self._offsets is not None:
+            return self._records_start + self._offsets[index]
+        return self._records_start + _OFFSET.unpack_from(self._buffer, self._offsets_start + 4 * index)[0]
+
+    def lookup(self, word: str) -> Optional[LexiconEntry]:
+        key = normalize_key(word).encode("utf-8")
+        if not key or len(key) > MAX_KEY_BYTES:
+            return None
+        buffer, offsets, records_start = self._buffer, self._offsets, self._records_start
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = records_start + offsets[middle] if offsets is not None else self._record(middle)
+            current = buffer[offset + 1:offset + 1 + buffer[offset]]
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return self._entry(offset)
+        return None
+
+    def _entry(self, offset: int) -> LexiconEntry:
+        """Часть речи и перевод записи, начинающейся с offset"""
+        buffer = self._buffer
+        offset += 1 + buffer[offset]
+        pos = self._pos_names[buffer[offset]]
+        length = _TRANSLATION_LEN.unpack_from(buffer, offset + 1)[0]
+        start = offset + 1 + _TRANSLATION_LEN.size
+        return LexiconEntry(pos, buffer[start:start + length].decode("utf-8"))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, LexiconEntry]]:
+        """Первые по алфавиту слова, начинающиеся с prefix"""
+        key = normalize_key(prefix).encode("utf-8")
+        if not key or len(key) > MAX_KEY_BYTES:
+            return []
+        buffer = self._buffer
+        # Нижняя граница: первая запись с ключом >= prefix
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self._record(middle)
+            if buffer[offset + 1:offset + 1 + buffer[offset]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        results = []
+        for index in range(low, min(low + limit, self._count)):
+            offset = self._record(index)
+            current = buffer[offset + 1:offset + 1 + buffer[offset]]
+            if not current.startswith(key):
+                break
+            results.append((current.decode("utf-8"), self._entry(offset)))
+        return results
+
+    def close(self):
+        if self._offsets is not None:
+            self._offsets.release()
+        self._buffer.close()
+
+
+def build_lexicon(entries: List[Tuple[str, str, str]]) -> bytes:
+    """
+    Собирает файл словаря из (слово, часть речи, перевод)
+    Слова нормализуются; для повторов сохраняется первая запись
+    """
+    records = {}
+    for word, pos, translation in entries:
+        key = normalize_key(word).encode("utf-8")
+        if not key or len(key) > MAX_KEY_BYTES or key in records:
+            continue
+        records[key] = (pos.strip().lower(), translation.strip().encode("utf-8")[:MAX_TRANSLATION_BYTES])
+
+    pos_names = sorted({pos for pos, _ in records.values()})
+    pos_codes = {name: code for code, name in enumerate(pos_names)}
+    if len(pos_names) > 256:
+        raise ValueError("too many distinct parts of speech")
+    pos_table = "\n".join(pos_names).encode("utf-8")
+
+    offsets = bytearray()
+    body = bytearray()
+    for key in sorted(records):
+        pos, translation = records[key]
+        # Перевод мог обрезаться посреди символа - отбрасываем неполный хвост
+        translation = translation.decode("utf-8", "ignore").encode("utf-8")
+        offsets += _OFFSET.pack(len(body))
+        body += bytes((len(key),)) + key + bytes((pos_codes[pos],))
+        body += _TRANSLATION_LEN.pack(len(translation)) + translation
+
+    return _HEADER.pack(MAGIC, len(records), len(pos_table)) + pos_table + bytes(offsets) + bytes(body)
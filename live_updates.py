@@ -0,0 +1,163 @@
+"""
+ЖИВЫЕ ОБНОВЛЕНИЯ СЛОВАРЯ ДЛЯ ОТКРЫТЫХ WEBAPP
+
+Когда пользователь меняет словарь в боте, открытая WebApp получает изменения сразу:
+1. Функции записи в БД сообщают брокеру (ChangeBroker), что словарь пользователя изменился
+2. Каждое открытое соединение /api/words/stream (Server-Sent Events) просыпается
+   и отправляет клиенту изменения после своей версии (тот же журнал, что и /api/words/changes)
+3. При нескольких процессах сигнал идет через Postgres LISTEN/NOTIFY (PgChangeListener):
+   запись делает pg_notify в своей транзакции, каждый процесс будит своих подписчиков
+
+Подписка хранит только флаг «есть изменения», поэтому память на соединение не растет,
+сколько бы записей ни пришло, пока клиент читает медленно: несколько изменений
+склеиваются в одну выборку из журнала.
+"""
+
+import asyncio
+import logging
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Set
+
+import asyncpg
+
+from metrics import Counter, Gauge
+
+LIVE_STREAMS = Gauge("live_streams", "Открытые соединения живых обновлений WebApp")
+LIVE_EVENTS = Counter("live_events_total", "Отправленные события живых обновлений")
+
+# Канал Postgres для LISTEN/NOTIFY
+NOTIFY_CHANNEL = "word_changes"
+# Метка процесса в уведомлениях: свои изменения процесс уже учел в локальных кешах
+PROCESS_ID = uuid.uuid4().hex[:12]
+
+
+def notify_payload(user_id: int) -> str:
+    """Содержимое pg_notify: user_id и процесс-источник"""
+    return f"{user_id}:{PROCESS_ID}"
+
+
+class TooManyStreams(Exception):
+    """У пользователя уже открыто максимальное число соединений"""
+
+
+class Subscription:
+    """Одно соединение: событие «словарь изменился» (несколько изменений склеиваются)"""
+
+    __slots__ = ("user_id", "_changed")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        self._changed.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Ждет изменений не дольше timeout; False - изменений не было"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._changed.clear()
+        return True
+
+
+class ChangeBroker:
+    """
+    Pub/sub внутри процесса: user_id -> подписки открытых соединений
+    max_per_user ограничивает число соединений одного пользователя
+    """
+
+    def __init__(self, max_per_user: int = 5):
+        self.max_per_user = max_per_user
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+
+    @contextmanager
+    def subscribe(self, user_id: int) -> Iterator[Subscription]:
+        subscriptions = self._subscriptions.setdefault(user_id, set())
+        if len(subscriptions) >= self.max_per_user:
+            raise TooManyStreams(user_id)
+        subscription = Subscription(user_id)
+        subscriptions.add(subscription)
+        LIVE_STREAMS.set(LIVE_STREAMS.value() + 1)
+        try:
+            yield subscription
+        finally:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[user_id]
+            LIVE_STREAMS.set(LIVE_STREAMS.value() - 1)
+
+    def publish(self, user_id: int):
+        for subscription in self._subscriptions.get(user_id, ()):
+            subscription.notify()
+
+    def publish_all(self):
+        """Будит все подписки (после потери соединения LISTEN уведомления могли пропасть)"""
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.notify()
+
+
+class PgChangeListener:
+    """
+    Получает уведомления pg_notify(NOTIFY_CHANNEL, notify_payload(user_id)) от всех процессов
+    и передает их брокеру. Держит отдельное соединение (не из пула) и переподключается при обрыве.
+    on_remote_change вызывается для изменений из других процессов (None - могли пропустить любые),
+    чтобы сбросить локальные кеши
+    """
+
+    def __init__(self, broker: ChangeBroker, connect: Callable[[], "asyncio.Future[asyncpg.Connection]"],
+                 retry_delay: float = 5.0, on_remote_change: Optional[Callable[[Optional[int]], None]] = None):
+        self.broker = broker
+        self.connect = connect
+        self.retry_delay = retry_delay
+        self.on_remote_change = on_remote_change
+        self._task: Optional[asyncio.Task] = None
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        user, _, origin = payload.partition(":")
+        try:
+            user_id = int(user)
+        except ValueError:
+            logging.warning("Unexpected %s payload: %r", channel, payload)
+            return
+        self.broker.publish(user_id)
+        if origin != PROCESS_ID and self.on_remote_change:
+            self.on_remote_change(user_id)
+
+    async def _run(self):
+        while True:
+            connection = None
+            try:
+                connection = await self.connect()
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                # Пока соединения не было, изменения могли пройти мимо
+                self.broker.publish_all()
+                if self.on_remote_change:
+                    self.on_remote_change(None)
+                await closed.wait()
+                logging.warning("LISTEN connection lost, reconnecting")
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                # InterfaceError - соединение закрылось посреди LISTEN
+                logging.error("LISTEN connection failed: %r, reconnecting", e)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    # Закрытие оборванного соединения само может упасть - тогда просто бросаем его
+                    try:
+                        await connection.close(timeout=self.retry_delay)
+                    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                        connection.terminate()
+            await asyncio.sleep(self.retry_delay)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="pg-change-listener")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,115 @@
+"""
+НАСТРОЙКА ЖУРНАЛА: ОЧЕРЕДЬ, JSON И ВЫБОРОЧНАЯ ЗАПИСЬ
+
+Запись в stdout из event loop блокирует его при высокой частоте сообщений, поэтому:
+1. Обработчики кладут записи в очередь (QueueHandler) - это дешево и не блокирует
+2. Фоновый поток (QueueListener) форматирует записи и пишет их в stdout
+3. Форматирование ленивое: аргументы подставляются уже в фоновом потоке
+4. Частые события можно записывать выборочно: доля записей задается для поля event
+   (logging.info(..., extra={"event": "message_in"})) или для имени логгера (aiogram.event)
+
+Формат вывода - JSON по строке на запись (или прежний текстовый, LOG_FORMAT=text).
+"""
+
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Стандартные атрибуты LogRecord - все остальные считаются полями extra
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время, уровень, логгер, сообщение и поля extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Прежний текстовый формат; стек из поля stack (мониторинг) дописывается после сообщения"""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        stack = getattr(record, "stack", None)
+        return f"{text}\n{stack}" if stack else text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Выборочная запись частых событий
+    rates: event или имя логгера -> доля записей (0..1); остальные записи пишутся всегда
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._random = random.random
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(getattr(record, "event", None) or record.name)
+        return rate is None or self._random() < rate
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке
+    Стандартный prepare() подставляет аргументы сразу (т.е. в event loop),
+    здесь запись уходит в очередь как есть и форматируется в фоновом потоке
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Разбирает строку вида "message_in=0.1,api_words=0.01" """
+    rates = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        event, _, rate = part.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", sample_rates: Optional[Dict[str, float]] = None) -> QueueListener:
+    """
+    Настраивает корневой логгер: очередь + фоновый поток записи
+    Возвращает QueueListener - его нужно остановить при завершении (listener.stop())
+    """
+    formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
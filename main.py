@@ -9,38 +9,88 @@
 """
 
 import asyncio  # Для асинхронного выполнения задач
+import inspect
+import json
 import logging  # Для записи логов работы бота
-import sys  # Для работы с системными функциями
 import asyncpg
 from aiohttp import web
 from asyncpg.pool import Pool
 import os  # Для работы с файловой системой
-from typing import List, Tuple, Optional  # Аннотации типов для лучшей читаемости
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Sequence, Set, Tuple, Optional  # Аннотации типов для лучшей читаемости
 from dotenv import load_dotenv  # Для загрузки переменных окружения из .env файла
 
 # Импорт компонентов из библиотеки aiogram для работы с Telegram API
 from aiogram import Bot, Dispatcher, Router, F  # Основные компоненты
 from aiogram.client.default import DefaultBotProperties  # Настройки бота по умолчанию
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.enums import ParseMode  # Режимы форматирования текста (HTML, Markdown)
-from aiogram.filters import Command, CommandStart, StateFilter  # Фильтры для обработки команд
+from aiogram.filters import Command, CommandObject, CommandStart, ExceptionTypeFilter  # Фильтры для обработки команд
 from aiogram.fsm.context import FSMContext  # Контекст машины состояний
 from aiogram.fsm.state import State, StatesGroup  # Система состояний
-from aiogram.fsm.storage.memory import MemoryStorage  # Хранилище состояний в оперативной памяти
 from aiogram.types import (  # Типы данных Telegram
     Message,
     CallbackQuery,
+    ErrorEvent,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
     InlineKeyboardMarkup,
-    InlineKeyboardButton, ReplyKeyboardRemove
 )
 
 # Импорт текстовых сообщений из отдельного файла (mssgs.py)
 from mssgs import *
+from callbacks import DictAction, DictCallback
+from render import (
+    ABOUT_KEYBOARD,
+    ADD_POS_KEYBOARD,
+    MAIN_MENU_KEYBOARD,
+    render_edit_menu,
+    render_edit_pos_prompt,
+    render_lexicon_suggestion,
+    render_greeting,
+    render_quiz_feedback,
+    render_quiz_question,
+    render_quiz_result,
+    render_stats,
+    render_word_card,
+    render_word_saved,
+    serialize_keyboard,
+)
+from log_config import parse_sample_rates, setup_logging
+from metrics import render_metrics
+from monitoring import LoopLagMonitor, RateLimitedLog, SlowUpdateMiddleware
+from static_assets import StaticBundle
+from lexicon import Lexicon
+from live_updates import LIVE_EVENTS, NOTIFY_CHANNEL, ChangeBroker, PgChangeListener, TooManyStreams, notify_payload
+from suggest import SuggestCache
+from db_routing import ReadRouter
+from bot_session import SharedAiohttpSession
+from fsm_storage import ExpiringMemoryStorage
+from write_batcher import WriteBatcher
+from db_breaker import CircuitBreaker, DatabaseUnavailable, WordSnapshots
+import word_schema
+import word_stats
+import quiz
+from scheduler import (
+    REMINDERS_DDL,
+    RateLimitedSender,
+    ReminderScheduler,
+    default_remind_time,
+    parse_timezone,
+)
 
 # Загрузка переменных окружения ДОЛЖНА БЫТЬ ВЫЗВАНА
 load_dotenv(""".env""")
 
 # Глобальный пул соединений
 db_pool: Optional[Pool] = None
+# Пул реплики для чтений (None - реплика не настроена) и выбор пула для чтения
+replica_pool: Optional[Pool] = None
+read_router: Optional[ReadRouter] = None
+# Очередь записи изменений словаря пачками (None - каждое изменение своей транзакцией)
+write_batcher: Optional[WriteBatcher] = None
 
 # Загружаем переменные окружения из файла .env (токены ботов и другие настройки)
 # Получение и проверка переменных окружения
@@ -51,10 +101,106 @@ POSTGRES_DB = os.getenv("POSTGRES_DB", "telegram_bot")
 
 WEB_SERVER_HOST = "0.0.0.0"
 WEB_SERVER_PORT = 8000
+# Каталог сборки WebApp (загружается в память при запуске HTTP-сервера)
+WEBAPP_DIST_DIR = os.getenv("WEBAPP_DIST_DIR", "webapp/dist")
 
 # Обработка порта с проверкой
 POSTGRES_PORT = int(os.getenv("POSTGRES_PORT", "5432"))
 
+# Реплика для чтений (пустой хост - все запросы к основному серверу), остальное - как у основного
+POSTGRES_REPLICA_HOST = os.getenv("POSTGRES_REPLICA_HOST", "")
+POSTGRES_REPLICA_PORT = int(os.getenv("POSTGRES_REPLICA_PORT", str(POSTGRES_PORT)))
+POSTGRES_REPLICA_USER = os.getenv("POSTGRES_REPLICA_USER", POSTGRES_USER)
+POSTGRES_REPLICA_PASSWORD = os.getenv("POSTGRES_REPLICA_PASSWORD", POSTGRES_PASSWORD)
+# Сколько секунд после записи чтения пользователя идут на основной сервер
+# (и максимальное отставание реплики, при котором она используется)
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "1"))
+
+# Схема хранения слов: flat - таблица words, lexemes - общие лексемы (word_schema.py)
+WORDS_SCHEMA = os.getenv("WORDS_SCHEMA", "flat")
+# Число HASH-секций плоской таблицы words (0 - без секционирования)
+WORDS_PARTITIONS = int(os.getenv("WORDS_PARTITIONS", "0"))
+
+# Настройки напоминаний («слово дня» и повторение)
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Europe/Moscow")
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+REMINDER_INTERVAL = float(os.getenv("REMINDER_INTERVAL", "30"))
+REMINDER_RATE = float(os.getenv("REMINDER_RATE", "25"))
+
+# Журнал: уровень, формат (json или text) и доли выборочной записи частых событий
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "message_in=0.1,api_words=0.01,aiogram.event=0.1")
+
+# Мониторинг: порог медленного обновления и замер отставания event loop (секунды)
+SLOW_UPDATE_THRESHOLD = float(os.getenv("SLOW_UPDATE_THRESHOLD", "1.0"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "1.0"))
+# Не больше MONITOR_LOG_LIMIT записей мониторинга в минуту
+MONITOR_LOG_LIMIT = int(os.getenv("MONITOR_LOG_LIMIT", "10"))
+
+# Живые обновления WebApp: LIVE_UPDATES_NOTIFY=1 - через Postgres LISTEN/NOTIFY (несколько процессов),
+# иначе только внутри процесса
+LIVE_UPDATES_NOTIFY = os.getenv("LIVE_UPDATES_NOTIFY", "0") == "1"
+LIVE_MAX_STREAMS_PER_USER = int(os.getenv("LIVE_MAX_STREAMS_PER_USER", "5"))
+# Период пустых сообщений, чтобы прокси не закрывали соединение (секунды)
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))
+
+# Офлайн-словарь EN→RU для подсказок при добавлении слова (tools/build_lexicon.py)
+LEXICON_PATH = os.getenv("LEXICON_PATH", "data/lexicon.bin")
+
+# Автодополнение (inline-режим и /api/words/suggest): сколько пользователей держать в памяти
+SUGGEST_CACHE_USERS = int(os.getenv("SUGGEST_CACHE_USERS", "10000"))
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "10"))
+
+# Исходящие запросы к Bot API (общая сессия обоих ботов): свой сервер Bot API (пусто - api.telegram.org),
+# соединений в пуле, keep-alive простаивающего соединения (с), время жизни DNS-кеша (с), предел запроса (с)
+BOT_API_URL = os.getenv("BOT_API_URL", "")
+BOT_API_CONNECTIONS = int(os.getenv("BOT_API_CONNECTIONS", "100"))
+BOT_API_KEEPALIVE = float(os.getenv("BOT_API_KEEPALIVE", "60"))
+BOT_API_DNS_TTL = int(os.getenv("BOT_API_DNS_TTL", "3600"))
+BOT_API_TIMEOUT = float(os.getenv("BOT_API_TIMEOUT", "30"))
+
+# Сессии бота-словаря в памяти: забываются после FSM_SESSION_TTL секунд без обращений (0 - никогда);
+# бюджет - сессий и слов во всех открытых списках /list (0 - без ограничения)
+FSM_SESSION_TTL = float(os.getenv("FSM_SESSION_TTL", "1800"))
+FSM_MAX_SESSIONS = int(os.getenv("FSM_MAX_SESSIONS", "100000"))
+FSM_MAX_WORDS = int(os.getenv("FSM_MAX_WORDS", "1000000"))
+FSM_SWEEP_INTERVAL = float(os.getenv("FSM_SWEEP_INTERVAL", "60"))
+
+# Сверка счетчиков статистики со словами: пауза между проходами (0 - выключена), размер пачки
+# и предел запроса сверки (с) - вместо DB_QUERY_TIMEOUT, которого хватает запросам обработчиков
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+STATS_RECONCILE_BATCH = int(os.getenv("STATS_RECONCILE_BATCH", "500"))
+STATS_RECONCILE_TIMEOUT = float(os.getenv("STATS_RECONCILE_TIMEOUT", "600"))
+
+# Запись изменений словаря пачками (1 - включена): не больше WRITE_BATCH_MAX изменений в транзакции,
+# ожидание пополнения пачки (с) и число одновременно записываемых пачек
+WRITE_BATCHING = os.getenv("WRITE_BATCHING", "0") == "1"
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "100"))
+WRITE_BATCH_DELAY = float(os.getenv("WRITE_BATCH_DELAY", "0.005"))
+WRITE_BATCH_WORKERS = int(os.getenv("WRITE_BATCH_WORKERS", "4"))
+
+# Недоступная база (db_breaker): предел ожидания соединения и запроса (с), ошибок подряд до перехода
+# в режим только для чтения и его длительность до пробы (с); бюджет снимков словарей для этого режима
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "2"))
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "5"))
+DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "5"))
+DB_BREAKER_RESET = float(os.getenv("DB_BREAKER_RESET", "10"))
+DB_SNAPSHOT_USERS = int(os.getenv("DB_SNAPSHOT_USERS", "10000"))
+DB_SNAPSHOT_WORDS = int(os.getenv("DB_SNAPSHOT_WORDS", "1000000"))
+
+# Журнал мониторинга с ограничением частоты и middleware медленных обновлений (общие для обоих ботов)
+monitor_log = RateLimitedLog(limit=MONITOR_LOG_LIMIT)
+slow_update_middleware = SlowUpdateMiddleware(SLOW_UPDATE_THRESHOLD, monitor_log)
+# Брокер живых обновлений WebApp
+change_broker = ChangeBroker(max_per_user=LIVE_MAX_STREAMS_PER_USER)
+# Выключатели обращений к основному серверу и реплике, снимки словарей для режима только для чтения
+db_breaker = CircuitBreaker(DB_BREAKER_FAILURES, DB_BREAKER_RESET, DB_ACQUIRE_TIMEOUT, name="primary")
+replica_breaker = CircuitBreaker(DB_BREAKER_FAILURES, DB_BREAKER_RESET, DB_ACQUIRE_TIMEOUT, name="replica")
+word_snapshots = WordSnapshots(max_users=DB_SNAPSHOT_USERS, max_words=DB_SNAPSHOT_WORDS)
+
 
 """ 
 =============== БОТ 1: ОСНОВНОЙ БОТ (ГЛАВНОЕ МЕНЮ) =============== 
@@ -74,21 +220,8 @@ async def start(message: Message):
     Обработчик команды /start
     Показывает приветственное сообщение и главное меню
     """
-    # Создаем клавиатуру с кнопками
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            # Кнопка перехода к боту-словарю
-            InlineKeyboardButton(text="📚 Бот-словарь", url="https://t.me/lllang_dictbot"),
-            # Кнопка технической поддержки
-            InlineKeyboardButton(text="🛠 Поддержка", url="https://t.me/NonGrata4Life")
-        ],
-        [
-            # Кнопка информации о боте
-            InlineKeyboardButton(text="ℹ️ О боте", callback_data="about")
-        ],
-    ])
-    # Отправляем приветственное сообщение с клавиатурой
-    await message.answer(f"👋 Привет, <b>{message.from_user.first_name}</b>!\n\n{WELCOME}", reply_markup=keyboard)
+    # Отправляем приветственное сообщение с готовой клавиатурой меню
+    await message.answer(render_greeting(message.from_user.first_name), reply_markup=MAIN_MENU_KEYBOARD)
 
 
 @router_main.callback_query(F.data == "about")
@@ -97,32 +230,15 @@ async def about(callback: CallbackQuery):
     Обработчик нажатия кнопки "О боте"
     Показывает подробную информацию о проекте
     """
-    # Клавиатура только с кнопкой возврата
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔙 Go Back", callback_data="go_back")]
-    ])
-
-    # Редактируем текущее сообщение, заменяя его на текст "О боте"
-    await callback.message.edit_text(ABOUT, reply_markup=keyboard)
+    # Редактируем текущее сообщение, заменяя его на текст "О боте" (клавиатура только с кнопкой возврата)
+    await callback.message.edit_text(ABOUT, reply_markup=ABOUT_KEYBOARD)
     # Подтверждаем обработку callback (убираем часики на кнопке)
     await callback.answer()
 
 @router_main.callback_query(F.data == "go_back")
 async def go_back(callback: CallbackQuery):
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            # Кнопка перехода к боту-словарю
-            InlineKeyboardButton(text="📚 Бот-словарь", url="https://t.me/lllang_dictbot"),
-            # Кнопка технической поддержки
-            InlineKeyboardButton(text="🛠 Поддержка", url="https://t.me/NonGrata4Life")
-        ],
-        [
-            # Кнопка информации о боте
-            InlineKeyboardButton(text="ℹ️ О боте", callback_data="about")
-        ],
-    ])
-    # Отправляем приветственное сообщение с клавиатурой
-    await callback.message.edit_text(f"👋 Привет, <b>{callback.from_user.first_name}</b>!\n\n{WELCOME}", reply_markup=keyboard, parse_mode=ParseMode.HTML)
+    # Возвращаем приветственное сообщение с готовой клавиатурой меню
+    await callback.message.edit_text(render_greeting(callback.from_user.first_name), reply_markup=MAIN_MENU_KEYBOARD)
     await callback.answer()
 
 
@@ -148,8 +264,49 @@ BOT_TOKEN_DICT = os.getenv("BOT_TOKEN_DICT")
 # Создаем маршрутизатор для обработки сообщений этого бота
 router_dict = Router()
 
-# Создаем хранилище состояний в оперативной памяти
-storage = MemoryStorage()
+# Таблица маршрутизации нажатий кнопок: действие -> (обработчик, допустимые состояния, нужен ли callback_data)
+# Заполняется декоратором dict_action, используется единственным обработчиком dict_callback_dispatcher
+DICT_CALLBACK_ROUTES: Dict[DictAction, Tuple[Callable[..., Awaitable[None]], FrozenSet[str], bool]] = {}
+
+
+def dict_action(action: DictAction, *states: State):
+    """
+    Регистрирует обработчик кнопки бота-словаря в таблице маршрутизации
+    Параметры:
+    - action: действие из callback_data
+    - states: состояния, в которых кнопка активна
+    """
+    def decorator(handler):
+        pass_data = "callback_data" in inspect.signature(handler).parameters
+        DICT_CALLBACK_ROUTES[action] = (handler, frozenset(s.state for s in states), pass_data)
+        return handler
+    return decorator
+
+# Создаем хранилище состояний в оперативной памяти (с истечением сессий и бюджетом)
+storage = ExpiringMemoryStorage(
+    ttl=FSM_SESSION_TTL,
+    max_sessions=FSM_MAX_SESSIONS,
+    max_words=FSM_MAX_WORDS,
+    sweep_interval=FSM_SWEEP_INTERVAL
+)
+
+# Общий пул соединений с Bot API для обоих ботов (закрывается в main после остановки ботов)
+bot_session = SharedAiohttpSession(
+    limit=BOT_API_CONNECTIONS,
+    keepalive=BOT_API_KEEPALIVE,
+    dns_ttl=BOT_API_DNS_TTL,
+    timeout=BOT_API_TIMEOUT,
+    base_url=BOT_API_URL
+)
+
+# Планировщик напоминаний (создается при запуске бота-словаря)
+reminder_scheduler: Optional[ReminderScheduler] = None
+
+# Офлайн-словарь (открывается в main(); None - подсказки отключены)
+lexicon: Optional[Lexicon] = None
+
+# Индексы автодополнения по словам пользователей (загружаются из БД при первом запросе)
+suggest_cache = SuggestCache(lambda user_id: get_words_for_suggest(user_id), max_users=SUGGEST_CACHE_USERS)
 
 
 # = СИСТЕМА СОСТОЯНИЙ (Finite State Machine) =
@@ -170,6 +327,11 @@ class WordsViewState(StatesGroup):
     viewing_words = State()
 
 
+class QuizState(StatesGroup):
+    """Состояние теста /quiz (вопросы раунда и счет - в данных состояния)"""
+    answering = State()
+
+
 class EditState(StatesGroup):
     """
     Состояния для процесса редактирования слова:
@@ -186,8 +348,41 @@ class EditState(StatesGroup):
 # Каждый пользователь имеет свою базу данных SQLite в папке dbs
 
 async def init_db():
-    global db_pool
+    global db_pool, replica_pool, read_router, write_batcher
     try:
+        # Схема - на отдельном соединении без срока запроса (первое создание индексов на большой таблице)
+        conn = await asyncpg.connect(
+            host=POSTGRES_HOST,
+            port=POSTGRES_PORT,
+            user=POSTGRES_USER,
+            password=POSTGRES_PASSWORD,
+            database=POSTGRES_DB
+        )
+        try:
+            # Таблицы слов в выбранной схеме (в схеме lexemes words - представление)
+            await word_schema.ensure_schema(conn, WORDS_SCHEMA, WORDS_PARTITIONS)
+            # Журнал изменений для синхронизации WebApp
+            # (при первом создании в него заносятся уже существующие слова)
+            changes_exist = await conn.fetchval("SELECT to_regclass('word_changes') IS NOT NULL")
+            await conn.execute(WORD_CHANGES_DDL)
+            if not changes_exist:
+                await conn.execute(
+                    """INSERT INTO word_changes (user_id, word, version)
+                    SELECT user_id, word, nextval('word_changes_version_seq') FROM words
+                    ON CONFLICT DO NOTHING"""
+                )
+            # Счетчики статистики (при первом создании - пересчет по существующим словам)
+            stats_exist = await conn.fetchval("SELECT to_regclass('word_stats') IS NOT NULL")
+            await conn.execute(word_stats.DDL)
+            if not stats_exist:
+                async with conn.transaction():
+                    await word_stats.rebuild(conn)
+            # Таблица расписания напоминаний
+            await conn.execute(REMINDERS_DDL)
+        finally:
+            await conn.close()
+        # Запросы пулов ограничены DB_QUERY_TIMEOUT: зависшая база не держит обработчики
+        # (долгие служебные запросы - схема выше и сверка статистики - со своим пределом)
         db_pool = await asyncpg.create_pool(
             host=POSTGRES_HOST,
             port=POSTGRES_PORT,
@@ -195,92 +390,330 @@ async def init_db():
             password=POSTGRES_PASSWORD,
             database=POSTGRES_DB,
             min_size=5,
-            max_size=20
+            max_size=20,
+            command_timeout=DB_QUERY_TIMEOUT
         )
-        async with db_pool.acquire() as conn:
-            await conn.execute("""
-            CREATE TABLE IF NOT EXISTS words (
-            id SERIAL PRIMARY KEY,
-            user_id BIGINT NOT NULL,
-            word TEXT NOT NULL,
-            part_of_speech TEXT NOT NULL,
-            translation TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT NOW(),
-            UNIQUE (user_id, word)
-        );
-    """)
+        if POSTGRES_REPLICA_HOST:
+            replica_pool = await asyncpg.create_pool(
+                host=POSTGRES_REPLICA_HOST,
+                port=POSTGRES_REPLICA_PORT,
+                user=POSTGRES_REPLICA_USER,
+                password=POSTGRES_REPLICA_PASSWORD,
+                database=POSTGRES_DB,
+                min_size=5,
+                max_size=20,
+                command_timeout=DB_QUERY_TIMEOUT
+            )
+            logging.info("Read replica pool created for %s:%s", POSTGRES_REPLICA_HOST, POSTGRES_REPLICA_PORT)
+        read_router = ReadRouter(db_pool, replica_pool, READ_YOUR_WRITES_WINDOW, REPLICA_LAG_CHECK_INTERVAL)
+        read_router.start()
+        if WRITE_BATCHING:
+            write_batcher = WriteBatcher(
+                db_pool, WRITE_BATCH_MAX, WRITE_BATCH_DELAY, WRITE_BATCH_WORKERS, acquire_timeout=DB_ACQUIRE_TIMEOUT,
+                prepare=word_schema.insert_shared if WORDS_SCHEMA == "lexemes" else None
+            )
+            write_batcher.start()
         logging.info("Database initialized successfully")
     except Exception as e:
-        logging.critical(f"Database initialization failed: {e}")
+        logging.critical("Database initialization failed: %s", e)
         raise
 
 
 async def close_db():
     """Закрытие пула соединений"""
-    global db_pool
+    global write_batcher
+    if write_batcher:
+        # Дописываем принятые изменения до закрытия пула
+        await write_batcher.stop()
+        write_batcher = None
+    if read_router:
+        await read_router.stop()
+    if replica_pool:
+        await replica_pool.close()
     if db_pool:
         await db_pool.close()
 
-# Обновленные функции работы с БД
-async def get_words_from_db(user_id: int) -> List[Tuple[str, str, str]]:
-    async with db_pool.acquire() as conn:
-        rows = await conn.fetch(
-            "SELECT word, part_of_speech, translation FROM words WHERE user_id = $1 ORDER BY word",
-            user_id
-        )
-        return [(row['word'], row['part_of_speech'], row['translation']) for row in rows]
+# Журнал изменений словаря для синхронизации WebApp (/api/words/changes)
+# Одна строка на слово: последняя операция над ним и ее версия. Версии берутся из общей
+# последовательности, поэтому монотонны; удаления остаются «надгробиями», так что журнал
+# ограничен числом когда-либо существовавших слов пользователя
+WORD_CHANGES_DDL = """
+CREATE SEQUENCE IF NOT EXISTS word_changes_version_seq;
+CREATE TABLE IF NOT EXISTS word_changes (
+    user_id BIGINT NOT NULL,
+    word TEXT NOT NULL,
+    version BIGINT NOT NULL,
+    deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (user_id, word)
+);
+CREATE INDEX IF NOT EXISTS word_changes_user_version ON word_changes (user_id, version);
+"""
 
-async def delete_word_from_db(user_id: int, word: str) -> bool:
-    async with db_pool.acquire() as conn:
+
+async def _lock_user(conn, user_id: int):
+    """
+    Блокировка словаря пользователя до конца транзакции (в начале каждого изменения)
+    - журнал: транзакции с меньшей версией фиксируются раньше, и клиент,
+      прочитавший версию N, не пропустит изменение < N
+    - статистика: прежнее состояние слова, прочитанное под блокировкой, не устареет
+      до изменения счетчиков; сверка (word_stats.rebuild) берет ту же блокировку
+    """
+    await conn.execute("SELECT pg_advisory_xact_lock($1)", user_id)
+
+
+async def _word_before_change(conn, user_id: int, word: str):
+    """Часть речи и время добавления слова до изменения (None - слова нет)"""
+    return await conn.fetchrow(
+        "SELECT part_of_speech, created_at FROM words WHERE user_id = $1 AND word = $2",
+        user_id, word
+    )
+
+
+async def _record_change(conn, user_id: int, word: str, deleted: bool = False):
+    """Записывает изменение слова в журнал (внутри транзакции изменения, под _lock_user)"""
+    await conn.execute(
+        """INSERT INTO word_changes (user_id, word, version, deleted)
+        VALUES ($1, $2, nextval('word_changes_version_seq'), $3)
+        ON CONFLICT (user_id, word) DO UPDATE SET version = EXCLUDED.version, deleted = EXCLUDED.deleted""",
+        user_id, word, deleted
+    )
+    if LIVE_UPDATES_NOTIFY:
+        # Уведомление доставляется всем процессам только после фиксации транзакции
+        await conn.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, notify_payload(user_id))
+
+
+def _on_remote_change(user_id: Optional[int]):
+    """Изменение из другого процесса (None - могли пропустить любые): сбрасываем локальные кеши"""
+    suggest_cache.invalidate(user_id)
+    word_snapshots.forget(user_id)
+    # Следующие чтения - с основного сервера: реплика могла еще не получить изменение
+    read_router.wrote(user_id)
+
+
+def _publish_change(user_id: int):
+    """Будит открытые WebApp пользователя (вызывать после фиксации транзакции)"""
+    # С LISTEN/NOTIFY подписчиков будит PgChangeListener, в том числе в этом процессе
+    if not LIVE_UPDATES_NOTIFY:
+        change_broker.publish(user_id)
+
+
+# Изменения внутри уже открытой транзакции (conn.transaction()) - вместе с журналом изменений
+# и счетчиками статистики
+
+async def _delete_word_tx(conn, user_id: int, word: str) -> bool:
+    await _lock_user(conn, user_id)
+    before = await _word_before_change(conn, user_id, word)
+    if WORDS_SCHEMA == "lexemes":
+        result = await word_schema.delete_word(conn, user_id, word)
+    else:
         result = await conn.execute(
             "DELETE FROM words WHERE user_id = $1 AND word = $2",
             user_id, word
         )
-        return "DELETE" in result
+    if result != "DELETE 0":
+        if before is not None:
+            await word_stats.word_removed(conn, user_id, before['part_of_speech'], before['created_at'])
+        await _record_change(conn, user_id, word, deleted=True)
+    return "DELETE" in result
+
+async def _update_word_tx(conn, user_id: int, old_word: str, new_word: str, pos: str, value: str) -> bool:
+    # Если слово изменилось
+    if old_word != new_word:
+        await _delete_word_tx(conn, user_id, old_word)
+        await _add_word_tx(conn, user_id, new_word, pos, value)
+        return True
+    await _lock_user(conn, user_id)
+    before = await _word_before_change(conn, user_id, new_word)
+    if WORDS_SCHEMA == "lexemes":
+        result = await word_schema.update_word(conn, user_id, new_word, pos, value)
+    else:
+        result = await conn.execute(
+            """UPDATE words 
+            SET part_of_speech = $1, translation = $2 
+            WHERE user_id = $3 AND word = $4""",
+            pos, value, user_id, new_word
+        )
+    if result != "UPDATE 0":
+        if before is not None:
+            await word_stats.pos_changed(conn, user_id, before['part_of_speech'], pos)
+        await _record_change(conn, user_id, new_word)
+    return "UPDATE" in result
+
+async def _add_word_tx(conn, user_id: int, word: str, pos: str, value: str):
+    await _lock_user(conn, user_id)
+    if WORDS_SCHEMA == "lexemes":
+        await word_schema.insert_word(conn, user_id, word, pos, value)
+    else:
+        await conn.execute(
+            "INSERT INTO words (user_id, word, part_of_speech, translation) VALUES ($1, $2, $3, $4)",
+            user_id, word, pos, value
+        )
+    await word_stats.word_added(conn, user_id, pos)
+    await _record_change(conn, user_id, word)
+
+
+async def _write(user_id: int, operation: Callable[[Any], Awaitable[Any]],
+                 shared: Sequence[Tuple[str, str, str]] = ()) -> Any:
+    """
+    Выполняет изменение operation(conn) в транзакции на основном сервере и возвращает его результат
+    С WRITE_BATCHING - в общей транзакции пачки (write_batcher), иначе - в своей
+    shared - (слово, часть речи, перевод), для которых operation может создать общие строки схемы lexemes
+    Возврат - после фиксации: дальше можно обновлять кеши и будить WebApp
+    """
+    if write_batcher:
+        async with db_breaker.guard():
+            return await write_batcher.submit(user_id, operation, shared)
+    async with db_breaker.acquire(db_pool) as conn:
+        async with conn.transaction():
+            return await operation(conn)
+
+
+async def _read(user_id: int, query: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    Выполняет чтение query(conn) на сервере, который выбрал read_router, и возвращает его результат
+    Недоступная реплика (ее выключатель разомкнут или сбой соединения) - чтение повторяется на основном сервере
+    """
+    pool = read_router.pool_for(user_id)
+    if pool is not db_pool:
+        try:
+            async with replica_breaker.acquire(pool) as conn:
+                return await query(conn)
+        except DatabaseUnavailable:
+            pass
+    async with db_breaker.acquire(db_pool) as conn:
+        return await query(conn)
+
+
+# Обновленные функции работы с БД
+async def get_words_or_snapshot(user_id: int) -> Tuple[List[Tuple[str, str, str]], bool]:
+    """
+    Словарь пользователя; при недоступной базе - последний прочитанный снимок (если есть)
+    Второе значение - True, если слова взяты из снимка (выключатель при этом может быть еще замкнут)
+    """
+    try:
+        rows = await _read(user_id, lambda conn: conn.fetch(
+            "SELECT word, part_of_speech, translation FROM words WHERE user_id = $1 ORDER BY word",
+            user_id
+        ))
+    except DatabaseUnavailable:
+        words = word_snapshots.get(user_id)
+        if words is None:
+            raise
+        return words, True
+    words = [(row['word'], row['part_of_speech'], row['translation']) for row in rows]
+    word_snapshots.put(user_id, words)
+    return words, False
+
+
+async def get_words_from_db(user_id: int) -> List[Tuple[str, str, str]]:
+    """Словарь пользователя; при недоступной базе - последний прочитанный снимок (если есть)"""
+    words, _ = await get_words_or_snapshot(user_id)
+    return words
+
+async def get_words_for_suggest(user_id: int) -> List[Tuple[str, str, str, int]]:
+    """Слова для индекса автодополнения; ранг - версия последнего изменения слова"""
+    rows = await _read(user_id, lambda conn: conn.fetch(
+        """SELECT w.word, w.part_of_speech, w.translation, COALESCE(c.version, 0) AS version
+        FROM words w
+        LEFT JOIN word_changes c ON c.user_id = w.user_id AND c.word = w.word
+        WHERE w.user_id = $1""",
+        user_id
+    ))
+    return [(row['word'], row['part_of_speech'], row['translation'], row['version']) for row in rows]
+
+async def delete_word_from_db(user_id: int, word: str) -> bool:
+    deleted = await _write(user_id, lambda conn: _delete_word_tx(conn, user_id, word))
+    read_router.wrote(user_id)
+    word_snapshots.forget(user_id)
+    suggest_cache.word_deleted(user_id, word)
+    _publish_change(user_id)
+    return deleted
 
 async def update_word_in_db(user_id: int, old_word: str, new_word: str, pos: str, value: str) -> bool:
-    async with db_pool.acquire() as conn:
-        # Если слово изменилось
+    updated = await _write(
+        user_id, lambda conn: _update_word_tx(conn, user_id, old_word, new_word, pos, value), [(new_word, pos, value)]
+    )
+    read_router.wrote(user_id)
+    word_snapshots.forget(user_id)
+    if updated:
         if old_word != new_word:
-            await conn.execute(
-                "DELETE FROM words WHERE user_id = $1 AND word = $2",
-                user_id, old_word
-            )
-            await conn.execute(
-                "INSERT INTO words (user_id, word, part_of_speech, translation) VALUES ($1, $2, $3, $4)",
-                user_id, new_word, pos, value
-            )
-            return True
-        else:
-            result = await conn.execute(
-                """UPDATE words 
-                SET part_of_speech = $1, translation = $2 
-                WHERE user_id = $3 AND word = $4""",
-                pos, value, user_id, new_word
-            )
-            return "UPDATE" in result
+            suggest_cache.word_deleted(user_id, old_word)
+        suggest_cache.word_added(user_id, new_word, pos, value)
+    _publish_change(user_id)
+    return updated
 
 async def add_word_to_db(user_id: int, word: str, pos: str, value: str) -> bool:
     if value is None:
         value = ""
-    async with db_pool.acquire() as conn:
-        try:
-            await conn.execute(
-                "INSERT INTO words (user_id, word, part_of_speech, translation) VALUES ($1, $2, $3, $4)",
-                user_id, word, pos, value
+    try:
+        await _write(user_id, lambda conn: _add_word_tx(conn, user_id, word, pos, value), [(word, pos, value)])
+    except DatabaseUnavailable:
+        # Ответ пользователю - в database_unavailable_handler
+        raise
+    except Exception as e:
+        logging.error("Database error: %s", e)
+        return False
+    read_router.wrote(user_id)
+    word_snapshots.forget(user_id)
+    suggest_cache.word_added(user_id, word, pos, value)
+    _publish_change(user_id)
+    return True
+
+async def get_word_changes(user_id: int, since: int) -> Dict[str, Any]:
+    """
+    Изменения словаря после версии since
+    Полный снимок, если клиент синхронизируется впервые (since=0)
+    или его версия из другого журнала (больше текущей)
+    """
+    async def query(conn):
+        # Версия и данные читаются из одного снимка базы
+        async with conn.transaction(isolation='repeatable_read', readonly=True):
+            version = await conn.fetchval(
+                "SELECT COALESCE(MAX(version), 0) FROM word_changes WHERE user_id = $1",
+                user_id
             )
-            return True
-        except Exception as e:
-            logging.error(f"Database error: {e}")
-            return False
-
-async def check_word_exists(user_id: int, word: str) -> bool:
-    async with db_pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT 1 FROM words WHERE user_id = $1 AND word = $2 LIMIT 1",
-            user_id, word
-        )
-        return row is not None
+            if since <= 0 or since > version:
+                rows = await conn.fetch(
+                    "SELECT word, part_of_speech, translation FROM words WHERE user_id = $1 ORDER BY word",
+                    user_id
+                )
+                return {
+                    'version': version,
+                    'full': True,
+                    'upserts': [
+                        {'word': row['word'], 'part_of_speech': row['part_of_speech'], 'translation': row['translation']}
+                        for row in rows
+                    ],
+                    'deletes': [],
+                }
+            rows = await conn.fetch(
+                """SELECT c.word, c.deleted, w.part_of_speech, w.translation
+                FROM word_changes c
+                LEFT JOIN words w ON w.user_id = c.user_id AND w.word = c.word
+                WHERE c.user_id = $1 AND c.version > $2
+                ORDER BY c.version""",
+                user_id, since
+            )
+        upserts, deletes = [], []
+        for row in rows:
+            if row['deleted'] or row['part_of_speech'] is None:
+                deletes.append(row['word'])
+            else:
+                upserts.append({'word': row['word'], 'part_of_speech': row['part_of_speech'], 'translation': row['translation']})
+        return {'version': version, 'full': False, 'upserts': upserts, 'deletes': deletes}
+
+    return await _read(user_id, query)
+
+async def check_word_exists(user_id: int, word: str, exclude: Optional[str] = None) -> bool:
+    """
+    Есть ли в словаре такое слово без учета регистра и формы Unicode (один запрос по индексу)
+    - exclude: слово, которое не считается дубликатом (переименовываемое слово)
+    """
+    return await _read(user_id, lambda conn: conn.fetchval(word_schema.WORD_EXISTS_SQL, user_id, word, exclude))
+
+async def get_stats_from_db(user_id: int) -> word_stats.WordStats:
+    """Статистика словаря из счетчиков (не зависит от размера словаря)"""
+    return await _read(user_id, lambda conn: word_stats.get_stats(conn, user_id))
 
 
 # = ОСНОВНЫЕ ОБРАБОТЧИКИ БОТА-СЛОВАРЯ =
@@ -294,7 +727,10 @@ async def show_dictionary(message: Message, state: FSMContext):
     # Получаем ID пользователя
     user_id = message.from_user.id
     # Загружаем все слова из базы
-    words = await get_words_from_db(user_id)
+    words, from_snapshot = await get_words_or_snapshot(user_id)
+    # База недоступна - слова из сохраненной копии
+    if from_snapshot:
+        await message.answer(DB_SNAPSHOT_NOTICE)
 
     # Если слов нет - сообщаем об этом
     if not words:
@@ -315,6 +751,47 @@ async def show_dictionary(message: Message, state: FSMContext):
     await state.set_state(WordsViewState.viewing_words)
 
 
+# = ОТРИСОВКА БЕЗ ЛИШНИХ ЗАПРОСОВ К TELEGRAM =
+# Подпись того, что сейчас показано в сообщении: (chat_id, message_id) -> хеш текста и клавиатуры
+# Если новое содержимое совпадает с показанным - edit_text не вызываем
+# (иначе Telegram отвечает ошибкой "message is not modified")
+RENDERED_CACHE_SIZE = 50_000
+_rendered: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+
+
+def _render_signature(text: str, reply_markup: Optional[InlineKeyboardMarkup]) -> int:
+    """Хеш текста и клавиатуры сообщения"""
+    return hash((text, serialize_keyboard(reply_markup)))
+
+
+def _remember_render(message: Message, signature: int):
+    """Запоминает, что показано в сообщении (с ограничением размера кеша)"""
+    key = (message.chat.id, message.message_id)
+    _rendered[key] = signature
+    _rendered.move_to_end(key)
+    if len(_rendered) > RENDERED_CACHE_SIZE:
+        _rendered.popitem(last=False)
+
+
+async def edit_message(message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None) -> bool:
+    """
+    Редактирует сообщение бота-словаря, только если содержимое изменилось
+    Все правки сообщений бота-словаря идут через эту функцию, чтобы кеш показанного был точным
+    Возвращает True, если запрос к Telegram действительно был отправлен
+    """
+    signature = _render_signature(text, reply_markup)
+    if _rendered.get((message.chat.id, message.message_id)) == signature:
+        return False
+    try:
+        await message.edit_text(text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    except TelegramBadRequest as e:
+        # Содержимое совпало (например, кеш потерян после рестарта) - это не ошибка
+        if "message is not modified" not in str(e):
+            raise
+    _remember_render(message, signature)
+    return True
+
+
 async def show_current_word(message: Message, state: FSMContext, edit: bool = False, full_info: bool = False):
     """
     Показывает текущее слово с навигацией
@@ -340,112 +817,116 @@ async def show_current_word(message: Message, state: FSMContext, edit: bool = Fa
     # Извлекаем данные текущего слова
     word, pos, value = words[current_index]
 
-    # Форматируем сообщение с HTML-разметкой
-    if full_info:
-        # = РЕЖИМ ПОЛНОЙ ИНФОРМАЦИИ =
-        text = (
-            f"📖 <b>Полная информация:</b> {word}\n"
-            f"🔢 <b>Номер слова:</b> {current_index + 1} out of {len(words)}\n"
-            f"🔤 <b>Часть речи:</b> {pos}\n"
-        )
-        # Если есть значение слова - добавляем его полностью
-        if value:
-            text += f"💡 <b>Детальное значение:</b>\n{value}\n"
-
-        # Клавиатура только с кнопкой возврата
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="go_back")]
-        ])
-    else:
-        # === СТАНДАРТНЫЙ РЕЖИМ (СОКРАЩЕННАЯ ИНФОРМАЦИЯ) ===
-        text = (
-            # Заголовок с выравниванием
-            f"📖 <b>Слово</b>: {word}\n"
-            f"🔢 <b>Номер слова:</b> {current_index + 1} out of {len(words)}\n"
-            f"🔤 <b>Часть речи слова:</b> {pos}\n"
-        )
-        # Если есть значение - добавляем его (сокращаем если слишком длинное)
-        if value:
-            # Берем первые 50 символов или полное значение если оно короче
-            shortened_value = value[:23] + '...' if len(value) > 23 else value
-            text += f"💡 <b>Краткое значение:</b> {shortened_value}"
-
-        # Создаем клавиатуру с кнопками действий
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            # Кнопка показа полной информации
-            [InlineKeyboardButton(text="ℹ️ Инфо", callback_data="show_info")],
-            # Кнопки навигации: предыдущее и следующее слово
-            [
-                InlineKeyboardButton(text="⬅️", callback_data="prev_word"),
-                InlineKeyboardButton(text="➡️", callback_data="next_word")
-            ],
-            # Кнопки навигации по буквам
-            [
-                InlineKeyboardButton(text="⬆️ Буква", callback_data="prev_letter"),
-                InlineKeyboardButton(text="Буква ⬇️", callback_data="next_letter")
-            ],
-            # Кнопки действий: редактирование и удаление
-            [
-                InlineKeyboardButton(text="✏️ Изменить", callback_data="edit_word"),
-                InlineKeyboardButton(text="🗑️ Удалить", callback_data="delete_word")
-            ],
-            # Кнопка отмены/выхода
-            [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel_words")]
-        ])
+    # Текст из шаблона и готовая клавиатура (полная информация или краткая карточка)
+    text, keyboard = render_word_card(word, pos, value, current_index, len(words), full_info)
 
     # Отправляем или редактируем сообщение
     if edit:
-        # Редактируем существующее сообщение
-        await message.edit_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+        # Редактируем существующее сообщение (если содержимое изменилось)
+        await edit_message(message, text, reply_markup=keyboard)
     else:
-        # Отправляем новое сообщение
-        await message.answer(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+        # Отправляем новое сообщение и запоминаем, что в нем показано
+        sent = await message.answer(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+        _remember_render(sent, _render_signature(text, keyboard))
 
 
 # = ОБРАБОТЧИКИ КНОПОК НАВИГАЦИИ =
+# Быстрые нажатия навигации сливаются: пока сообщение перерисовывается,
+# новые нажатия только сдвигают целевую позицию, а отрисовывается последняя из них
+
+# Последняя запрошенная позиция в сообщении /list: (user_id, message_id) -> (индекс слова, буква)
+# У пользователя может быть открыто несколько списков - нажатия в одном не сдвигают другой
+_nav_targets: Dict[Tuple[int, int], Tuple[int, str]] = {}
+# Сообщения, которые сейчас перерисовываются
+_nav_rendering: Set[Tuple[int, int]] = set()
+
+
+def _nav_key(callback: CallbackQuery) -> Tuple[int, int]:
+    return callback.from_user.id, callback.message.message_id
+
+
+def _nav_position(callback: CallbackQuery, data: Dict[str, Any]) -> Tuple[int, str]:
+    """Текущая позиция с учетом еще не отрисованных нажатий"""
+    return _nav_targets.get(_nav_key(callback)) or (data.get("current_index", 0), data.get("current_letter", 'A'))
+
 
-@router_dict.callback_query(F.data == "prev_word", WordsViewState.viewing_words)
+def _word_letters(words) -> List[str]:
+    """Уникальные первые буквы всех слов"""
+    return sorted(set(
+        word[0][0].upper()
+        for word in words
+        if word[0] and len(word[0]) > 0  # Проверка что слово не пустое
+    ))
+
+
+def _first_index_of_letter(words, letter: str) -> int:
+    """Индекс первого слова на букву (0 если не нашли)"""
+    return next((
+        i for i, word in enumerate(words)
+        if word[0] and word[0][0].upper() == letter
+    ), 0)
+
+
+async def navigate_to(callback: CallbackQuery, state: FSMContext, index: int, letter: str):
+    """
+    Переходит к позиции (index, letter) с слиянием быстрых нажатий
+    Если это сообщение уже перерисовывается - отрисовка подхватит новую позицию сама
+    """
+    key = _nav_key(callback)
+    _nav_targets[key] = (index, letter)
+    # Подтверждаем нажатие сразу (убираем часики на кнопке)
+    await callback.answer()
+
+    if key in _nav_rendering:
+        return
+
+    _nav_rendering.add(key)
+    try:
+        while True:
+            index, letter = _nav_targets[key]
+            await state.update_data(current_index=index, current_letter=letter)
+            await show_current_word(callback.message, state, edit=True)
+            # Пока рисовали, новых нажатий не было - готово
+            if _nav_targets.get(key) == (index, letter):
+                break
+    finally:
+        _nav_rendering.discard(key)
+        _nav_targets.pop(key, None)
+
+
+@dict_action(DictAction.PREV_WORD, WordsViewState.viewing_words)
 async def prev_word_handler(callback: CallbackQuery, state: FSMContext):
     """Обработчик кнопки 'Предыдущее слово'"""
     # Получаем данные из состояния
     data = await state.get_data()
-    current_index = data.get("current_index", 0)
+    current_index, current_letter = _nav_position(callback, data)
 
-    # Если это не первое слово
-    if current_index > 0:
-        # Уменьшаем индекс на 1
-        await state.update_data(current_index=current_index - 1)
-        # Показываем предыдущее слово (редактируем текущее сообщение)
-        await show_current_word(callback.message, state, edit=True)
-    else:
-        # Если это первое слово - показываем подсказку
+    # Если это первое слово - показываем подсказку
+    if current_index <= 0:
         await callback.answer("You're at the first word")
+        return
 
-    # Подтверждаем обработку callback
-    await callback.answer()
+    # Показываем предыдущее слово (редактируем текущее сообщение)
+    await navigate_to(callback, state, current_index - 1, current_letter)
 
 
-@router_dict.callback_query(F.data == "next_word", WordsViewState.viewing_words)
+@dict_action(DictAction.NEXT_WORD, WordsViewState.viewing_words)
 async def next_word_handler(callback: CallbackQuery, state: FSMContext):
     """Обработчик кнопки 'Следующее слово'"""
     data = await state.get_data()
     words = data.get("words", [])
-    current_index = data.get("current_index", 0)
+    current_index, current_letter = _nav_position(callback, data)
 
-    # Если это не последнее слово
-    if current_index < len(words) - 1:
-        # Увеличиваем индекс на 1
-        await state.update_data(current_index=current_index + 1)
-        # Показываем следующее слово
-        await show_current_word(callback.message, state, edit=True)
-    else:
-        # Если это последнее слово - показываем подсказку
+    # Если это последнее слово - показываем подсказку
+    if current_index >= len(words) - 1:
         await callback.answer("You're at the last word")
+        return
 
-    await callback.answer()
+    # Показываем следующее слово
+    await navigate_to(callback, state, current_index + 1, current_letter)
 
 
-@router_dict.callback_query(F.data == "prev_letter", WordsViewState.viewing_words)
+@dict_action(DictAction.PREV_LETTER, WordsViewState.viewing_words)
 async def prev_letter_handler(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик кнопки 'Предыдущая буква'
@@ -453,49 +934,26 @@ async def prev_letter_handler(callback: CallbackQuery, state: FSMContext):
     """
     data = await state.get_data()
     words = data.get("words", [])
-    current_index = data.get("current_index", 0)
-    current_letter = data.get("current_letter", 'A')
-
-    # Получаем уникальные первые буквы всех слов
-    letters = sorted(set(
-        word[0][0].upper()
-        for word in words
-        if word[0] and len(word[0]) > 0  # Проверка что слово не пустое
-    ))
+    _, current_letter = _nav_position(callback, data)
 
+    letters = _word_letters(words)
     # Если нет букв - сообщаем об этом
     if not letters:
         await callback.answer("No letters found")
         return
 
     try:
-        # Находим текущую позицию буквы в списке
-        current_pos = letters.index(current_letter)
-        # Вычисляем новую позицию (не меньше 0)
-        new_pos = max(0, current_pos - 1)
-        # Берем букву по новой позиции
-        new_letter = letters[new_pos]
+        # Находим текущую позицию буквы и берем предыдущую (не меньше 0)
+        new_letter = letters[max(0, letters.index(current_letter) - 1)]
     except ValueError:
         # Если текущей буквы нет в списке - берем первую
         new_letter = letters[0]
 
-    # Ищем первое слово с новой буквой
-    new_index = next((
-        i for i, word in enumerate(words)
-        if word[0] and word[0][0].upper() == new_letter
-    ), 0)  # Если не нашли - начинаем с 0
+    # Показываем первое слово на новую букву
+    await navigate_to(callback, state, _first_index_of_letter(words, new_letter), new_letter)
 
-    # Обновляем состояние
-    await state.update_data(
-        current_index=new_index,
-        current_letter=new_letter
-    )
-    # Показываем новое слово
-    await show_current_word(callback.message, state, edit=True)
-    await callback.answer()
 
-
-@router_dict.callback_query(F.data == "next_letter", WordsViewState.viewing_words)
+@dict_action(DictAction.NEXT_LETTER, WordsViewState.viewing_words)
 async def next_letter_handler(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик кнопки 'Следующая буква'
@@ -503,47 +961,25 @@ async def next_letter_handler(callback: CallbackQuery, state: FSMContext):
     """
     data = await state.get_data()
     words = data.get("words", [])
-    current_index = data.get("current_index", 0)
-    current_letter = data.get("current_letter", 'A')
-
-    # Получаем уникальные первые буквы всех слов
-    letters = sorted(set(
-        word[0][0].upper()
-        for word in words
-        if word[0] and len(word[0]) > 0
-    ))
+    _, current_letter = _nav_position(callback, data)
 
+    letters = _word_letters(words)
     if not letters:
         await callback.answer("No letters found")
         return
 
     try:
-        # Находим текущую позицию буквы
-        current_pos = letters.index(current_letter)
-        # Вычисляем новую позицию (не больше длины списка)
-        new_pos = min(len(letters) - 1, current_pos + 1)
-        new_letter = letters[new_pos]
+        # Находим текущую позицию буквы и берем следующую (не больше длины списка)
+        new_letter = letters[min(len(letters) - 1, letters.index(current_letter) + 1)]
     except ValueError:
         # Если текущей буквы нет - берем последнюю
         new_letter = letters[-1]
 
-    # Ищем первое слово с новой буквой
-    new_index = next((
-        i for i, word in enumerate(words)
-        if word[0] and word[0][0].upper() == new_letter
-    ), 0)
-
-    # Обновляем состояние
-    await state.update_data(
-        current_index=new_index,
-        current_letter=new_letter
-    )
-    # Показываем новое слово
-    await show_current_word(callback.message, state, edit=True)
-    await callback.answer()
+    # Показываем первое слово на новую букву
+    await navigate_to(callback, state, _first_index_of_letter(words, new_letter), new_letter)
 
 
-@router_dict.callback_query(F.data == "cancel_words", WordsViewState.viewing_words)
+@dict_action(DictAction.CANCEL_WORDS, WordsViewState.viewing_words)
 async def cancel_words_handler(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик кнопки 'Отмена'
@@ -556,7 +992,7 @@ async def cancel_words_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router_dict.callback_query(F.data == "delete_word", WordsViewState.viewing_words)
+@dict_action(DictAction.DELETE_WORD, WordsViewState.viewing_words)
 async def delete_word_handler(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик кнопки 'Удалить слово'
@@ -607,7 +1043,7 @@ async def delete_word_handler(callback: CallbackQuery, state: FSMContext):
         await callback.answer(f"❌ Что-то пошло не так {word}")
 
 
-@router_dict.callback_query(F.data == "edit_word", WordsViewState.viewing_words)
+@dict_action(DictAction.EDIT_WORD, WordsViewState.viewing_words)
 async def start_edit_word(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик кнопки 'Редактировать'
@@ -636,78 +1072,51 @@ async def start_edit_word(callback: CallbackQuery, state: FSMContext):
         original_value=value  # Оригинальное значение
     )
 
-    # Создаем клавиатуру выбора поля для редактирования
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            # Кнопки выбора что редактировать
-            InlineKeyboardButton(text="✏️ Слово", callback_data="edit_word_text"),
-            InlineKeyboardButton(text="💡 Значение", callback_data="edit_word_value")
-        ],
-        [
-            InlineKeyboardButton(text="🔤 Часть речи", callback_data="edit_word_pos")
-        ],
-        # Кнопка возврата
-        [InlineKeyboardButton(text="↩️ Назад", callback_data="cancel_edit")]
-    ])
-
-    # Редактируем сообщение для показа меню редактирования
-    await callback.message.edit_text(
-        f"✏️ <b>Редактирование:</b> {word}\n"
-        f"🔤 <b>Текущая часть речи:</b> {pos}\n"
-        f"💡 <b>Текущее значение:</b> {value or 'None'}\n\n"
-        "Выберите, что отредактировать:",
-        reply_markup=keyboard,
-        parse_mode=ParseMode.HTML
-    )
+    # Показываем меню выбора поля для редактирования
+    text, keyboard = render_edit_menu(word, pos, value)
+    await edit_message(callback.message, text, reply_markup=keyboard)
     # Переводим пользователя в состояние редактирования
     await state.set_state(EditState.waiting_edit_word)
 
 
-@router_dict.callback_query(F.data.startswith("edit_word_"), EditState.waiting_edit_word)
-async def handle_edit_choice(callback: CallbackQuery, state: FSMContext):
+@dict_action(DictAction.EDIT_FIELD, EditState.waiting_edit_word)
+async def handle_edit_choice(callback: CallbackQuery, state: FSMContext, callback_data: DictCallback):
     """
     Обработчик выбора поля для редактирования
     Определяет какое поле выбрал пользователь
     """
     # Извлекаем тип редактирования из callback_data
-    edit_type = callback.data.replace("edit_word_", "")
+    edit_type = callback_data.arg
     data = await state.get_data()
     word = data.get("editing_word", "")
 
     # В зависимости от выбранного поля
     if edit_type == "text":
         # Запрашиваем новый текст слова
-        await callback.message.edit_text(f"✏️ Введите новое слово для <b>{word}</b>:", parse_mode=ParseMode.HTML)
+        await edit_message(callback.message, f"✏️ Введите новое слово для <b>{word}</b>:")
         # Остаемся в том же состоянии (waiting_edit_word)
         await state.set_state(EditState.waiting_edit_word)
     elif edit_type == "value":
         # Запрашиваем новое значение
-        await callback.message.edit_text(f"💡 Введите новое значение для <b>{word}</b>:", parse_mode=ParseMode.HTML)
+        await edit_message(callback.message, f"💡 Введите новое значение для <b>{word}</b>:")
         # Переводим в состояние ожидания значения
         await state.set_state(EditState.waiting_edit_value)
     elif edit_type == "pos":
         # Показываем клавиатуру выбора части речи
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="Noun", callback_data="newpos_noun"),
-             InlineKeyboardButton(text="Verb", callback_data="newpos_verb")],
-            [InlineKeyboardButton(text="Adjective", callback_data="newpos_adjective"),
-             InlineKeyboardButton(text="Adverb", callback_data="newpos_adverb")],
-            [InlineKeyboardButton(text="↩️ Назад", callback_data="cancel_edit")]
-        ])
-        await callback.message.edit_text(
-            f"🔤 Выберите новую часть речи для <b>{word}</b>:",
-            reply_markup=keyboard,
-            parse_mode=ParseMode.HTML
-        )
+        text, keyboard = render_edit_pos_prompt(word)
+        await edit_message(callback.message, text, reply_markup=keyboard)
         # Переводим в состояние ожидания части речи
         await state.set_state(EditState.waiting_edit_pos)
 
     await callback.answer()
 
 
-@router_dict.callback_query(F.data == "cancel_edit", EditState.waiting_edit_word)
-@router_dict.callback_query(F.data == "cancel_edit", EditState.waiting_edit_value)
-@router_dict.callback_query(F.data == "cancel_edit", EditState.waiting_edit_pos)
+@dict_action(
+    DictAction.CANCEL_EDIT,
+    EditState.waiting_edit_word,
+    EditState.waiting_edit_value,
+    EditState.waiting_edit_pos
+)
 async def cancel_edit_handler(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик кнопки 'Назад' в режиме редактирования
@@ -720,7 +1129,7 @@ async def cancel_edit_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router_dict.callback_query(F.data == "show_info", WordsViewState.viewing_words)
+@dict_action(DictAction.SHOW_INFO, WordsViewState.viewing_words)
 async def show_full_info_handler(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик кнопки 'Информация'
@@ -731,7 +1140,7 @@ async def show_full_info_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router_dict.callback_query(F.data == "go_back", WordsViewState.viewing_words)
+@dict_action(DictAction.GO_BACK, WordsViewState.viewing_words)
 async def go_back_handler(callback: CallbackQuery, state: FSMContext):
     """
     Обработчик кнопки 'Назад' в режиме полной информации
@@ -751,22 +1160,21 @@ async def handle_edit_word_text(message: Message, state: FSMContext):
     Вызывается когда пользователь вводит новое слово
     """
     user_id = message.from_user.id
-    # Очищаем введенный текст
+    # Очищаем введенный текст (как при добавлении слова)
+    new_word = message.text.strip().lower()
 
     data = await state.get_data()
-    old_word = data.get("editing_word", "")
     original_word = data.get("original_word", "")
 
     # Если слово изменилось (а не только перевод или часть речи)
-    if old_word != original_word:
-        # Проверяем нет ли уже такого слова в словаре
-        words = await get_words_from_db(user_id)
-        if any(w[0].lower() == old_word.lower() for w in words):
+    if new_word != original_word:
+        # Проверяем нет ли уже такого слова в словаре (кроме самого переименовываемого)
+        if await check_word_exists(user_id, new_word, exclude=original_word):
             await message.answer("⚠️ Это слово уже существует в словаре")
             return
 
     # Обновляем данные в состоянии
-    await state.update_data(editing_word=old_word)
+    await state.update_data(editing_word=new_word)
     # Сохраняем изменения
     await save_edited_word(message, state, user_id)
 
@@ -785,14 +1193,14 @@ async def handle_edit_word_value(message: Message, state: FSMContext):
     await save_edited_word(message, state, message.from_user.id)
 
 
-@router_dict.callback_query(F.data.startswith("newpos_"), EditState.waiting_edit_pos)
-async def handle_edit_word_pos(callback: CallbackQuery, state: FSMContext):
+@dict_action(DictAction.NEW_POS, EditState.waiting_edit_pos)
+async def handle_edit_word_pos(callback: CallbackQuery, state: FSMContext, callback_data: DictCallback):
     """
     Обработчик выбора новой части речи
     Вызывается когда пользователь выбирает часть речи из кнопок
     """
     # Извлекаем часть речи из callback_data
-    new_pos = callback.data.replace("newpos_", "")
+    new_pos = callback_data.arg
     # Обновляем данные в состоянии
     await state.update_data(editing_pos=new_pos)
     # Сохраняем изменения
@@ -880,11 +1288,182 @@ async def start_command_handler(message: Message):
     )
 
 
+@router_dict.message(Command("remind"))
+async def remind_command_handler(message: Message, command: CommandObject):
+    """
+    Обработчик команды /remind
+    Включает, настраивает или выключает ежедневное напоминание:
+    /remind, /remind 20:30, /remind 20:30 Europe/Moscow, /remind off
+    """
+    if reminder_scheduler is None:
+        await message.answer("⚠️ Напоминания сейчас недоступны")
+        return
+
+    user_id = message.from_user.id
+    args = (command.args or "").split()
+
+    # Выключение напоминаний
+    if args and args[0].lower() in ("off", "stop", "выкл"):
+        async with db_breaker.guard():
+            await reminder_scheduler.disable_reminder(user_id)
+        await message.answer(REMIND_OFF)
+        return
+
+    # Время: указанное пользователем или «размазанное» по умолчанию
+    if args:
+        try:
+            remind_time = datetime.strptime(args[0], "%H:%M").time()
+        except ValueError:
+            await message.answer(REMIND_HELP, parse_mode=ParseMode.HTML)
+            return
+    else:
+        remind_time = default_remind_time(user_id)
+
+    # Часовой пояс: указанный пользователем или по умолчанию
+    timezone = parse_timezone(args[1]) if len(args) > 1 else DEFAULT_TIMEZONE
+    if timezone is None:
+        await message.answer(REMIND_HELP, parse_mode=ParseMode.HTML)
+        return
+
+    async with db_breaker.guard():
+        await reminder_scheduler.set_reminder(user_id, message.chat.id, timezone, remind_time)
+    await message.answer(
+        REMIND_ON.format(time=remind_time.strftime("%H:%M"), timezone=timezone),
+        parse_mode=ParseMode.HTML
+    )
+
+
+@router_dict.message(Command("stats"))
+async def stats_command_handler(message: Message):
+    """
+    Обработчик команды /stats
+    Показывает число слов, разбивку по частям речи и по неделям добавления
+    """
+    stats = await get_stats_from_db(message.from_user.id)
+    if not stats.total:
+        await message.answer("📭 Ваш словарь пуст. Добавьте первое слово!")
+        return
+    await message.answer(
+        render_stats(stats.total, stats.parts_of_speech, stats.weeks),
+        parse_mode=ParseMode.HTML
+    )
+
+
+# = ТЕСТ ПО СЛОВАРЮ (/quiz) =
+
+@router_dict.message(Command("quiz"))
+async def quiz_command_handler(message: Message, state: FSMContext):
+    """
+    Обработчик команды /quiz
+    Начинает раунд теста: слова и варианты выбираются из словаря в памяти (индекс автодополнения),
+    весь раунд - не больше одного запроса к базе
+    """
+    questions = quiz.build_round(await suggest_cache.get(message.from_user.id))
+    if not questions:
+        await message.answer(QUIZ_TOO_FEW)
+        return
+
+    await state.set_state(QuizState.answering)
+    # Списки, а не кортежи - данные состояния должны переживать сериализацию в JSON
+    await state.update_data(
+        quiz=[[q.word, q.part_of_speech, list(q.options), q.answer] for q in questions],
+        quiz_index=0,
+        quiz_score=0
+    )
+    first = questions[0]
+    text, keyboard = render_quiz_question(1, len(questions), first.word, first.part_of_speech, list(first.options))
+    await message.answer(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+
+
+@dict_action(DictAction.QUIZ_ANSWER, QuizState.answering)
+async def quiz_answer_handler(callback: CallbackQuery, state: FSMContext, callback_data: DictCallback):
+    """Засчитывает ответ и показывает следующий вопрос (или итог раунда)"""
+    data = await state.get_data()
+    questions, index, score = data["quiz"], data["quiz_index"], data["quiz_score"]
+    parsed = quiz.parse_answer(callback_data.arg, len(questions[index][2]))
+    # Повторное нажатие на уже отвеченный вопрос (или устаревшие/подделанные данные кнопки)
+    if parsed is None or parsed[0] != index:
+        await callback.answer()
+        return
+
+    word, _, options, answer = questions[index]
+    correct = parsed[1] == answer
+    score += correct
+    feedback = render_quiz_feedback(correct, word, options[answer])
+    index += 1
+
+    if index == len(questions):
+        await edit_message(callback.message, render_quiz_result(score, len(questions), feedback))
+        await state.clear()
+    else:
+        await state.update_data(quiz_index=index, quiz_score=score)
+        word, pos, options, _ = questions[index]
+        text, keyboard = render_quiz_question(index + 1, len(questions), word, pos, options, feedback)
+        await edit_message(callback.message, text, reply_markup=keyboard)
+    await callback.answer()
+
+
+@dict_action(DictAction.QUIZ_STOP, QuizState.answering)
+async def quiz_stop_handler(callback: CallbackQuery, state: FSMContext):
+    """Завершает тест досрочно и показывает счет по отвеченным вопросам"""
+    data = await state.get_data()
+    await edit_message(callback.message, render_quiz_result(data["quiz_score"], data["quiz_index"]))
+    await state.clear()
+    await callback.answer()
+
+
+# = АВТОДОПОЛНЕНИЕ (INLINE-РЕЖИМ) =
+
+async def suggest_words(user_id: int, query: str, limit: int = SUGGEST_LIMIT) -> List[Dict[str, str]]:
+    """
+    Слова пользователя с префиксом query (самые свежие первыми),
+    дополненные словами из офлайн-словаря, если своих не хватает
+    """
+    results = [
+        {'word': item.word, 'part_of_speech': item.part_of_speech, 'translation': item.translation, 'source': 'user'}
+        for item in await suggest_cache.search(user_id, query, limit)
+    ]
+    if lexicon is not None and len(results) < limit and query.strip():
+        own = {result['word'] for result in results}
+        for word, entry in lexicon.complete(query, limit):
+            if len(results) >= limit:
+                break
+            if word not in own:
+                results.append({
+                    'word': word, 'part_of_speech': entry.part_of_speech,
+                    'translation': entry.translation, 'source': 'lexicon',
+                })
+    return results
+
+
+@router_dict.inline_query()
+async def inline_suggest_handler(inline_query: InlineQuery):
+    """
+    Inline-режим: @бот <начало слова> - слова из словаря пользователя
+    Ответ строится из индекса в памяти, без запроса к БД на каждое нажатие клавиши
+    """
+    suggestions = await suggest_words(inline_query.from_user.id, inline_query.query)
+    results = [
+        InlineQueryResultArticle(
+            id=str(index),
+            title=item['word'],
+            description=f"{item['part_of_speech']} — {item['translation']}" if item['translation'] else item['part_of_speech'],
+            input_message_content=InputTextMessageContent(
+                message_text=f"{item['word']} — {item['translation']}" if item['translation'] else item['word'],
+                parse_mode=None,
+            ),
+        )
+        for index, item in enumerate(suggestions)
+    ]
+    # Результаты личные; короткий кеш на стороне Telegram сглаживает повторы одного запроса
+    await inline_query.answer(results, cache_time=5, is_personal=True)
+
+
 # Обработка кнопки Other (ручной ввод части речи)
-@router_dict.callback_query(F.data == "pos_other", WordStates.waiting_for_pos)
+@dict_action(DictAction.POS_OTHER, WordStates.waiting_for_pos)
 async def ask_custom_part_of_speech(callback: CallbackQuery, state: FSMContext):
     """Запрос на ручной ввод части речи"""
-    await callback.message.edit_text("✍️ Введите вашу часть речи:")
+    await edit_message(callback.message, "✍️ Введите вашу часть речи:")
     # Переводим в состояние ожидания ручного ввода
     await state.set_state(WordStates.waiting_for_custom_pos)
     await callback.answer()
@@ -909,12 +1488,8 @@ async def handle_custom_part_of_speech(message: Message, state: FSMContext):
 
     # Сохраняем слово в базу
     if await add_word_to_db(user_id, word, custom_pos, value):
-        # Формируем сообщение об успехе
-        response = f"✅ Сохранено: {word} ({custom_pos})"
-        if value:
-            shortened_value = value[:23] + '...' if len(value) > 23 else value
-            response += f"\nКраткое значение: {shortened_value}"
-        await message.answer(response)
+        # Сообщение об успехе
+        await message.answer(render_word_saved(word, custom_pos, value))
     else:
         await message.answer("❌ Что-то пошло не так")
 
@@ -938,24 +1513,24 @@ async def handle_part_of_speech_text(message: Message):
 
 
 # Обработка кнопки Cancel (отмена добавления слова)
-@router_dict.callback_query(F.data == "pos_cancel", WordStates.waiting_for_pos)
+@dict_action(DictAction.POS_CANCEL, WordStates.waiting_for_pos)
 async def cancel_adding_word(callback: CallbackQuery, state: FSMContext):
     """Отмена добавления слова"""
     await state.clear()
-    await callback.message.edit_text("❌ Добавление отменено")
+    await edit_message(callback.message, "❌ Добавление отменено")
     await callback.answer()
 
 
 
-@router_dict.callback_query(F.data.startswith("pos_"), WordStates.waiting_for_pos)
-async def save_new_word_handler(callback: CallbackQuery, state: FSMContext) -> None:
+@dict_action(DictAction.POS, WordStates.waiting_for_pos)
+async def save_new_word_handler(callback: CallbackQuery, state: FSMContext, callback_data: DictCallback) -> None:
     """
     Сохраняет новое слово после выбора части речи
     Вызывается при нажатии на кнопку с частью речи
     """
     user_id = callback.from_user.id
     # Извлекаем часть речи из callback_data
-    part_of_speech = callback.data.replace("pos_", "")
+    part_of_speech = callback_data.arg
     data = await state.get_data()
     # Извлекаем слово и значение из состояния
     word = data.get("word")
@@ -963,25 +1538,82 @@ async def save_new_word_handler(callback: CallbackQuery, state: FSMContext) -> N
 
     # Сохраняем слово в базу данных
     if await add_word_to_db(user_id, word, part_of_speech, value):
-        # Формируем сообщение об успехе
-        response = f"✅ Сохранено: {word} ({part_of_speech})"
-        # Если есть значение - добавляем его (сокращаем если длинное)
-        if value:
-            shortened_value = value[:23] + '...' if len(value) > 23 else value
-            response += f"\nКраткое значение: {shortened_value}"
-
         # Редактируем сообщение с результатом
-        await callback.message.edit_text(response)
+        await edit_message(callback.message, render_word_saved(word, part_of_speech, value))
         await callback.answer()
         # Сбрасываем состояние
         await state.clear()
     else:
         # Если не удалось сохранить
-        await callback.message.edit_text("❌ Что-то пошло не так")
+        await edit_message(callback.message, "❌ Что-то пошло не так")
+        await callback.answer()
+
+
+
+# Подсказка офлайн-словаря: сохранить как предложено
+@dict_action(DictAction.LEX_ACCEPT, WordStates.waiting_for_pos)
+async def accept_lexicon_suggestion(callback: CallbackQuery, state: FSMContext):
+    """Сохраняет слово с частью речи и значением из офлайн-словаря"""
+    data = await state.get_data()
+    word = data.get("word")
+    part_of_speech = data.get("suggested_pos")
+    value = data.get("suggested_value")
+
+    if await add_word_to_db(callback.from_user.id, word, part_of_speech, value):
+        await edit_message(callback.message, render_word_saved(word, part_of_speech, value))
+        await state.clear()
+    else:
+        await edit_message(callback.message, "❌ Что-то пошло не так")
+    await callback.answer()
+
+
+# Подсказка офлайн-словаря: выбрать часть речи самому
+@dict_action(DictAction.LEX_MANUAL, WordStates.waiting_for_pos)
+async def reject_lexicon_suggestion(callback: CallbackQuery, state: FSMContext):
+    """Показывает обычный выбор части речи (перевод из словаря сохранится, если своего нет)"""
+    data = await state.get_data()
+    await state.update_data(value=data.get("suggested_value") or data.get("value"))
+    await edit_message(callback.message, "❓ Какая это часть речи?", reply_markup=ADD_POS_KEYBOARD)
+    await callback.answer()
+
+
+# ==== ЕДИНЫЙ ОБРАБОТЧИК КНОПОК ====
+
+@router_dict.callback_query(DictCallback.filter())
+async def dict_callback_dispatcher(callback: CallbackQuery, callback_data: DictCallback, state: FSMContext):
+    """
+    Обрабатывает все нажатия кнопок бота-словаря
+    Находит обработчик по действию поиском в словаре и проверяет состояние пользователя
+    """
+    route = DICT_CALLBACK_ROUTES.get(callback_data.action)
+    if route is None:
+        await callback.answer()
+        return
+
+    handler, states, pass_data = route
+    # Кнопка из устаревшего сообщения (пользователь уже в другом режиме)
+    if await state.get_state() not in states:
         await callback.answer()
+        return
 
+    if pass_data:
+        await handler(callback, state, callback_data)
+    else:
+        await handler(callback, state)
 
 
+@router_dict.errors(ExceptionTypeFilter(DatabaseUnavailable))
+async def database_unavailable_handler(event: ErrorEvent):
+    """
+    База недоступна (db_breaker): вместо зависания - короткий ответ
+    Состояние пользователя не меняется - после восстановления базы можно просто повторить
+    """
+    update = event.update
+    if update.callback_query:
+        await update.callback_query.answer(DB_UNAVAILABLE_ALERT, show_alert=True)
+    elif update.message:
+        await update.message.answer(DB_UNAVAILABLE)
+
 
 # ==== УНИВЕРСАЛЬНЫЙ ОБРАБОТЧИК СООБЩЕНИЙ ====
 
@@ -995,7 +1627,11 @@ async def universal_message_handler(message: Message, state: FSMContext):
     if message.text.startswith('/'):
         return
 
-    logging.info(f"{message.from_user.id}: new message: {message.text}")
+    # Частое событие: запись выборочная (LOG_SAMPLE_RATES), форматирование - в фоновом потоке
+    logging.info(
+        "%s: new message: %s", message.from_user.id, message.text,
+        extra={"event": "message_in", "user_id": message.from_user.id}
+    )
 
     # Получаем текущее состояние пользователя
     current_state = await state.get_state()
@@ -1048,30 +1684,20 @@ async def process_word_input(message: Message, state: FSMContext):
 
     # Сохраняем слово и значение в состоянии
     await state.update_data(word=word, value=value)
+    # Переводим в состояние ожидания выбора части речи
+    await state.set_state(WordStates.waiting_for_pos)
 
-    # Создаем клавиатуру выбора части речи
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="Существительное", callback_data="pos_noun"),
-        ],
-        [
-            InlineKeyboardButton(text="Глагол", callback_data="pos_verb"),
-            InlineKeyboardButton(text="Прилагательное", callback_data="pos_adjective"),
-        ],
-        [
-            InlineKeyboardButton(text="Наречие", callback_data="pos_adverb"),
-            InlineKeyboardButton(text="Другое", callback_data="pos_other"),
-        ],
-        [
-            InlineKeyboardButton(text="Отменить", callback_data="pos_cancel")
-        ],
-
-    ])
+    # Слово есть в офлайн-словаре - предлагаем часть речи и перевод, сохранить можно одной кнопкой
+    entry = lexicon.lookup(word) if lexicon is not None else None
+    if entry is not None:
+        suggested_value = value or entry.translation
+        await state.update_data(suggested_pos=entry.part_of_speech, suggested_value=suggested_value)
+        text, keyboard = render_lexicon_suggestion(word, entry.part_of_speech, suggested_value)
+        await message.answer(text, reply_markup=keyboard)
+        return
 
     # Спрашиваем часть речи
-    await message.answer("❓ Какая это часть речи?", reply_markup=keyboard)
-    # Переводим в состояние ожидания выбора части речи
-    await state.set_state(WordStates.waiting_for_pos)
+    await message.answer("❓ Какая это часть речи?", reply_markup=ADD_POS_KEYBOARD)
 
 """
 =============== ЗАПУСК WEB API ===============
@@ -1079,99 +1705,292 @@ async def process_word_input(message: Message, state: FSMContext):
 """
 
 
-# Создаем HTTP-сервер для Web App
-async def web_app_handler(request):
-    return web.FileResponse("webapp/dist/index.html")
-
-
 # API для получения слов пользователя
 async def api_words_handler(request):
     user_id = int(request.query.get('user_id'))
     words = await get_words_from_db(user_id)
 
     # Преобразование в JSON-совместимый формат
-    words_json = []
-    for word in words:
-        words_json.append({
-            'id': word[0],
-            'word': word[2],
-            'part_of_speech': word[3],
-            'translation': word[4]
-        })
-    logging.info(f"Example: {words_json[0]}")
+    words_json = [
+        {'word': word, 'part_of_speech': pos, 'translation': translation}
+        for word, pos, translation in words
+    ]
+    # Только размер ответа и только на уровне DEBUG (и выборочно)
+    logging.debug(
+        "api/words: %s words for %s", len(words_json), user_id,
+        extra={"event": "api_words", "user_id": user_id, "count": len(words_json)}
+    )
 
     return web.json_response(words_json)
 
 
-# Инициализация HTTP-сервера
-async def init_http_server():
-    app = web.Application()
-    app.router.add_get('/webapp', web_app_handler)
+# API синхронизации: только изменения после версии since
+async def api_word_changes_handler(request):
+    try:
+        user_id = int(request.query['user_id'])
+        since = int(request.query.get('since', '0'))
+    except (KeyError, ValueError):
+        raise web.HTTPBadRequest(text="user_id and since must be integers")
+    changes = await get_word_changes(user_id, since)
+    logging.debug(
+        "api/words/changes: %s upserts, %s deletes for %s since %s",
+        len(changes['upserts']), len(changes['deletes']), user_id, since,
+        extra={"event": "api_words", "user_id": user_id, "since": since, "full": changes['full']}
+    )
+    # Ответ зависит от состояния базы - не кешируем
+    return web.json_response(changes, headers={"Cache-Control": "no-store"})
+
+
+# Автодополнение для WebApp: слова с префиксом q, самые свежие первыми
+async def api_words_suggest_handler(request):
+    try:
+        user_id = int(request.query['user_id'])
+        limit = min(int(request.query.get('limit', SUGGEST_LIMIT)), 50)
+    except (KeyError, ValueError):
+        raise web.HTTPBadRequest(text="user_id and limit must be integers")
+    return web.json_response(
+        await suggest_words(user_id, request.query.get('q', ''), limit),
+        headers={"Cache-Control": "no-store"}
+    )
+
+
+# Статистика словаря для WebApp
+async def api_stats_handler(request):
+    try:
+        user_id = int(request.query['user_id'])
+    except (KeyError, ValueError):
+        raise web.HTTPBadRequest(text="user_id must be an integer")
+    stats = await get_stats_from_db(user_id)
+    return web.json_response({
+        'total': stats.total,
+        'parts_of_speech': [{'part_of_speech': pos, 'words': count} for pos, count in stats.parts_of_speech],
+        'weeks': [{'week': week.isoformat(), 'words': count} for week, count in stats.weeks],
+    }, headers={"Cache-Control": "no-store"})
+
+
+# Живые обновления (Server-Sent Events): изменения словаря сразу после записи
+# Клиент передает версию своей копии (since или заголовок Last-Event-ID при переподключении),
+# каждое событие - те же изменения, что и в /api/words/changes, с id = новой версией
+async def api_word_stream_handler(request):
+    try:
+        user_id = int(request.query['user_id'])
+        since = int(request.headers.get('Last-Event-ID') or request.query.get('since', '0'))
+    except (KeyError, ValueError):
+        raise web.HTTPBadRequest(text="user_id and since must be integers")
+
+    try:
+        with change_broker.subscribe(user_id) as subscription:
+            response = web.StreamResponse(headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-store",
+                # Отключает буферизацию в nginx
+                "X-Accel-Buffering": "no",
+            })
+            await response.prepare(request)
+            # Сначала догоняем изменения, сделанные до подписки
+            changed = True
+            while True:
+                if changed:
+                    changes = await get_word_changes(user_id, since)
+                    if changes['full'] or changes['upserts'] or changes['deletes']:
+                        since = changes['version']
+                        await response.write(
+                            f"id: {since}\nevent: changes\ndata: {json.dumps(changes, ensure_ascii=False)}\n\n".encode()
+                        )
+                        LIVE_EVENTS.inc()
+                else:
+                    await response.write(b": ping\n\n")
+                changed = await subscription.wait(LIVE_HEARTBEAT)
+    except TooManyStreams:
+        raise web.HTTPTooManyRequests(text="too many open streams")
+    except DatabaseUnavailable:
+        # Поток уже начат: закрываем его, клиент переподключится с Last-Event-ID
+        pass
+    except ConnectionResetError:
+        # Клиент закрыл WebApp
+        pass
+    return response
+
+
+# База недоступна (db_breaker) - 503 сразу, клиент повторит запрос позже
+@web.middleware
+async def database_unavailable_middleware(request, handler):
+    try:
+        return await handler(request)
+    except DatabaseUnavailable:
+        raise web.HTTPServiceUnavailable(
+            text="database unavailable", headers={"Retry-After": str(int(DB_BREAKER_RESET))}
+        )
+
+
+# Метрики в формате Prometheus
+async def metrics_handler(request):
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+# Приложение HTTP-сервера: WebApp, API и метрики
+async def create_http_app() -> web.Application:
+    app = web.Application(middlewares=[database_unavailable_middleware])
+    # Сборка WebApp читается и сжимается один раз (в отдельном потоке, чтобы не держать event loop)
+    bundle = await asyncio.to_thread(StaticBundle.load, WEBAPP_DIST_DIR)
+    app.router.add_get('/webapp', bundle.index_handler)
+    app.router.add_get('/static/{name:.+}', bundle.asset_handler)
     app.router.add_get('/api/words', api_words_handler)
+    app.router.add_get('/api/words/changes', api_word_changes_handler)
+    app.router.add_get('/api/words/stream', api_word_stream_handler)
+    app.router.add_get('/api/words/suggest', api_words_suggest_handler)
+    app.router.add_get('/api/stats', api_stats_handler)
+    app.router.add_get('/metrics', metrics_handler)
+    return app
+
 
-    runner = web.AppRunner(app)
+# Инициализация HTTP-сервера
+async def init_http_server():
+    runner = web.AppRunner(await create_http_app())
     await runner.setup()
     site = web.TCPSite(runner, WEB_SERVER_HOST, WEB_SERVER_PORT)
     await site.start()
-    logging.info(f"HTTP server started on http://{WEB_SERVER_HOST}:{WEB_SERVER_PORT}/webapp")
+    logging.info("HTTP server started on http://%s:%s/webapp", WEB_SERVER_HOST, WEB_SERVER_PORT)
 
 """ 
 =============== ЗАПУСК ВСЕЙ СИСТЕМЫ =============== 
 Функции для запуска обоих ботов параллельно
 """
 
-async def run_bot(bot_token: str, router: Router, storage=None):
+async def start_reminders(bot: Bot):
+    """Запускает планировщик напоминаний вместе с ботом-словарем"""
+    global reminder_scheduler
+    sender = RateLimitedSender(bot, rate=REMINDER_RATE)
+    reminder_scheduler = ReminderScheduler(
+        db_pool,
+        sender,
+        batch_size=REMINDER_BATCH_SIZE,
+        interval=REMINDER_INTERVAL,
+        acquire_timeout=DB_ACQUIRE_TIMEOUT
+    )
+    # Пользователь заблокировал бота - больше ему не пишем
+    sender.on_forbidden = reminder_scheduler.disable_chat
+    reminder_scheduler.start()
+    logging.info("Reminder scheduler started")
+
+
+async def stop_reminders():
+    """Останавливает планировщик напоминаний"""
+    global reminder_scheduler
+    if reminder_scheduler:
+        await reminder_scheduler.stop()
+        reminder_scheduler = None
+
+
+async def run_bot(bot_token: str, router: Router, storage=None, on_startup=None, on_shutdown=None):
     """
     Запускает одного бота
     Параметры:
     - bot_token: токен Telegram бота
     - router: маршрутизатор с обработчиками
     - storage: хранилище состояний (опционально)
+    - on_startup / on_shutdown: хуки запуска и остановки (опционально)
     """
     # Создаем объект бота с HTML-форматированием по умолчанию
-    bot = Bot(token=bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    # Все боты - через общую сессию (bot_session)
+    bot = Bot(token=bot_token, session=bot_session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
     # Создаем диспетчер
     dp = Dispatcher(storage=storage) if storage else Dispatcher()
     # Подключаем маршрутизатор с обработчиками
     dp.include_router(router)
+    # Замер времени обработчиков и поиск медленных обновлений
+    dp.message.middleware(slow_update_middleware)
+    dp.callback_query.middleware(slow_update_middleware)
+    # Регистрируем хуки запуска и остановки
+    if on_startup:
+        dp.startup.register(on_startup)
+    if on_shutdown:
+        dp.shutdown.register(on_shutdown)
     # Запускаем бота в режиме опроса сервера Telegram
-    await dp.start_polling(bot)
+    # Общую сессию закрывает main, когда остановятся все боты
+    await dp.start_polling(bot, close_bot_session=False)
 
 
 async def main():
-    # Настройка логирования
-    logging.basicConfig(
-        level=logging.INFO,
-        stream=sys.stdout,
-        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s"
-    )
-
-    # Инициализация базы данных
-    await init_db()
-    logging.info("Database connection established")
-
-    # Создаем задачи для ботов
-    tasks = []
-    if BOT_TOKEN_MAIN:
-        logging.info("Starting Main Bot...")
-        tasks.append(run_bot(BOT_TOKEN_MAIN, router_main))
-        logging.info("Starting HTTP server...")
-        tasks.append(init_http_server())
+    # Настройка логирования: очередь + фоновый поток записи, JSON, выборочная запись частых событий
+    log_listener = setup_logging(LOG_LEVEL, LOG_FORMAT, parse_sample_rates(LOG_SAMPLE_RATES))
+    loop_monitor = change_listener = stats_reconciler = None
+    try:
+        # Инициализация базы данных
+        await init_db()
+        logging.info("Database connection established")
+
+        # Офлайн-словарь: файл отображается в память, загрузка не зависит от размера
+        global lexicon
+        lexicon = Lexicon.open(LEXICON_PATH)
+
+        # Создаем задачи для ботов
+        tasks = []
+        if BOT_TOKEN_MAIN:
+            logging.info("Starting Main Bot...")
+            tasks.append(run_bot(BOT_TOKEN_MAIN, router_main))
+            logging.info("Starting HTTP server...")
+            tasks.append(init_http_server())
+
+        if BOT_TOKEN_DICT:
+            logging.info("Starting Dictionary Bot...")
+            tasks.append(run_bot(BOT_TOKEN_DICT, router_dict, storage, start_reminders, stop_reminders))
+
+        if not tasks:
+            logging.error("❌ Bot tokens not found.")
+            return
 
-    if BOT_TOKEN_DICT:
-        logging.info("Starting Dictionary Bot...")
-        tasks.append(run_bot(BOT_TOKEN_DICT, router_dict, storage))
+        # Уведомления об изменениях словаря от всех процессов (LISTEN/NOTIFY)
+        if LIVE_UPDATES_NOTIFY:
+            change_listener = PgChangeListener(change_broker, lambda: asyncpg.connect(
+                host=POSTGRES_HOST, port=POSTGRES_PORT, user=POSTGRES_USER,
+                password=POSTGRES_PASSWORD, database=POSTGRES_DB,
+            ), on_remote_change=_on_remote_change)
+            change_listener.start()
+
+        # Фоновая сверка счетчиков статистики со словами
+        if STATS_RECONCILE_INTERVAL > 0:
+            stats_reconciler = word_stats.StatsReconciler(
+                db_pool,
+                word_schema.USER_ROWS_TABLE[WORDS_SCHEMA],
+                batch_size=STATS_RECONCILE_BATCH,
+                interval=STATS_RECONCILE_INTERVAL,
+                timeout=STATS_RECONCILE_TIMEOUT
+            )
+            stats_reconciler.start()
 
-    if not tasks:
-        logging.error("❌ Bot tokens not found.")
-        return
+        # Фоновая очистка истекших сессий бота-словаря
+        storage.start()
 
-    # Запускаем всех ботов параллельно
-    await asyncio.gather(*tasks)
+        # Фоновый замер отставания event loop
+        loop_monitor = LoopLagMonitor(LOOP_LAG_INTERVAL, LOOP_STALL_THRESHOLD, monitor_log)
+        loop_monitor.start()
 
-    # Закрываем соединение с БД при завершении
-    await close_db()
-    logging.info("Database connection closed")
+        # Запускаем всех ботов параллельно
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            logging.exception("Bots stopped with an error")
+            raise
+    finally:
+        # Остановка при любом завершении (в том числе после ошибки запуска или отмены),
+        # журнал дописывается последним - иначе записи о причине остановки теряются
+        try:
+            if loop_monitor:
+                await loop_monitor.stop()
+            if change_listener:
+                await change_listener.stop()
+            if stats_reconciler:
+                await stats_reconciler.stop()
+            await bot_session.close()
+            await storage.close()
+
+            # Закрываем соединение с БД при завершении
+            await close_db()
+            logging.info("Database connection closed")
+        finally:
+            # Дописываем оставшиеся записи журнала
+            log_listener.stop()
 
 
 # Точка входа в программу
@@ -0,0 +1,210 @@
+"""
+МОНИТОРИНГ ЗАДЕРЖЕК EVENT LOOP И МЕДЛЕННЫХ ОБРАБОТЧИКОВ
+
+Оба бота и HTTP API работают в одном event loop, поэтому один медленный запрос
+или блокирующий вызов задерживает всех. Здесь:
+1. LoopLagMonitor - фоновый замер отставания event loop, плюс сторожевой поток,
+   который снимает стек главного потока, если loop «завис» дольше порога
+2. SlowUpdateMiddleware - middleware aiogram: время каждого обновления по обработчикам,
+   а для медленных - имя обработчика, user_id и стек задачи в момент превышения порога
+Все выводится в метрики (/metrics) и в журнал с ограничением частоты.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger("monitoring")
+
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Отставание event loop от расписания",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+LOOP_LAG_MAX = Gauge("event_loop_lag_max_seconds", "Максимальное отставание event loop за период замера")
+LOOP_STALLS = Counter("event_loop_stalls_total", "Зависания event loop дольше порога")
+UPDATE_DURATION = Histogram("update_duration_seconds", "Время обработки обновления", ["handler"])
+SLOW_UPDATES = Counter("slow_updates_total", "Обновления дольше порога", ["handler"])
+
+
+class RateLimitedLog:
+    """
+    Журнал с ограничением частоты: не больше limit записей за period секунд
+    Подавленные записи считаются и упоминаются в следующей записи
+    Пишут в него и event loop, и сторожевой поток - счетчики под блокировкой
+    """
+
+    def __init__(self, limit: int = 10, period: float = 60.0):
+        self.limit = limit
+        self.period = period
+        self._lock = threading.Lock()
+        self._window_start = 0.0
+        self._written = 0
+        self._suppressed = 0
+
+    def warning(self, msg: str, *args: Any, extra: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.period:
+                self._window_start, self._written = now, 0
+            if self._written >= self.limit:
+                self._suppressed += 1
+                return
+            self._written += 1
+            suppressed, self._suppressed = self._suppressed, 0
+        logger.warning(msg, *args, extra=dict(extra or {}, suppressed=suppressed))
+
+
+class LoopLagMonitor:
+    """
+    Замер отставания event loop
+
+    Параметры:
+    - interval: период замера, секунд
+    - stall_threshold: если loop не отвечает дольше - сторожевой поток снимает стек главного потока
+    - log: журнал с ограничением частоты
+    """
+
+    def __init__(self, interval: float = 0.5, stall_threshold: float = 1.0, log: Optional[RateLimitedLog] = None):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.log = log or RateLimitedLog()
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        max_lag = 0.0
+        samples = 0
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._heartbeat = time.monotonic()
+            LOOP_LAG.observe(lag)
+            max_lag = max(max_lag, lag)
+            samples += 1
+            # Максимум публикуем примерно раз в 10 секунд
+            if samples * self.interval >= 10:
+                LOOP_LAG_MAX.set(max_lag)
+                max_lag, samples = 0.0, 0
+
+    def _watch(self):
+        """Сторожевой поток: если heartbeat давно не обновлялся - loop заблокирован"""
+        reported = False
+        while not self._stop.wait(self.interval):
+            stalled_for = time.monotonic() - self._heartbeat - self.interval
+            if stalled_for < self.stall_threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            self.log.warning(
+                "Event loop stalled for %.3fs", stalled_for,
+                extra={"event": "loop_stall", "stalled_for": round(stalled_for, 3), "stack": stack},
+            )
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def _await_chain(task: asyncio.Task) -> str:
+    """Стек задачи по цепочке await - от обработчика до места, где она сейчас ждет"""
+    frames = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            frames.append((frame, frame.f_lineno))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return "".join(traceback.StackSummary.extract(frames).format())
+
+
+def _handler_name(data: Dict[str, Any]) -> str:
+    """Имя обработчика обновления (для кнопок бота-словаря - с действием)"""
+    handler = data.get("handler")
+    name = getattr(getattr(handler, "callback", None), "__name__", "unknown")
+    callback_data = data.get("callback_data")
+    action = getattr(callback_data, "action", None)
+    if action is not None:
+        name = f"{name}:{getattr(action, 'value', action)}"
+    return name
+
+
+class SlowUpdateMiddleware(BaseMiddleware):
+    """
+    Middleware обработчиков (message, callback_query)
+    Пишет время каждого обновления в метрики; если обработка дольше threshold -
+    снимает стек задачи в момент превышения порога и пишет запись в журнал
+    """
+
+    def __init__(self, threshold: float = 1.0, log: Optional[RateLimitedLog] = None):
+        self.threshold = threshold
+        self.log = log or RateLimitedLog()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        sample: Dict[str, str] = {}
+
+        def capture():
+            # Где задача ждет в момент превышения порога
+            if task is not None and not task.done():
+                sample["stack"] = _await_chain(task)
+
+        timer = loop.call_later(self.threshold, capture)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            timer.cancel()
+            duration = time.perf_counter() - started
+            name = _handler_name(data)
+            UPDATE_DURATION.observe(duration, handler=name)
+            if duration >= self.threshold:
+                SLOW_UPDATES.inc(handler=name)
+                user = data.get("event_from_user")
+                self.log.warning(
+                    "Slow update: handler=%s user_id=%s duration=%.3fs", name, getattr(user, "id", None), duration,
+                    extra={
+                        "event": "slow_update",
+                        "handler": name,
+                        "user_id": getattr(user, "id", None),
+                        "duration": round(duration, 3),
+                        # Если loop был заблокирован, таймер не успел сработать - стека нет,
+                        # такие случаи ловит LoopLagMonitor
+                        "stack": sample.get("stack", ""),
+                    },
+                )
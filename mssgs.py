@@ -20,9 +20,118 @@ DICT_GREETING = (
     "<b>Что я умею:</b>\n"
     "➕ Сохранять английские слова + перевод с частью речи\n"
     "✏️ Редактировать или ❌ удалять записи (все под твоим контролем!)\n"
-    "📋 Просматривать коллекцию слов — команда /list\n\n"
+    "📋 Просматривать коллекцию слов — команда /list\n"
+    "🔔 Напоминать о словах каждый день — команда /remind\n"
+    "📊 Показывать статистику словаря — команда /stats\n"
+    "🎯 Проверять себя тестом — команда /quiz\n\n"
     "<b>Как начать?</b> Легко!\n"
     "🔸 Пиши новое слово (например: <i>book</i>)\n"
     "🔸 Или сразу с переводом: <i>book: книга</i>\n\n"
     "Готов(а) покорять английский? Напиши слово дня: <b>embrace</b> 🚀"
-)
\ No newline at end of file
+)
+
+REMIND_HELP = (
+    "🔔 <b>Ежедневное повторение слов</b>\n\n"
+    "/remind — включить напоминание (около 9:00)\n"
+    "/remind 20:30 — в удобное время\n"
+    "/remind 20:30 Asia/Yekaterinburg — с часовым поясом\n"
+    "/remind off — выключить"
+)
+
+REMIND_ON = "🔔 Напоминание включено: каждый день в <b>{time}</b> ({timezone})"
+
+REMIND_OFF = "🔕 Напоминания выключены"
+
+STATS = (
+    "📊 <b>Статистика словаря</b>\n\n"
+    "Всего слов: <b>{total}</b>\n\n"
+    "<b>По частям речи:</b>\n{parts}\n\n"
+    "<b>По неделям добавления:</b>\n{weeks}"
+)
+
+STATS_PART = "• {pos} — {count}"
+
+STATS_WEEK = "<code>{week}</code> {bar} {count}"
+
+QUIZ_TOO_FEW = "🎯 Для теста нужно хотя бы два слова с разными переводами. Добавьте еще слов!"
+
+QUIZ_QUESTION = (
+    "🎯 <b>Вопрос {number} из {total}</b>\n\n"
+    "📖 <b>{word}</b> ({pos})\n\n"
+    "Выберите перевод:\n{options}"
+)
+
+# Вариант ответа полностью (на кнопке - номер и начало перевода, длинные переводы могли бы совпасть)
+QUIZ_OPTION = "<b>{number}.</b> {option}"
+
+QUIZ_CORRECT = "✅ Верно!\n\n"
+
+QUIZ_WRONG = "❌ Неверно: <b>{word}</b> — {answer}\n\n"
+
+QUIZ_RESULT = "🏁 <b>Тест окончен!</b>\nПравильных ответов: <b>{score}</b> из {total}"
+
+# База данных недоступна (выключатель db_breaker разомкнут)
+DB_UNAVAILABLE = "⚠️ Словарь временно недоступен, изменения пока не сохраняются. Попробуйте через минуту"
+
+DB_UNAVAILABLE_ALERT = "⚠️ Словарь временно недоступен. Попробуйте через минуту"
+
+DB_SNAPSHOT_NOTICE = "⚠️ База данных временно недоступна: показана сохраненная копия словаря, изменения пока не сохраняются"
+
+REMINDER_REVIEW = (
+    "🔔 <b>Время повторить слово!</b>\n\n"
+    "📖 <b>{word}</b>\n"
+    "💡 {translation}\n\n"
+    "Весь словарь — команда /list"
+)
+
+REMINDER_WORD_OF_THE_DAY = (
+    "🌅 <b>Слово дня:</b> {word}\n\n"
+    "Отправь его мне, чтобы добавить в словарь!"
+)
+
+# Слова дня для пользователей с пустым словарем (выбираются по дате)
+WORDS_OF_THE_DAY = (
+    "embrace", "resilient", "curious", "thrive", "genuine", "wander", "eager",
+    "brisk", "cherish", "diligent", "ample", "vivid", "humble", "ponder",
+)
+
+# = ШАБЛОНЫ КАРТОЧЕК (заполняются через .format в render.py) =
+
+GREETING = "👋 Привет, <b>{name}</b>!\n\n" + WELCOME
+
+WORD_CARD = (
+    "📖 <b>Слово</b>: {word}\n"
+    "🔢 <b>Номер слова:</b> {number} out of {total}\n"
+    "🔤 <b>Часть речи слова:</b> {pos}\n"
+)
+
+WORD_CARD_VALUE = "💡 <b>Краткое значение:</b> {value}"
+
+WORD_FULL_INFO = (
+    "📖 <b>Полная информация:</b> {word}\n"
+    "🔢 <b>Номер слова:</b> {number} out of {total}\n"
+    "🔤 <b>Часть речи:</b> {pos}\n"
+)
+
+WORD_FULL_INFO_VALUE = "💡 <b>Детальное значение:</b>\n{value}\n"
+
+EDIT_MENU = (
+    "✏️ <b>Редактирование:</b> {word}\n"
+    "🔤 <b>Текущая часть речи:</b> {pos}\n"
+    "💡 <b>Текущее значение:</b> {value}\n\n"
+    "Выберите, что отредактировать:"
+)
+
+EDIT_POS_PROMPT = "🔤 Выберите новую часть речи для <b>{word}</b>:"
+
+WORD_SAVED = "✅ Сохранено: {word} ({pos})"
+
+WORD_SAVED_VALUE = "\nКраткое значение: {value}"
+
+# Подсказка офлайн-словаря при добавлении слова
+LEXICON_SUGGESTION = (
+    "📖 <b>{word}</b> — нашел в словаре:\n"
+    "🔤 <b>Часть речи:</b> {pos}\n"
+    "💡 <b>Значение:</b> {value}\n\n"
+    "Сохранить?"
+)
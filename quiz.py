@@ -0,0 +1,96 @@
+"""
+ТЕСТ ПО СЛОВАРЮ: /quiz
+
+Раунд - questions случайных слов пользователя, к каждому несколько вариантов перевода:
+правильный и переводы других слов того же словаря.
+
+Слова берутся из индекса автодополнения (suggest.SuggestCache), который уже держит словарь
+пользователя в памяти и обновляется при каждой записи: раунд стоит не больше одного запроса
+к базе (загрузка индекса при промахе кеша) вместо ORDER BY random() по всему словарю.
+Выборка - по номерам позиций: O(questions * options) при любом размере словаря.
+"""
+
+import random
+from typing import Iterator, List, NamedTuple, Optional, Protocol, Sequence, Set, Tuple
+
+# Вопросов в раунде и вариантов ответа в вопросе
+QUESTIONS = 20
+OPTIONS = 4
+# Сколько случайных слов пробовать на каждый вариант-обманку (переводы могут повторяться)
+_DISTRACTOR_TRIES = 8
+
+
+class QuizWord(Protocol):
+    word: str
+    part_of_speech: str
+    translation: str
+
+
+class QuizQuestion(NamedTuple):
+    word: str
+    part_of_speech: str
+    # Варианты перевода и номер правильного
+    options: Tuple[str, ...]
+    answer: int
+
+
+def _random_positions(total: int, needed: int, rng) -> Iterator[int]:
+    """
+    Различные случайные номера из range(total)
+    Большой словарь - случайные номера с пропуском повторов (без перемешивания всего словаря);
+    маленький (или когда повторы участились) - перемешанный остаток
+    """
+    seen: Set[int] = set()
+    if total > 4 * needed:
+        while len(seen) < 2 * needed:
+            position = rng.randrange(total)
+            if position not in seen:
+                seen.add(position)
+                yield position
+    rest = [position for position in range(total) if position not in seen]
+    rng.shuffle(rest)
+    yield from rest
+
+
+def build_round(words: Sequence[QuizWord], questions: int = QUESTIONS, options: int = OPTIONS,
+                rng: Optional[random.Random] = None) -> List[QuizQuestion]:
+    """
+    Вопросы раунда по словам words (последовательность с доступом по номеру)
+    Слова без перевода не спрашиваются; пустой список - в словаре меньше двух слов с разными переводами
+    """
+    rng = rng or random
+    total = len(words)
+    if total < 2:
+        return []
+    round_ = []
+    # Слова в случайном порядке, пока не наберется раунд (слова без перевода пропускаются)
+    for position in _random_positions(total, questions, rng):
+        item = words[position]
+        if not item.translation:
+            continue
+        choices = {item.translation}
+        for _ in range(_DISTRACTOR_TRIES * (options - 1)):
+            if len(choices) == options:
+                break
+            other = words[rng.randrange(total)].translation
+            if other:
+                choices.add(other)
+        if len(choices) < 2:
+            continue
+        shuffled = list(choices)
+        rng.shuffle(shuffled)
+        round_.append(QuizQuestion(item.word, item.part_of_speech, tuple(shuffled), shuffled.index(item.translation)))
+        if len(round_) == questions:
+            break
+    return round_
+
+
+def parse_answer(arg: str, options: int = OPTIONS) -> Optional[Tuple[int, int]]:
+    """
+    Номер вопроса и варианта из данных кнопки ответа ("3.1")
+    None - данные подделаны или устарели (не числа, вариант вне диапазона)
+    """
+    number, _, choice = arg.partition(".")
+    if not (number.isdigit() and choice.isdigit()) or int(choice) >= options:
+        return None
+    return int(number), int(choice)
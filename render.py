@@ -0,0 +1,239 @@
+"""
+СЛОЙ ОТРИСОВКИ: ГОТОВЫЕ КЛАВИАТУРЫ И ШАБЛОНЫ КАРТОЧЕК
+
+Клавиатуры не зависят от данных пользователя, поэтому создаются один раз при импорте
+(сборка pydantic-моделей на каждый вызов заметна в профиле горячих обработчиков).
+Они заморожены: случайно изменить общую клавиатуру из обработчика нельзя.
+Сериализованный вид каждой клавиатуры тоже считается один раз - он используется
+как часть подписи сообщения при проверке «изменилось ли содержимое».
+"""
+
+import html
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from pydantic import ConfigDict
+
+from callbacks import DictAction, dict_button_data
+from mssgs import (
+    EDIT_MENU,
+    EDIT_POS_PROMPT,
+    GREETING,
+    LEXICON_SUGGESTION,
+    QUIZ_CORRECT,
+    QUIZ_OPTION,
+    QUIZ_QUESTION,
+    QUIZ_RESULT,
+    QUIZ_WRONG,
+    STATS,
+    STATS_PART,
+    STATS_WEEK,
+    WORD_CARD,
+    WORD_CARD_VALUE,
+    WORD_FULL_INFO,
+    WORD_FULL_INFO_VALUE,
+    WORD_SAVED,
+    WORD_SAVED_VALUE,
+)
+
+# Ширина столбика самой активной недели в /stats
+STATS_BAR_WIDTH = 10
+# Длина краткого значения в карточке слова
+SHORT_VALUE_LENGTH = 23
+
+
+class FrozenKeyboard(InlineKeyboardMarkup):
+    """Неизменяемая клавиатура, общая для всех пользователей"""
+    model_config = ConfigDict(frozen=True)
+
+
+def _button(text: str, action: DictAction, arg: str = "") -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=text, callback_data=dict_button_data(action, arg))
+
+
+# = ОСНОВНОЙ БОТ =
+
+MAIN_MENU_KEYBOARD = FrozenKeyboard(inline_keyboard=[
+    [
+        # Кнопка перехода к боту-словарю
+        InlineKeyboardButton(text="📚 Бот-словарь", url="https://t.me/lllang_dictbot"),
+        # Кнопка технической поддержки
+        InlineKeyboardButton(text="🛠 Поддержка", url="https://t.me/NonGrata4Life")
+    ],
+    [
+        # Кнопка информации о боте
+        InlineKeyboardButton(text="ℹ️ О боте", callback_data="about")
+    ],
+])
+
+ABOUT_KEYBOARD = FrozenKeyboard(inline_keyboard=[
+    [InlineKeyboardButton(text="🔙 Go Back", callback_data="go_back")]
+])
+
+# = БОТ-СЛОВАРЬ: ПРОСМОТР =
+
+WORD_CARD_KEYBOARD = FrozenKeyboard(inline_keyboard=[
+    # Кнопка показа полной информации
+    [_button("ℹ️ Инфо", DictAction.SHOW_INFO)],
+    # Кнопки навигации: предыдущее и следующее слово
+    [_button("⬅️", DictAction.PREV_WORD), _button("➡️", DictAction.NEXT_WORD)],
+    # Кнопки навигации по буквам
+    [_button("⬆️ Буква", DictAction.PREV_LETTER), _button("Буква ⬇️", DictAction.NEXT_LETTER)],
+    # Кнопки действий: редактирование и удаление
+    [_button("✏️ Изменить", DictAction.EDIT_WORD), _button("🗑️ Удалить", DictAction.DELETE_WORD)],
+    # Кнопка отмены/выхода
+    [_button("❌ Отменить", DictAction.CANCEL_WORDS)],
+])
+
+WORD_INFO_KEYBOARD = FrozenKeyboard(inline_keyboard=[
+    [_button("🔙 Назад", DictAction.GO_BACK)]
+])
+
+# = БОТ-СЛОВАРЬ: РЕДАКТИРОВАНИЕ =
+
+EDIT_MENU_KEYBOARD = FrozenKeyboard(inline_keyboard=[
+    [_button("✏️ Слово", DictAction.EDIT_FIELD, "text"), _button("💡 Значение", DictAction.EDIT_FIELD, "value")],
+    [_button("🔤 Часть речи", DictAction.EDIT_FIELD, "pos")],
+    [_button("↩️ Назад", DictAction.CANCEL_EDIT)],
+])
+
+EDIT_POS_KEYBOARD = FrozenKeyboard(inline_keyboard=[
+    [_button("Noun", DictAction.NEW_POS, "noun"), _button("Verb", DictAction.NEW_POS, "verb")],
+    [_button("Adjective", DictAction.NEW_POS, "adjective"), _button("Adverb", DictAction.NEW_POS, "adverb")],
+    [_button("↩️ Назад", DictAction.CANCEL_EDIT)],
+])
+
+# = БОТ-СЛОВАРЬ: ДОБАВЛЕНИЕ =
+
+ADD_POS_KEYBOARD = FrozenKeyboard(inline_keyboard=[
+    [_button("Существительное", DictAction.POS, "noun")],
+    [_button("Глагол", DictAction.POS, "verb"), _button("Прилагательное", DictAction.POS, "adjective")],
+    [_button("Наречие", DictAction.POS, "adverb"), _button("Другое", DictAction.POS_OTHER)],
+    [_button("Отменить", DictAction.POS_CANCEL)],
+])
+
+LEXICON_SUGGEST_KEYBOARD = FrozenKeyboard(inline_keyboard=[
+    [_button("✅ Сохранить", DictAction.LEX_ACCEPT)],
+    [_button("🔤 Другая часть речи", DictAction.LEX_MANUAL), _button("Отменить", DictAction.POS_CANCEL)],
+])
+
+# = БОТ-СЛОВАРЬ: ТЕСТ =
+
+QUIZ_STOP_BUTTON = _button("🏁 Завершить", DictAction.QUIZ_STOP)
+
+# Сериализованный вид готовых клавиатур: id(клавиатуры) -> JSON
+# (клавиатуры живут все время работы процесса, поэтому id стабилен)
+_SERIALIZED: Dict[int, str] = {
+    id(keyboard): keyboard.model_dump_json(exclude_none=True)
+    for keyboard in (
+        MAIN_MENU_KEYBOARD, ABOUT_KEYBOARD, WORD_CARD_KEYBOARD, WORD_INFO_KEYBOARD,
+        EDIT_MENU_KEYBOARD, EDIT_POS_KEYBOARD, ADD_POS_KEYBOARD, LEXICON_SUGGEST_KEYBOARD,
+    )
+}
+
+
+def serialize_keyboard(keyboard: Optional[InlineKeyboardMarkup]) -> Optional[str]:
+    """JSON клавиатуры: для готовых - из кеша, для остальных - сериализация на месте"""
+    if keyboard is None:
+        return None
+    return _SERIALIZED.get(id(keyboard)) or keyboard.model_dump_json(exclude_none=True)
+
+
+# = ШАБЛОНЫ ТЕКСТА =
+
+def shorten(value: str) -> str:
+    """Краткое значение слова для карточки"""
+    return value[:SHORT_VALUE_LENGTH] + '...' if len(value) > SHORT_VALUE_LENGTH else value
+
+
+def render_greeting(name: str) -> str:
+    return GREETING.format(name=name)
+
+
+def render_word_card(
+    word: str, pos: str, value: str, index: int, total: int, full_info: bool = False
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Текст и клавиатура карточки слова
+    - full_info: True - полное значение без сокращений, False - краткая карточка с навигацией
+    """
+    if full_info:
+        text = WORD_FULL_INFO.format(word=word, number=index + 1, total=total, pos=pos)
+        if value:
+            text += WORD_FULL_INFO_VALUE.format(value=value)
+        return text, WORD_INFO_KEYBOARD
+
+    text = WORD_CARD.format(word=word, number=index + 1, total=total, pos=pos)
+    if value:
+        text += WORD_CARD_VALUE.format(value=shorten(value))
+    return text, WORD_CARD_KEYBOARD
+
+
+def render_edit_menu(word: str, pos: str, value: str) -> Tuple[str, InlineKeyboardMarkup]:
+    return EDIT_MENU.format(word=word, pos=pos, value=value or 'None'), EDIT_MENU_KEYBOARD
+
+
+def render_edit_pos_prompt(word: str) -> Tuple[str, InlineKeyboardMarkup]:
+    return EDIT_POS_PROMPT.format(word=word), EDIT_POS_KEYBOARD
+
+
+def render_lexicon_suggestion(word: str, pos: str, value: str) -> Tuple[str, InlineKeyboardMarkup]:
+    """Подсказка офлайн-словаря: часть речи и значение с кнопкой сохранения"""
+    text = LEXICON_SUGGESTION.format(word=html.escape(word), pos=html.escape(pos), value=html.escape(value))
+    return text, LEXICON_SUGGEST_KEYBOARD
+
+
+def render_word_saved(word: str, pos: str, value: Optional[str]) -> str:
+    """Сообщение об успешном добавлении слова"""
+    text = WORD_SAVED.format(word=word, pos=pos)
+    if value:
+        text += WORD_SAVED_VALUE.format(value=shorten(value))
+    return text
+
+
+def render_stats(total: int, parts: List[Tuple[str, int]], weeks: List[Tuple[date, int]]) -> str:
+    """Статистика словаря: части речи и столбики по неделям (самая активная неделя - полный столбик)"""
+    peak = max((count for _, count in weeks), default=0)
+    return STATS.format(
+        total=total,
+        parts="\n".join(STATS_PART.format(pos=html.escape(pos), count=count) for pos, count in parts),
+        weeks="\n".join(
+            STATS_WEEK.format(
+                week=week.strftime("%d.%m"),
+                bar="▇" * round(STATS_BAR_WIDTH * count / peak) if peak else "",
+                count=count,
+            )
+            for week, count in weeks
+        ),
+    )
+
+
+def render_quiz_question(
+    number: int, total: int, word: str, pos: str, options: List[str], feedback: str = ""
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Вопрос теста: по кнопке на вариант перевода (arg - номер вопроса и варианта,
+    чтобы повторное нажатие на уже отвеченный вопрос не засчитывалось)
+    Варианты полностью - в тексте под номерами, на кнопке - номер и начало перевода
+    - feedback: результат предыдущего ответа над вопросом
+    """
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [_button(f"{i + 1}. {shorten(option)}", DictAction.QUIZ_ANSWER, f"{number - 1}.{i}")]
+        for i, option in enumerate(options)
+    ] + [[QUIZ_STOP_BUTTON]])
+    listed = "\n".join(
+        QUIZ_OPTION.format(number=i + 1, option=html.escape(option)) for i, option in enumerate(options)
+    )
+    text = feedback + QUIZ_QUESTION.format(
+        number=number, total=total, word=html.escape(word), pos=html.escape(pos), options=listed
+    )
+    return text, keyboard
+
+
+def render_quiz_feedback(correct: bool, word: str, answer: str) -> str:
+    return QUIZ_CORRECT if correct else QUIZ_WRONG.format(word=html.escape(word), answer=html.escape(answer))
+
+
+def render_quiz_result(score: int, total: int, feedback: str = "") -> str:
+    return feedback + QUIZ_RESULT.format(score=score, total=total)
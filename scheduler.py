@@ -0,0 +1,309 @@
+"""
+ПЛАНИРОВЩИК НАПОМИНАНИЙ И «СЛОВА ДНЯ»
+
+Работает внутри того же event loop, что и боты:
+1. Расписание хранится в Postgres (таблица reminders), поэтому переживает рестарты
+2. Каждый тик - ОДИН запрос: забирает пачку пользователей, у которых подошло время,
+   сразу переносит им next_run_at на следующий день и выбирает слово для повтора
+3. Отправка идет через очередь с ограничением скорости (лимиты Telegram)
+
+Несколько реплик могут работать одновременно: строки забираются через
+FOR UPDATE SKIP LOCKED, а время следующего запуска сдвигается в той же транзакции,
+поэтому одно и то же напоминание не уйдет дважды (даже после рестарта).
+"""
+
+import asyncio
+import html
+import logging
+import time
+import zlib
+from datetime import date, time as dt_time
+from typing import Awaitable, Callable, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter, TelegramBadRequest
+from asyncpg.pool import Pool
+
+from mssgs import REMINDER_REVIEW, REMINDER_WORD_OF_THE_DAY, WORDS_OF_THE_DAY
+
+# Таблица расписания и частичный индекс по времени запуска:
+# выборка «кому пора» всегда идет по индексу, а не сканом всех пользователей.
+# Индекс по chat_id - для отключения напоминаний чата, заблокировавшего бота (disable_chat)
+REMINDERS_DDL = """
+    CREATE TABLE IF NOT EXISTS reminders (
+        user_id BIGINT PRIMARY KEY,
+        chat_id BIGINT NOT NULL,
+        timezone TEXT NOT NULL,
+        remind_time TIME NOT NULL,
+        next_run_at TIMESTAMPTZ NOT NULL,
+        last_sent_at TIMESTAMPTZ,
+        last_word_id INTEGER,
+        enabled BOOLEAN NOT NULL DEFAULT TRUE
+    );
+    CREATE INDEX IF NOT EXISTS reminders_due_idx ON reminders (next_run_at) WHERE enabled;
+    CREATE INDEX IF NOT EXISTS reminders_chat_idx ON reminders (chat_id);
+"""
+
+# Ближайший момент remind_time (строго в будущем) в часовом поясе пользователя
+_NEXT_RUN_SQL = """
+    (date_trunc('day', NOW() AT TIME ZONE {tz}) + {rt}
+     + CASE WHEN (NOW() AT TIME ZONE {tz})::time < {rt}
+            THEN INTERVAL '0' ELSE INTERVAL '1 day' END) AT TIME ZONE {tz}
+"""
+
+# Один запрос на тик:
+# - due: пачка просроченных напоминаний (по индексу, с пропуском чужих блокировок)
+# - claimed: переносим их на следующий день и выбираем следующее слово по кругу
+#   (первое после последнего отправленного, иначе - самое первое; оба - один шаг по индексу)
+# - итог: подтягиваем текст выбранного слова
+_CLAIM_SQL = f"""
+    WITH due AS (
+        SELECT user_id, next_run_at FROM reminders
+        WHERE enabled AND next_run_at <= NOW()
+        ORDER BY next_run_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    ), claimed AS (
+        UPDATE reminders r
+        SET next_run_at = {_NEXT_RUN_SQL.format(tz="r.timezone", rt="r.remind_time")},
+            last_sent_at = NOW(),
+            last_word_id = COALESCE(
+                (SELECT w.id FROM words w
+                 WHERE w.user_id = r.user_id AND w.id > COALESCE(r.last_word_id, 0)
+                 ORDER BY w.id LIMIT 1),
+                (SELECT MIN(w.id) FROM words w WHERE w.user_id = r.user_id)
+            )
+        FROM due
+        WHERE r.user_id = due.user_id
+        RETURNING r.user_id, r.chat_id, r.last_word_id, due.next_run_at AS scheduled_at
+    )
+    SELECT c.user_id, c.chat_id, c.scheduled_at, w.word, w.translation
+    FROM claimed c
+    LEFT JOIN words w ON w.user_id = c.user_id AND w.id = c.last_word_id
+"""
+
+_UPSERT_SQL = f"""
+    INSERT INTO reminders (user_id, chat_id, timezone, remind_time, next_run_at, enabled)
+    VALUES ($1, $2, $3::text, $4::time, {_NEXT_RUN_SQL.format(tz="$3::text", rt="$4::time")}, TRUE)
+    ON CONFLICT (user_id) DO UPDATE
+    SET chat_id = EXCLUDED.chat_id,
+        timezone = EXCLUDED.timezone,
+        remind_time = EXCLUDED.remind_time,
+        next_run_at = EXCLUDED.next_run_at,
+        enabled = TRUE
+    RETURNING next_run_at
+"""
+
+
+def default_remind_time(user_id: int, hour: int = 9) -> dt_time:
+    """
+    Время напоминания по умолчанию
+    Пользователи равномерно «размазаны» по минутам часа, чтобы не отправлять всем сразу
+    """
+    return dt_time(hour=hour, minute=zlib.crc32(str(user_id).encode()) % 60)
+
+
+def parse_timezone(name: str) -> Optional[str]:
+    """Проверяет название часового пояса (IANA), возвращает None если пояс неизвестен"""
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+    return name
+
+
+def word_of_the_day(day: Optional[date] = None) -> str:
+    """Общее слово дня - для пользователей с пустым словарем"""
+    day = day or date.today()
+    return WORDS_OF_THE_DAY[day.toordinal() % len(WORDS_OF_THE_DAY)]
+
+
+def reminder_text(word: Optional[str], translation: Optional[str], day: Optional[date] = None) -> str:
+    """Текст напоминания (HTML): слово пользователя для повтора или слово дня, если словарь пуст"""
+    if word:
+        return REMINDER_REVIEW.format(word=html.escape(word), translation=html.escape(translation or "—"))
+    return REMINDER_WORD_OF_THE_DAY.format(word=word_of_the_day(day))
+
+
+class RateLimitedSender:
+    """
+    Очередь исходящих сообщений с ограничением скорости (token bucket)
+
+    Telegram допускает ~30 сообщений в секунду на бота, поэтому по умолчанию 25.
+    Если пользователь заблокировал бота - вызывается on_forbidden(chat_id).
+    На просьбу Telegram подождать (flood limit) - не больше max_attempts попыток на сообщение,
+    чтобы один чат не задерживал всю очередь.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate: float = 25.0,
+        maxsize: int = 1000,
+        on_forbidden: Optional[Callable[[int], Awaitable[None]]] = None,
+        max_attempts: int = 3,
+    ):
+        self.bot = bot
+        self.rate = rate
+        self.max_attempts = max_attempts
+        self.queue: asyncio.Queue[Tuple[int, str]] = asyncio.Queue(maxsize=maxsize)
+        self.on_forbidden = on_forbidden
+        self._task: Optional[asyncio.Task] = None
+
+    def free_slots(self) -> int:
+        """Сколько сообщений еще можно поставить в очередь без ожидания"""
+        return self.queue.maxsize - self.queue.qsize()
+
+    async def put(self, chat_id: int, text: str):
+        await self.queue.put((chat_id, text))
+
+    def start(self):
+        self._task = asyncio.create_task(self._worker(), name="reminder-sender")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _worker(self):
+        tokens = self.rate
+        last = time.monotonic()
+        while True:
+            chat_id, text = await self.queue.get()
+            # Пополняем «ведро» и ждем, если токенов не осталось
+            now = time.monotonic()
+            tokens = min(self.rate, tokens + (now - last) * self.rate)
+            last = now
+            if tokens < 1:
+                await asyncio.sleep((1 - tokens) / self.rate)
+                tokens, last = 1.0, time.monotonic()
+            tokens -= 1
+            try:
+                await self._send(chat_id, text)
+            finally:
+                self.queue.task_done()
+
+    async def _send(self, chat_id: int, text: str):
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    await self.bot.send_message(chat_id, text)
+                    return
+                except TelegramRetryAfter as e:
+                    if attempt == self.max_attempts:
+                        logging.warning("Reminder to %s dropped after %s flood-limited attempts", chat_id, attempt)
+                        return
+                    # Telegram просит подождать - ждем и пробуем еще раз
+                    await asyncio.sleep(e.retry_after)
+        except TelegramForbiddenError:
+            if self.on_forbidden:
+                # Ошибка здесь (база недоступна) не должна останавливать отправку остальным
+                try:
+                    await self.on_forbidden(chat_id)
+                except Exception:
+                    logging.exception("Disabling reminders for %s failed", chat_id)
+        except TelegramBadRequest as e:
+            logging.warning("Reminder to %s rejected: %s", chat_id, e)
+        except Exception:
+            logging.exception("Reminder to %s failed", chat_id)
+
+
+class ReminderScheduler:
+    """
+    Планировщик напоминаний
+
+    Параметры:
+    - pool: пул соединений с Postgres
+    - sender: очередь отправки
+    - batch_size: сколько напоминаний забирать за один тик
+    - interval: пауза между тиками, если просроченных напоминаний не осталось
+    - max_lateness: напоминания, опоздавшие сильнее (например после долгого простоя),
+      не отправляются, а просто переносятся на следующий день
+    - acquire_timeout: предел ожидания соединения из пула, секунд (None - без предела);
+      при зависшей базе /remind и тик завершаются asyncio.TimeoutError, а не копятся
+    """
+
+    def __init__(
+        self,
+        pool: Pool,
+        sender: RateLimitedSender,
+        batch_size: int = 500,
+        interval: float = 30.0,
+        max_lateness: float = 6 * 3600,
+        acquire_timeout: Optional[float] = None,
+    ):
+        self.pool = pool
+        self.sender = sender
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_lateness = max_lateness
+        self.acquire_timeout = acquire_timeout
+        self._task: Optional[asyncio.Task] = None
+
+    def _acquire(self):
+        return self.pool.acquire(timeout=self.acquire_timeout)
+
+    async def set_reminder(self, user_id: int, chat_id: int, timezone: str, remind_time: dt_time):
+        """Включает (или меняет) ежедневное напоминание, возвращает время ближайшей отправки"""
+        async with self._acquire() as conn:
+            return await conn.fetchval(_UPSERT_SQL, user_id, chat_id, timezone, remind_time)
+
+    async def disable_reminder(self, user_id: int) -> bool:
+        async with self._acquire() as conn:
+            result = await conn.execute(
+                "UPDATE reminders SET enabled = FALSE WHERE user_id = $1", user_id
+            )
+            return result != "UPDATE 0"
+
+    async def disable_chat(self, chat_id: int):
+        """Отключает напоминания для чата, который заблокировал бота"""
+        async with self._acquire() as conn:
+            await conn.execute("UPDATE reminders SET enabled = FALSE WHERE chat_id = $1", chat_id)
+
+    async def tick(self) -> int:
+        """
+        Один тик планировщика
+        Возвращает количество забранных напоминаний
+        """
+        # Не забираем больше, чем поместится в очередь отправки
+        limit = min(self.batch_size, self.sender.free_slots())
+        if limit <= 0:
+            return 0
+
+        async with self._acquire() as conn:
+            rows = await conn.fetch(_CLAIM_SQL, limit)
+
+        now = time.time()
+        for row in rows:
+            if now - row["scheduled_at"].timestamp() > self.max_lateness:
+                continue
+            await self.sender.put(row["chat_id"], reminder_text(row["word"], row["translation"]))
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Reminder tick failed")
+                claimed = 0
+            # Полная пачка - вероятно есть еще просроченные, продолжаем без паузы
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.interval)
+            else:
+                await asyncio.sleep(0)
+
+    def start(self):
+        self.sender.start()
+        self._task = asyncio.create_task(self._run(), name="reminder-scheduler")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.sender.stop()
@@ -0,0 +1,177 @@
+"""
+СТАТИКА TELEGRAM WEBAPP: ЗАГРУЗКА В ПАМЯТЬ, СЖАТИЕ И КЕШИРОВАНИЕ
+
+Сборка WebApp (webapp/dist) читается один раз при запуске:
+1. Для каждого файла заранее готовятся сжатые варианты (gzip и, если установлен пакет brotli, br)
+2. Ассеты получают адреса с хешем содержимого в том же каталоге (assets/app.js ->
+   /static/assets/app.3f2a9c1b7d4e.js) и отдаются с Cache-Control: immutable на год -
+   браузер не спрашивает их повторно
+3. index.html переписывается на хешированные адреса и отдается с ETag и no-cache:
+   повторное открытие WebApp - это условный запрос и ответ 304 без тела
+4. Исходные адреса (/static/assets/app.js) тоже отдаются, с ETag и no-cache: по ним идут
+   ссылки внутри самих ассетов - url() в CSS, import() чанков в JS. Каталоги сохраняются,
+   поэтому относительная ссылка из хешированного файла (./fonts/x.woff) ведет на исходный файл.
+   Абсолютные ссылки на файлы сборки внутри CSS/JS (url(/assets/x.woff), import("/assets/chunk.js"))
+   переписываются на /static/ до подсчета хеша
+Обработка запроса - только выбор готовых байтов и заголовков, без чтения диска и сжатия.
+"""
+
+import copy
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+try:
+    import brotli  # Необязательная зависимость: без нее отдаем только gzip
+except ImportError:
+    brotli = None
+
+# Уже сжатые форматы - повторно не сжимаем
+_INCOMPRESSIBLE = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".woff", ".woff2", ".ico", ".mp4", ".zip"}
+# Файлы меньше этого размера не сжимаем (заголовки дороже выигрыша)
+_MIN_COMPRESS_SIZE = 512
+# Файлы, в которых абсолютные ссылки на сборку переписываются на /static/
+_REWRITTEN = {".css", ".js", ".mjs"}
+# Ссылка в тексте: открывающий символ -> допустимые символы после пути
+_REFERENCE_BOUNDS = {'"': '"?#', "'": "'?#", "`": "`?#", "(": ")?#"}
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+def _accepted_encodings(header: str) -> Tuple[str, ...]:
+    """Кодировки из Accept-Encoding (без тех, что запрещены через q=0)"""
+    accepted = []
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.append(token.strip().lower())
+    return tuple(accepted)
+
+
+def _rewrite_absolute_references(text: str, relatives, url_prefix: str) -> str:
+    """Абсолютные ссылки /<путь файла сборки> -> <url_prefix><путь> (длинные пути первыми)"""
+    for relative in sorted(relatives, key=len, reverse=True):
+        if f"/{relative}" not in text:
+            continue
+        for opening, closings in _REFERENCE_BOUNDS.items():
+            for closing in closings:
+                text = text.replace(f"{opening}/{relative}{closing}", f"{opening}{url_prefix}{relative}{closing}")
+    return text
+
+
+class StaticAsset:
+    """Один файл: исходные байты, сжатые варианты и готовые заголовки"""
+
+    def __init__(self, content: bytes, content_type: str, cache_control: str, compress: bool):
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        self.content_type = content_type
+        self.cache_control = cache_control
+        # кодировка -> тело ответа, в порядке предпочтения
+        self.variants: Dict[str, bytes] = {}
+        if compress and len(content) >= _MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                compressed = brotli.compress(content, quality=11)
+                if len(compressed) < len(content):
+                    self.variants["br"] = compressed
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                self.variants["gzip"] = compressed
+        self.variants["identity"] = content
+
+    def with_cache_control(self, cache_control: str) -> "StaticAsset":
+        """Тот же файл (сжатые варианты общие) с другим Cache-Control"""
+        asset = copy.copy(self)
+        asset.cache_control = cache_control
+        return asset
+
+    def response(self, request: web.Request) -> web.Response:
+        headers = {
+            "Cache-Control": self.cache_control,
+            "ETag": self.etag,
+            "Vary": "Accept-Encoding",
+        }
+        # Браузер уже имеет эту версию - тело не нужно
+        if self.etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+
+        encoding = "identity"
+        if len(self.variants) > 1:
+            accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+            encoding = next((name for name in self.variants if name in accepted), "identity")
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return web.Response(body=self.variants[encoding], content_type=self.content_type, headers=headers)
+
+
+class StaticBundle:
+    """
+    Сборка WebApp в памяти
+    - index: index.html (переписанный на хешированные адреса ассетов)
+    - assets: путь после /static/ (хешированный или исходный) -> файл
+    """
+
+    def __init__(self, index: Optional[StaticAsset], assets: Dict[str, StaticAsset]):
+        self.index = index
+        self.assets = assets
+
+    @classmethod
+    def load(cls, root: str, url_prefix: str = "/static/") -> "StaticBundle":
+        """Читает каталог сборки (синхронно - вызывать через asyncio.to_thread)"""
+        if not os.path.isdir(root):
+            logging.warning("WebApp bundle not found at %s", root)
+            return cls(None, {})
+
+        assets: Dict[str, StaticAsset] = {}
+        # исходный относительный путь -> хешированный адрес
+        urls: Dict[str, str] = {}
+        # исходный относительный путь -> содержимое
+        files: Dict[str, bytes] = {}
+
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root).replace(os.sep, "/")] = f.read()
+        index_content = files.pop("index.html", None)
+
+        for relative, content in files.items():
+            stem, ext = os.path.splitext(relative)
+            if ext.lower() in _REWRITTEN:
+                content = _rewrite_absolute_references(content.decode("utf-8"), files, url_prefix).encode("utf-8")
+            hashed = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+            content_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+            asset = StaticAsset(content, content_type, IMMUTABLE_CACHE, ext.lower() not in _INCOMPRESSIBLE)
+            assets[hashed] = asset
+            assets.setdefault(relative, asset.with_cache_control(REVALIDATE_CACHE))
+            urls[relative] = url_prefix + hashed
+
+        index = None
+        if index_content is not None:
+            html = index_content.decode("utf-8")
+            # Ссылки на ассеты в index.html -> хешированные адреса (длинные пути первыми)
+            for relative in sorted(urls, key=len, reverse=True):
+                for quote in ('"', "'"):
+                    for prefix in ("/", "./", ""):
+                        html = html.replace(f"{quote}{prefix}{relative}{quote}", f"{quote}{urls[relative]}{quote}")
+            index = StaticAsset(html.encode("utf-8"), "text/html", REVALIDATE_CACHE, compress=True)
+
+        logging.info("WebApp bundle loaded: %s assets, gzip%s", len(urls), "+br" if brotli else "")
+        return cls(index, assets)
+
+    async def index_handler(self, request: web.Request) -> web.Response:
+        if self.index is None:
+            raise web.HTTPNotFound()
+        return self.index.response(request)
+
+    async def asset_handler(self, request: web.Request) -> web.Response:
+        asset = self.assets.get(request.match_info["name"])
+        if asset is None:
+            raise web.HTTPNotFound()
+        return asset.response(request)
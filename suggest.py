@@ -0,0 +1,175 @@
+"""
+АВТОДОПОЛНЕНИЕ ПО ПРЕФИКСУ: /api/words/suggest И INLINE-РЕЖИМ БОТА-СЛОВАРЯ
+
+Inline-запросы приходят на каждое нажатие клавиши, поэтому ответ строится из памяти:
+1. PrefixIndex - слова одного пользователя: отсортированный список ключей + bisect
+   (все слова с префиксом лежат подряд), для каждого слова - ранг свежести
+2. SuggestCache - LRU таких индексов; индекс загружается из БД при первом запросе
+   пользователя и дальше обновляется функциями записи (word_added / word_deleted)
+Результат - слова с префиксом, самые свежие первыми.
+"""
+
+import asyncio
+import bisect
+import heapq
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from lexicon import normalize_key
+from metrics import Counter
+
+SUGGEST_CACHE = Counter("suggest_cache_total", "Запросы автодополнения по результату поиска индекса в кеше", ["result"])
+
+# Разделитель нормализованного ключа и слова в ключе индекса (разные слова с одинаковым ключом не склеиваются)
+_SEPARATOR = "\0"
+# Сколько слов с префиксом просматривать для ранжирования (ограничивает время очень коротких префиксов)
+MAX_SCAN = 5000
+# Ответ на пустой запрос (последние слова) кешируется в индексе до следующей записи
+MAX_RECENT = 50
+
+
+class Suggestion(NamedTuple):
+    word: str
+    part_of_speech: str
+    translation: str
+    rank: int
+
+
+class PrefixIndex:
+    """
+    Слова одного пользователя
+    - keys: отсортированные ключи "нормализованное слово\\0слово"
+    - items: ключ -> слово с рангом (больше - свежее)
+    """
+
+    __slots__ = ("keys", "items", "_next_rank", "_recent")
+
+    def __init__(self, rows: List[Tuple[str, str, str, int]]):
+        self.items: Dict[str, Suggestion] = {
+            self._key(word): Suggestion(word, pos, translation, rank) for word, pos, translation, rank in rows
+        }
+        self.keys = sorted(self.items)
+        self._next_rank = max((rank for *_, rank in rows), default=0) + 1
+        self._recent: Optional[List[Suggestion]] = None
+
+    @staticmethod
+    def _key(word: str) -> str:
+        return normalize_key(word) + _SEPARATOR + word
+
+    def add(self, word: str, pos: str, translation: str):
+        key = self._key(word)
+        if key not in self.items:
+            bisect.insort(self.keys, key)
+        self.items[key] = Suggestion(word, pos, translation, self._next_rank)
+        self._next_rank += 1
+        self._recent = None
+
+    def remove(self, word: str):
+        key = self._key(word)
+        if self.items.pop(key, None) is not None:
+            del self.keys[bisect.bisect_left(self.keys, key)]
+            self._recent = None
+
+    # Доступ по номеру в алфавитном порядке - случайная выборка слов для /quiz (quiz.build_round)
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getitem__(self, position: int) -> Suggestion:
+        return self.items[self.keys[position]]
+
+    def search(self, prefix: str, limit: int) -> List[Suggestion]:
+        prefix = normalize_key(prefix)
+        if not prefix:
+            # Пустой запрос - просто последние слова
+            if limit > MAX_RECENT:
+                return heapq.nlargest(limit, self.items.values(), key=lambda item: item.rank)
+            if self._recent is None:
+                self._recent = heapq.nlargest(MAX_RECENT, self.items.values(), key=lambda item: item.rank)
+            return self._recent[:limit]
+        start = bisect.bisect_left(self.keys, prefix)
+        matches = []
+        for key in self.keys[start:start + MAX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            matches.append(self.items[key])
+        return heapq.nlargest(limit, matches, key=lambda item: item.rank)
+
+
+class SuggestCache:
+    """
+    LRU индексов пользователей
+    loader(user_id) -> [(слово, часть речи, перевод, ранг)] - загрузка из БД
+    """
+
+    def __init__(self, loader: Callable[[int], Awaitable[List[Tuple[str, str, str, int]]]], max_users: int = 10_000):
+        self.loader = loader
+        self.max_users = max_users
+        self._indexes: "OrderedDict[int, PrefixIndex]" = OrderedDict()
+        # Загрузки в процессе: одновременные запросы ждут одну загрузку
+        self._loading: Dict[int, "asyncio.Future[PrefixIndex]"] = {}
+        # Пользователи, чей словарь изменился во время загрузки (загруженный индекс мог устареть)
+        self._stale: Set[int] = set()
+
+    async def get(self, user_id: int) -> PrefixIndex:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            self._indexes.move_to_end(user_id)
+            SUGGEST_CACHE.inc(result="hit")
+            return index
+        SUGGEST_CACHE.inc(result="miss")
+        loading = self._loading.get(user_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        loading = self._loading[user_id] = asyncio.get_running_loop().create_future()
+        try:
+            index = PrefixIndex(await self.loader(user_id))
+        except asyncio.CancelledError:
+            self._stale.discard(user_id)
+            loading.cancel()
+            raise
+        except Exception as e:
+            self._stale.discard(user_id)
+            loading.set_exception(e)
+            # Исключение получат ожидающие; если их нет - не выводим предупреждение
+            loading.exception()
+            raise
+        finally:
+            del self._loading[user_id]
+        loading.set_result(index)
+        if user_id in self._stale:
+            self._stale.discard(user_id)
+        else:
+            self._indexes[user_id] = index
+            if len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    async def search(self, user_id: int, prefix: str, limit: int = 10) -> List[Suggestion]:
+        return (await self.get(user_id)).search(prefix, limit)
+
+    # = ОБНОВЛЕНИЕ ПРИ ЗАПИСИ =
+
+    def word_added(self, user_id: int, word: str, pos: str, translation: str):
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.add(word, pos, translation)
+        elif user_id in self._loading:
+            self._stale.add(user_id)
+
+    def word_deleted(self, user_id: int, word: str):
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.remove(word)
+        elif user_id in self._loading:
+            self._stale.add(user_id)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Сбрасывает индекс пользователя (None - всех), например после записи из другого процесса"""
+        if user_id is None:
+            self._indexes.clear()
+            self._stale.update(self._loading)
+        else:
+            self._indexes.pop(user_id, None)
+            if user_id in self._loading:
+                self._stale.add(user_id)
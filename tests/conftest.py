@@ -0,0 +1,51 @@
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncpg  # noqa: E402
+
+
+def _connect_args() -> dict:
+    return dict(
+        host=os.getenv("POSTGRES_HOST", "localhost"),
+        port=int(os.getenv("POSTGRES_PORT", "5432")),
+        user=os.getenv("POSTGRES_USER", "postgres"),
+        password=os.getenv("POSTGRES_PASSWORD", "password"),
+        database=os.getenv("POSTGRES_DB", "telegram_bot"),
+    )
+
+
+@pytest.fixture
+def pg_schema():
+    """
+    Параметры asyncpg.connect/create_pool для отдельной временной схемы базы (нужен Postgres, POSTGRES_*)
+    Схема удаляется после теста; без Postgres тест пропускается
+    """
+    async def create(schema):
+        conn = await asyncpg.connect(**_connect_args())
+        try:
+            await conn.execute(f"CREATE SCHEMA {schema}")
+        finally:
+            await conn.close()
+
+    async def drop(schema):
+        conn = await asyncpg.connect(**_connect_args())
+        try:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        finally:
+            await conn.close()
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    try:
+        asyncio.run(create(schema))
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"Postgres is not available: {e}")
+    try:
+        yield dict(_connect_args(), server_settings={"search_path": schema})
+    finally:
+        asyncio.run(drop(schema))
@@ -0,0 +1,130 @@
+"""Выключатель обращений к базе: размыкание, проба и чтение при недоступной реплике"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import asyncpg
+import pytest
+
+import main
+from db_breaker import CircuitBreaker, DatabaseUnavailable
+
+
+class FakePool:
+    """Пул, соединения которого отвечают answer, или недоступный (down=True)"""
+
+    def __init__(self, answer=None, down=False):
+        self.answer = answer
+        self.down = down
+        self.acquired = 0
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        if self.down:
+            raise ConnectionRefusedError("connection refused")
+        self.acquired += 1
+        yield self
+
+
+async def fail(breaker, error=OSError("connection reset")):
+    with pytest.raises(DatabaseUnavailable):
+        async with breaker.guard():
+            raise error
+
+
+async def succeed(breaker):
+    async with breaker.guard():
+        pass
+
+
+def test_opens_after_consecutive_failures():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        await fail(breaker)
+        await fail(breaker)
+        await succeed(breaker)
+        # Успех сбрасывает счет
+        await fail(breaker)
+        await fail(breaker)
+        assert breaker.closed
+        await fail(breaker)
+        assert not breaker.closed
+        # Разомкнут - отказ сразу, без обращения к базе
+        pool = FakePool()
+        with pytest.raises(DatabaseUnavailable, match="circuit breaker is open"):
+            async with breaker.acquire(pool):
+                pass
+        assert pool.acquired == 0
+
+    asyncio.run(scenario())
+
+
+def test_query_errors_are_not_failures():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        with pytest.raises(asyncpg.UniqueViolationError):
+            async with breaker.guard():
+                raise asyncpg.UniqueViolationError("duplicate key")
+        assert breaker.closed
+
+    asyncio.run(scenario())
+
+
+def test_half_open_probe():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        await fail(breaker)
+        await asyncio.sleep(0.06)
+
+        # Проба пропускается одна: остальные обращения во время нее отклоняются
+        probe_started, release = asyncio.Event(), asyncio.Event()
+
+        async def probe():
+            async with breaker.guard():
+                probe_started.set()
+                await release.wait()
+                raise OSError("still down")
+
+        task = asyncio.create_task(probe())
+        await probe_started.wait()
+        with pytest.raises(DatabaseUnavailable, match="circuit breaker is open"):
+            await succeed(breaker)
+        release.set()
+        with pytest.raises(DatabaseUnavailable):
+            await task
+        # Неудачная проба снова размыкает на reset_timeout
+        assert not breaker.closed
+        with pytest.raises(DatabaseUnavailable, match="circuit breaker is open"):
+            await succeed(breaker)
+
+        await asyncio.sleep(0.06)
+        await succeed(breaker)
+        assert breaker.closed
+
+    asyncio.run(scenario())
+
+
+class FixedRouter:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def pool_for(self, user_id=None):
+        return self.pool
+
+
+def test_unavailable_replica_falls_back_to_primary(monkeypatch):
+    primary, replica = FakePool(answer="primary"), FakePool(down=True)
+    monkeypatch.setattr(main, "db_pool", primary)
+    monkeypatch.setattr(main, "read_router", FixedRouter(replica))
+    monkeypatch.setattr(main, "db_breaker", CircuitBreaker(failure_threshold=2, reset_timeout=60, name="primary"))
+    monkeypatch.setattr(main, "replica_breaker", CircuitBreaker(failure_threshold=2, reset_timeout=60, name="replica"))
+
+    async def scenario():
+        for _ in range(3):
+            assert await main._read(1, lambda conn: asyncio.sleep(0, conn.answer)) == "primary"
+
+    asyncio.run(scenario())
+    # Реплика отключена своим выключателем, основной сервер (и записи) - нет
+    assert not main.replica_breaker.closed
+    assert main.db_breaker.closed
+    assert primary.acquired == 3
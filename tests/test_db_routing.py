@@ -0,0 +1,96 @@
+"""Выбор сервера для чтения: закрепление после записи и отставание реплики"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from db_routing import _PRIMARY_LSN_SQL, ReadRouter
+
+
+class FakePool:
+    """Пул, соединение которого отвечает на fetchval значением из answers (или недоступен)"""
+
+    def __init__(self, name, **answers):
+        self.name = name
+        self.answers = answers
+        self.down = False
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        if self.down:
+            raise ConnectionRefusedError("connection refused")
+        yield self
+
+    async def fetchval(self, query, timeout=None):
+        return self.answers["primary" if query == _PRIMARY_LSN_SQL else "replayed"]
+
+
+def test_without_replica_everything_reads_from_primary():
+    primary = FakePool("primary")
+    router = ReadRouter(primary, None)
+    router.wrote(1)
+    assert router.pool_for(1) is primary and router.pool_for(None) is primary
+
+
+def test_write_pins_user_to_primary_for_the_window():
+    primary, replica = FakePool("primary"), FakePool("replica")
+    router = ReadRouter(primary, replica, window=0.05)
+    assert router.pool_for(1) is replica
+    router.wrote(1)
+    assert router.pool_for(1) is primary
+    # Другие пользователи и чтения без пользователя по-прежнему с реплики
+    assert router.pool_for(2) is replica and router.pool_for(None) is replica
+    time.sleep(0.06)
+    assert router.pool_for(1) is replica
+    # Истекшие закрепления удаляются при следующих записях
+    router.wrote(2)
+    assert list(router._pinned) == [2]
+
+
+def test_unknown_writer_pins_everyone():
+    primary, replica = FakePool("primary"), FakePool("replica")
+    router = ReadRouter(primary, replica, window=0.05)
+    router.wrote(None)
+    assert router.pool_for(1) is primary and router.pool_for(None) is primary
+    time.sleep(0.06)
+    assert router.pool_for(1) is replica
+
+
+def test_lagging_or_unavailable_replica_is_bypassed():
+    primary, replica = FakePool("primary", primary=100), FakePool("replica", replayed=100)
+    router = ReadRouter(primary, replica, window=0.05)
+
+    async def scenario():
+        await router._check()
+        assert router.pool_for(1) is replica
+        # Основной сервер ушел вперед, реплика стоит: пока отставание меньше окна - читаем с нее
+        primary.answers["primary"] = 200
+        await router._check()
+        assert router.pool_for(1) is replica
+        await asyncio.sleep(0.06)
+        await router._check()
+        assert router.pool_for(1) is primary
+        # Догнала
+        replica.answers["replayed"] = 200
+        await router._check()
+        assert router.pool_for(1) is replica
+        replica.down = True
+        await router._check()
+        assert router.pool_for(1) is primary
+
+    asyncio.run(scenario())
+
+
+def test_server_that_is_not_a_replica_counts_as_caught_up():
+    # pg_last_wal_replay_lsn() = NULL - тот же сервер (тестовое окружение)
+    primary, replica = FakePool("primary", primary=100), FakePool("replica", replayed=None)
+    router = ReadRouter(primary, replica, window=0.05)
+
+    async def scenario():
+        for position in (100, 200, 300):
+            primary.answers["primary"] = position
+            await router._check()
+            await asyncio.sleep(0.03)
+        return router.pool_for(1)
+
+    assert asyncio.run(scenario()) is replica
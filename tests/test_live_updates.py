@@ -0,0 +1,82 @@
+"""Брокер живых обновлений WebApp и разбор уведомлений LISTEN/NOTIFY"""
+
+import asyncio
+
+import pytest
+
+from live_updates import ChangeBroker, PgChangeListener, TooManyStreams, notify_payload
+
+
+def test_publish_wakes_only_subscriptions_of_the_user():
+    async def scenario():
+        broker = ChangeBroker()
+        with broker.subscribe(1) as first, broker.subscribe(1) as second, broker.subscribe(2) as other:
+            broker.publish(1)
+            return (
+                await first.wait(0.01), await second.wait(0.01), await other.wait(0.01),
+                # Сигнал уже получен - до следующего изменения ждать нечего
+                await first.wait(0.01),
+            )
+
+    assert asyncio.run(scenario()) == (True, True, False, False)
+
+
+def test_changes_coalesce_into_one_wakeup():
+    async def scenario():
+        broker = ChangeBroker()
+        with broker.subscribe(1) as subscription:
+            for _ in range(100):
+                broker.publish(1)
+            return await subscription.wait(0.01), await subscription.wait(0.01)
+
+    assert asyncio.run(scenario()) == (True, False)
+
+
+def test_publish_all_and_unsubscribe():
+    async def scenario():
+        broker = ChangeBroker()
+        with broker.subscribe(1) as first, broker.subscribe(2) as second:
+            broker.publish_all()
+            woken = await first.wait(0.01), await second.wait(0.01)
+        # Закрытые соединения не остаются в брокере
+        assert not broker._subscriptions
+        broker.publish(1)
+        return woken
+
+    assert asyncio.run(scenario()) == (True, True)
+
+
+def test_streams_per_user_are_limited():
+    async def scenario():
+        broker = ChangeBroker(max_per_user=2)
+        with broker.subscribe(1), broker.subscribe(1):
+            with pytest.raises(TooManyStreams):
+                with broker.subscribe(1):
+                    pass
+            # Другому пользователю лимит не мешает
+            with broker.subscribe(2):
+                pass
+        # После закрытия соединения можно открыть новое
+        with broker.subscribe(1), broker.subscribe(1):
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_listener_wakes_subscribers_and_reports_remote_changes():
+    remote = []
+
+    async def scenario():
+        broker = ChangeBroker()
+        listener = PgChangeListener(broker, connect=None, on_remote_change=remote.append)
+        with broker.subscribe(5) as subscription:
+            listener._on_notify(None, 1, "word_changes", notify_payload(5))
+            own = await subscription.wait(0.01)
+            listener._on_notify(None, 1, "word_changes", "5:otherprocess")
+            other = await subscription.wait(0.01)
+            listener._on_notify(None, 1, "word_changes", "garbage")
+        return own, other
+
+    assert asyncio.run(scenario()) == (True, True)
+    # Свои изменения процесс уже учел в кешах
+    assert remote == [5]
@@ -0,0 +1,71 @@
+"""Журнал с ограничением частоты, медленные обновления и зависания event loop"""
+
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from monitoring import LoopLagMonitor, RateLimitedLog, SlowUpdateMiddleware, _handler_name
+
+
+def test_rate_limited_log_counts_suppressed(caplog):
+    log = RateLimitedLog(limit=2, period=0.05)
+    with caplog.at_level(logging.WARNING, logger="monitoring"):
+        for i in range(5):
+            log.warning("event %s", i)
+        time.sleep(0.06)
+        log.warning("event %s", 5)
+    records = caplog.records
+    assert [record.getMessage() for record in records] == ["event 0", "event 1", "event 5"]
+    # Подавленные записи упоминаются в первой записи нового окна
+    assert [record.suppressed for record in records] == [0, 0, 3]
+
+
+def test_handler_name_includes_callback_action():
+    async def show_word_handler():
+        pass
+
+    data = {
+        "handler": SimpleNamespace(callback=show_word_handler),
+        "callback_data": SimpleNamespace(action=SimpleNamespace(value="next")),
+    }
+    assert _handler_name(data) == "show_word_handler:next"
+    assert _handler_name({}) == "unknown"
+
+
+def test_slow_update_is_logged_with_stack(caplog):
+    async def slow_handler(event, data):
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def fast_handler(event, data):
+        return "done"
+
+    middleware = SlowUpdateMiddleware(threshold=0.02, log=RateLimitedLog())
+    data = {"handler": SimpleNamespace(callback=slow_handler), "event_from_user": SimpleNamespace(id=42)}
+    with caplog.at_level(logging.WARNING, logger="monitoring"):
+        assert asyncio.run(middleware(slow_handler, object(), data)) == "done"
+        assert asyncio.run(middleware(fast_handler, object(), {"handler": SimpleNamespace(callback=fast_handler)})) == "done"
+    [record] = caplog.records
+    assert record.event == "slow_update"
+    assert record.handler == "slow_handler" and record.user_id == 42
+    # Стек снят в момент превышения порога - задача ждала внутри обработчика
+    assert "slow_handler" in record.stack
+
+
+def test_loop_stall_is_reported_once(caplog):
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.02, stall_threshold=0.1, log=RateLimitedLog())
+        monitor.start()
+        await asyncio.sleep(0.05)
+        # Блокирующий вызов в event loop
+        time.sleep(0.3)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    with caplog.at_level(logging.WARNING, logger="monitoring"):
+        asyncio.run(scenario())
+    stalls = [record for record in caplog.records if getattr(record, "event", None) == "loop_stall"]
+    assert len(stalls) == 1
+    assert stalls[0].stalled_for >= 0.1
+    assert "scenario" in stalls[0].stack
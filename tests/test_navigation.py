@@ -0,0 +1,123 @@
+"""Слияние быстрых нажатий навигации и пропуск правок без изменений"""
+
+import asyncio
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import EditMessageText
+
+import main
+
+
+class FakeMessage:
+    def __init__(self, message_id=10, chat_id=1, error=None):
+        self.message_id = message_id
+        self.chat = SimpleNamespace(id=chat_id)
+        self.error = error
+        self.edits = []
+
+    async def edit_text(self, text, reply_markup=None, parse_mode=None):
+        self.edits.append(text)
+        if self.error:
+            raise self.error
+
+
+class FakeCallback:
+    def __init__(self, message, user_id=1):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = message
+        self.answered = 0
+
+    async def answer(self, *args, **kwargs):
+        self.answered += 1
+
+
+def make_state(user_id=1):
+    return FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=user_id, user_id=user_id))
+
+
+def patch_render(monkeypatch):
+    """Отрисовка, которая запоминает позиции и ждет release на первой из них"""
+    renders, release = [], asyncio.Event()
+
+    async def show_current_word(message, state, edit=False, full_info=False):
+        data = await state.get_data()
+        renders.append((message.message_id, data["current_index"]))
+        if len(renders) == 1:
+            await release.wait()
+
+    monkeypatch.setattr(main, "show_current_word", show_current_word)
+    return renders, release
+
+
+def test_rapid_taps_render_first_and_last_position(monkeypatch):
+    renders, release = patch_render(monkeypatch)
+
+    async def scenario():
+        message, state = FakeMessage(), make_state()
+        callbacks = [FakeCallback(message) for _ in range(5)]
+        first = asyncio.create_task(main.navigate_to(callbacks[0], state, 1, "A"))
+        await asyncio.sleep(0)
+        # Пока первая позиция рисуется, нажатия только сдвигают цель
+        for index, callback in enumerate(callbacks[1:], start=2):
+            await main.navigate_to(callback, state, index, "A")
+            assert main._nav_position(callback, {}) == (index, "A")
+        release.set()
+        await first
+        return callbacks, await state.get_data()
+
+    callbacks, data = asyncio.run(scenario())
+    assert renders == [(10, 1), (10, 5)]
+    assert all(callback.answered == 1 for callback in callbacks)
+    assert data["current_index"] == 5
+    assert not main._nav_targets and not main._nav_rendering
+
+
+def test_taps_in_different_messages_are_not_merged(monkeypatch):
+    renders, release = patch_render(monkeypatch)
+
+    async def scenario():
+        state = make_state()
+        first = asyncio.create_task(main.navigate_to(FakeCallback(FakeMessage(10)), state, 1, "A"))
+        await asyncio.sleep(0)
+        await main.navigate_to(FakeCallback(FakeMessage(20)), state, 7, "B")
+        release.set()
+        await first
+
+    asyncio.run(scenario())
+    assert renders == [(10, 1), (20, 7)]
+
+
+def test_edit_message_skips_unchanged_content(monkeypatch):
+    monkeypatch.setattr(main, "_rendered", OrderedDict())
+
+    async def scenario():
+        message = FakeMessage()
+        assert await main.edit_message(message, "cat")
+        assert not await main.edit_message(message, "cat")
+        assert await main.edit_message(message, "dog")
+        # То же сообщение в другом чате - другое сообщение
+        assert await main.edit_message(FakeMessage(chat_id=2), "dog")
+        return message.edits
+
+    assert asyncio.run(scenario()) == ["cat", "dog"]
+
+
+def test_edit_message_tolerates_not_modified(monkeypatch):
+    monkeypatch.setattr(main, "_rendered", OrderedDict())
+    error = TelegramBadRequest(
+        EditMessageText(text="cat"), "Bad Request: message is not modified"
+    )
+
+    async def scenario():
+        message = FakeMessage(error=error)
+        assert await main.edit_message(message, "cat")
+        # Содержимое запомнено - повторная правка не отправляется
+        assert not await main.edit_message(message, "cat")
+        return message.edits
+
+    assert asyncio.run(scenario()) == ["cat"]
@@ -0,0 +1,99 @@
+"""Тест по словарю: раунд, разбор ответа с кнопки и отрисовка вариантов"""
+
+import asyncio
+import random
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import NamedTuple
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+import main
+import quiz
+from callbacks import DictAction, DictCallback
+from render import render_quiz_question
+
+
+class Word(NamedTuple):
+    word: str
+    part_of_speech: str
+    translation: str
+
+
+def test_answer_index_points_to_the_translation():
+    words = [Word(f"w{i}", "noun", f"перевод {i}") for i in range(50)]
+    by_word = {item.word: item.translation for item in words}
+
+    questions = quiz.build_round(words, rng=random.Random(1))
+
+    assert len(questions) == quiz.QUESTIONS
+    assert len({q.word for q in questions}) == len(questions)
+    for q in questions:
+        assert q.options[q.answer] == by_word[q.word]
+        assert len(set(q.options)) == len(q.options) == quiz.OPTIONS
+
+
+def test_words_without_distinct_translations_are_skipped():
+    words = [Word("a", "noun", "same"), Word("b", "noun", "same"), Word("c", "noun", "")]
+
+    assert quiz.build_round(words, rng=random.Random(1)) == []
+
+
+def test_parse_answer_rejects_forged_data():
+    assert quiz.parse_answer("3.1") == (3, 1)
+    for arg in ("x.", "1.x", "", ".", "-1.0", "1.4", "1"):
+        assert quiz.parse_answer(arg) is None, arg
+
+
+def test_long_options_get_distinct_buttons_and_full_text():
+    options = ["очень длинный перевод, который отличается только в конце: один",
+               "очень длинный перевод, который отличается только в конце: два"]
+
+    text, keyboard = render_quiz_question(1, 1, "word", "noun", options)
+
+    labels = [row[0].text for row in keyboard.inline_keyboard[:-1]]
+    assert len(set(labels)) == len(labels)
+    assert all(option in text for option in options)
+
+
+class FakeMessage:
+    message_id = 10
+    chat = SimpleNamespace(id=1)
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text, reply_markup=None, parse_mode=None):
+        self.edits.append(text)
+
+
+def test_answers_are_scored_once(monkeypatch):
+    monkeypatch.setattr(main, "_rendered", OrderedDict())
+    questions = [["cat", "noun", ["кот", "собака"], 0], ["dog", "noun", ["кот", "собака"], 1]]
+
+    async def answer(state, message, arg):
+        callback = SimpleNamespace(message=message, answer=lambda *args, **kwargs: asyncio.sleep(0))
+        await main.quiz_answer_handler(callback, state, DictCallback(action=DictAction.QUIZ_ANSWER, arg=arg))
+
+    async def scenario():
+        state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+        await state.set_state(main.QuizState.answering)
+        await state.update_data(quiz=questions, quiz_index=0, quiz_score=0)
+        message = FakeMessage()
+        await answer(state, message, "0.0")
+        # Повторное нажатие на отвеченный вопрос и подделанный вариант не засчитываются
+        await answer(state, message, "0.0")
+        await answer(state, message, "1.7")
+        progress = await state.get_data()
+        await answer(state, message, "1.0")
+        return message.edits, progress, await state.get_state()
+
+    edits, progress, final_state = asyncio.run(scenario())
+    assert (progress["quiz_index"], progress["quiz_score"]) == (1, 1)
+    assert len(edits) == 2
+    assert edits[0].startswith("✅")
+    # Неверный ответ показывает правильный перевод, итог - 1 из 2
+    assert "<b>dog</b> — собака" in edits[1] and "<b>1</b> из 2" in edits[1]
+    assert final_state is None
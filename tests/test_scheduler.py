@@ -0,0 +1,215 @@
+"""
+Планировщик напоминаний: текст напоминания, ограничение скорости и повторы отправки,
+выборка и перенос напоминаний (нужен Postgres, POSTGRES_*)
+"""
+
+import asyncio
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+import asyncpg
+
+import word_schema
+from scheduler import REMINDERS_DDL, RateLimitedSender, ReminderScheduler, reminder_text, word_of_the_day
+
+
+def test_reminder_text_escapes_user_word():
+    text = reminder_text("a<b & c", "x > y")
+
+    assert "<b>a&lt;b &amp; c</b>" in text
+    assert "x &gt; y" in text
+
+
+def test_reminder_text_without_words_is_word_of_the_day():
+    day = date(2024, 1, 1)
+    text = reminder_text(None, None, day)
+
+    assert "Слово дня" in text
+    assert word_of_the_day(day) in text
+
+
+class FakeBot:
+    """send_message: записывает отправленное, ответы задаются по порядку (исключение или None)"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text, time.monotonic()))
+        outcome = self.outcomes.pop(0) if self.outcomes else None
+        if outcome is not None:
+            raise outcome
+
+
+def flood(retry_after: int = 0) -> TelegramRetryAfter:
+    return TelegramRetryAfter(SendMessage(chat_id=1, text="x"), "Flood control exceeded", retry_after)
+
+
+async def deliver(sender: RateLimitedSender, messages):
+    sender.start()
+    for chat_id, text in messages:
+        await sender.put(chat_id, text)
+    await sender.queue.join()
+    await sender.stop()
+
+
+def test_flood_limited_message_is_dropped_after_max_attempts():
+    bot = FakeBot(*[flood()] * 10)
+    sender = RateLimitedSender(bot, max_attempts=3)
+
+    asyncio.run(deliver(sender, [(1, "first"), (2, "second")]))
+
+    # Первое сообщение - три попытки и отказ, следующее не застревает за ним
+    assert [chat_id for chat_id, _, _ in bot.sent] == [1, 1, 1, 2, 2, 2]
+
+
+def test_retry_after_then_success():
+    bot = FakeBot(flood(), None)
+
+    asyncio.run(deliver(RateLimitedSender(bot), [(1, "text")]))
+
+    assert [text for _, text, _ in bot.sent] == ["text", "text"]
+
+
+def test_blocked_chat_is_reported_and_sending_continues():
+    blocked = []
+
+    async def on_forbidden(chat_id):
+        blocked.append(chat_id)
+        raise OSError("database is down")
+
+    bot = FakeBot(TelegramForbiddenError(SendMessage(chat_id=1, text="x"), "bot was blocked by the user"))
+
+    asyncio.run(deliver(RateLimitedSender(bot, on_forbidden=on_forbidden), [(1, "a"), (2, "b")]))
+
+    assert blocked == [1]
+    assert [chat_id for chat_id, _, _ in bot.sent] == [1, 2]
+
+
+def test_token_bucket_limits_rate_after_burst():
+    bot = FakeBot()
+    rate = 50.0
+
+    asyncio.run(deliver(RateLimitedSender(bot, rate=rate), [(i, "x") for i in range(100)]))
+
+    # Полное «ведро» уходит сразу, остальное - не быстрее rate сообщений в секунду
+    times = [sent_at for _, _, sent_at in bot.sent]
+    assert len(times) == 100
+    assert times[-1] - times[0] >= (100 - rate) / rate * 0.9
+
+
+class FakeSender:
+    """Очередь отправки, которая только запоминает сообщения"""
+
+    def __init__(self, free=1000):
+        self.free = free
+        self.messages = []
+
+    def free_slots(self):
+        return self.free
+
+    async def put(self, chat_id, text):
+        self.messages.append((chat_id, text))
+
+
+def run_scheduler(pg_schema, scenario, free=1000):
+    """Выполняет scenario(scheduler, conn) на временной схеме с таблицами слов и напоминаний"""
+    async def run():
+        pool = await asyncpg.create_pool(min_size=1, max_size=2, **pg_schema)
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute(word_schema.FLAT_DDL + REMINDERS_DDL)
+                scheduler = ReminderScheduler(pool, FakeSender(free), acquire_timeout=5)
+                return await scenario(scheduler, conn)
+        finally:
+            await pool.close()
+    return asyncio.run(run())
+
+
+async def add_reminder(conn, user_id, due=timedelta(minutes=1), enabled=True):
+    """Напоминание в 09:00 UTC, просроченное на due"""
+    await conn.execute(
+        """INSERT INTO reminders (user_id, chat_id, timezone, remind_time, next_run_at, enabled)
+        VALUES ($1::bigint, $1::bigint + 1000, 'UTC', '09:00', NOW() - $2::interval, $3)""",
+        user_id, due, enabled
+    )
+
+
+def test_tick_sends_words_in_turn_and_reschedules(pg_schema):
+    async def scenario(scheduler, conn):
+        for word in ("cat", "dog", "fox"):
+            await conn.execute(
+                "INSERT INTO words (user_id, word, part_of_speech, translation) VALUES (1, $1, 'noun', $1 || '!')", word
+            )
+        await add_reminder(conn, 1)
+        await add_reminder(conn, 2, due=timedelta(hours=-1))
+        await add_reminder(conn, 3, enabled=False)
+        claimed = []
+        for _ in range(4):
+            claimed.append(await scheduler.tick())
+            # Снова просрочено - следующий тик берет следующее слово
+            await conn.execute("UPDATE reminders SET next_run_at = NOW() - INTERVAL '1 minute' WHERE user_id = 1")
+        await scheduler.tick()
+        after_tick = await conn.fetchval("SELECT next_run_at FROM reminders WHERE user_id = 1")
+        return claimed, scheduler.sender.messages, after_tick
+
+    claimed, messages, after_tick = run_scheduler(pg_schema, scenario)
+    assert claimed == [1, 1, 1, 1]
+    assert [chat_id for chat_id, _ in messages] == [1001] * 5
+    # По кругу: после последнего слова - снова первое
+    assert ["<b>cat</b>" in text for _, text in messages] == [True, False, False, True, False]
+    assert "<b>dog</b>" in messages[1][1] and "<b>fox</b>" in messages[2][1]
+    # Перенесено на ближайшие 09:00 UTC в будущем
+    now = datetime.now(timezone.utc)
+    assert now < after_tick <= now + timedelta(days=1)
+    assert after_tick.astimezone(timezone.utc).time() == dt_time(9, 0)
+
+
+def test_user_without_words_gets_word_of_the_day(pg_schema):
+    async def scenario(scheduler, conn):
+        await add_reminder(conn, 1)
+        await scheduler.tick()
+        return scheduler.sender.messages
+
+    [(chat_id, text)] = run_scheduler(pg_schema, scenario)
+    assert chat_id == 1001 and "Слово дня" in text
+
+
+def test_tick_respects_free_slots_and_skips_stale_reminders(pg_schema):
+    async def scenario(scheduler, conn):
+        for user_id in range(1, 4):
+            await add_reminder(conn, user_id)
+        # Простой дольше max_lateness - напоминание только переносится
+        await add_reminder(conn, 4, due=timedelta(hours=7))
+        first = await scheduler.tick()
+        # Первым забрано самое просроченное - оно опоздало сильнее max_lateness и не отправлено
+        assert scheduler.sender.messages == []
+        scheduler.sender.free = 1000
+        second = await scheduler.tick()
+        third = await scheduler.tick()
+        return first, second, third, [chat_id for chat_id, _ in scheduler.sender.messages]
+
+    first, second, third, chats = run_scheduler(pg_schema, scenario, free=1)
+    assert (first, second, third) == (1, 3, 0)
+    assert sorted(chats) == [1001, 1002, 1003]
+
+
+def test_set_and_disable_reminders(pg_schema):
+    async def scenario(scheduler, conn):
+        next_run_at = await scheduler.set_reminder(1, 1001, "Europe/Moscow", dt_time(8, 30))
+        await scheduler.set_reminder(2, 1002, "UTC", dt_time(8, 30))
+        await scheduler.disable_chat(1002)
+        disabled = await scheduler.disable_reminder(1), await scheduler.disable_reminder(99)
+        enabled = await conn.fetchval("SELECT COUNT(*) FROM reminders WHERE enabled")
+        return next_run_at, disabled, enabled
+
+    next_run_at, disabled, enabled = run_scheduler(pg_schema, scenario)
+    assert next_run_at > datetime.now(timezone.utc)
+    # 08:30 по Москве (UTC+3)
+    assert next_run_at.astimezone(timezone.utc).time() == dt_time(5, 30)
+    assert disabled == (True, False)
+    assert enabled == 0
@@ -0,0 +1,88 @@
+"""Сборка WebApp из нескольких файлов: ссылки внутри CSS и JS ведут на отдаваемые адреса"""
+
+import asyncio
+import re
+from urllib.parse import urljoin
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from static_assets import IMMUTABLE_CACHE, REVALIDATE_CACHE, StaticBundle
+
+INDEX = '<link rel="stylesheet" href="/assets/app.css"><script type="module" src="./assets/app.js"></script>'
+CSS = (
+    "@font-face { font-family: x; src: url(./fonts/x.woff2) } body { background: url('../img/bg.png') }"
+    " .logo { background: url(/img/logo.svg?v=2) }"
+)
+JS = 'export const load = () => import("./chunk-lazy.js"); export const admin = () => import("/assets/chunk-admin.js");'
+CHUNK = "export default 42;"
+
+
+def make_bundle(root):
+    files = {
+        "index.html": INDEX,
+        "assets/app.css": CSS,
+        "assets/app.js": JS,
+        "assets/chunk-lazy.js": CHUNK,
+        "assets/chunk-admin.js": CHUNK,
+        "img/logo.svg": "<svg/>",
+        "assets/fonts/x.woff2": "font",
+        "img/bg.png": "png",
+    }
+    for relative, content in files.items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return StaticBundle.load(str(root))
+
+
+async def fetch_all(bundle):
+    app = web.Application()
+    app.router.add_get("/webapp", bundle.index_handler)
+    app.router.add_get("/static/{name:.+}", bundle.asset_handler)
+    async with TestClient(TestServer(app)) as client:
+        index = await (await client.get("/webapp")).text()
+        urls = re.findall(r'(?:href|src)="([^"]+)"', index)
+        css_url = next(url for url in urls if url.endswith(".css"))
+        js_url = next(url for url in urls if url.endswith(".js"))
+        responses = {}
+        # Адреса, которые браузер получит из url() в CSS и import() в JS
+        css = await (await client.get(css_url)).text()
+        js = await (await client.get(js_url)).text()
+        references = [urljoin(css_url, ref.strip("'\"")) for ref in re.findall(r"url\(([^)]+)\)", css)]
+        references += [urljoin(js_url, ref) for ref in re.findall(r'import\("([^"]+)"\)', js)]
+        for url in [css_url, js_url] + references:
+            response = await client.get(url)
+            responses[url] = (response.status, response.headers.get("Cache-Control"), await response.read())
+        return urls, responses
+
+
+def test_references_inside_assets_are_served(tmp_path):
+    urls, responses = asyncio.run(fetch_all(make_bundle(tmp_path)))
+
+    # Хешированные адреса сохраняют каталог сборки
+    assert all(re.fullmatch(r"/static/assets/app\.[0-9a-f]{12}\.(css|js)", url) for url in urls)
+    assert responses["/static/assets/fonts/x.woff2"][::2] == (200, b"font")
+    assert responses["/static/img/bg.png"][::2] == (200, b"png")
+    assert responses["/static/assets/chunk-lazy.js"][::2] == (200, CHUNK.encode())
+    # Абсолютные ссылки внутри CSS и JS переписаны на /static/
+    assert responses["/static/img/logo.svg?v=2"][::2] == (200, b"<svg/>")
+    assert responses["/static/assets/chunk-admin.js"][::2] == (200, CHUNK.encode())
+    for url, (status, cache_control, _) in responses.items():
+        assert status == 200, url
+        # Хешированные файлы - навсегда, исходные адреса - с проверкой
+        assert cache_control == (IMMUTABLE_CACHE if url in urls else REVALIDATE_CACHE), url
+
+
+def test_original_asset_revalidates(tmp_path):
+    bundle = make_bundle(tmp_path)
+    original = bundle.assets["assets/app.js"]
+
+    async def conditional_get():
+        app = web.Application()
+        app.router.add_get("/static/{name:.+}", bundle.asset_handler)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get("/static/assets/app.js", headers={"If-None-Match": original.etag})
+            return response.status
+
+    assert asyncio.run(conditional_get()) == 304
@@ -0,0 +1,129 @@
+"""Индекс автодополнения по префиксу и его кеш"""
+
+import asyncio
+
+import pytest
+
+from suggest import PrefixIndex, SuggestCache
+
+
+ROWS = [
+    ("cat", "noun", "кот", 3),
+    ("Catalog", "noun", "каталог", 1),
+    ("category", "noun", "категория", 5),
+    ("dog", "noun", "собака", 2),
+]
+
+
+def words(suggestions):
+    return [item.word for item in suggestions]
+
+
+def test_prefix_search_is_normalized_and_freshest_first():
+    index = PrefixIndex(ROWS)
+    assert words(index.search("cat", 10)) == ["category", "cat", "Catalog"]
+    assert words(index.search("  CAT", 2)) == ["category", "cat"]
+    assert words(index.search("ｃａｔａ", 10)) == ["Catalog"]
+    assert index.search("x", 10) == []
+    # Пустой запрос - последние слова
+    assert words(index.search("", 2)) == ["category", "cat"]
+
+
+def test_add_and_remove_keep_index_sorted():
+    index = PrefixIndex(ROWS)
+    assert words(index.search("", 1)) == ["category"]
+    index.add("caterpillar", "noun", "гусеница")
+    # Новое слово - самое свежее, кеш последних слов сброшен
+    assert words(index.search("", 1)) == ["caterpillar"]
+    assert words(index.search("cate", 10)) == ["caterpillar", "category"]
+    index.add("cat", "noun", "кошка")
+    assert [(item.word, item.translation) for item in index.search("cat", 1)] == [("cat", "кошка")]
+    index.remove("category")
+    index.remove("missing")
+    assert index.keys == sorted(index.keys) and len(index) == 4
+    assert words(index.search("", 10)) == ["cat", "caterpillar", "dog", "Catalog"]
+
+
+def test_cache_loads_once_for_concurrent_requests():
+    loads = []
+
+    async def loader(user_id):
+        loads.append(user_id)
+        await asyncio.sleep(0.01)
+        return ROWS
+
+    async def scenario():
+        cache = SuggestCache(loader)
+        results = await asyncio.gather(*(cache.search(1, "dog") for _ in range(5)))
+        await cache.search(1, "cat")
+        return results
+
+    assert [words(result) for result in asyncio.run(scenario())] == [["dog"]] * 5
+    assert loads == [1]
+
+
+def test_change_during_load_does_not_cache_stale_index():
+    async def scenario():
+        loaded = asyncio.Event()
+        loads = []
+
+        async def loader(user_id):
+            loads.append(user_id)
+            await loaded.wait()
+            return [("cat", "noun", "кот", 1)]
+
+        cache = SuggestCache(loader)
+        first = asyncio.create_task(cache.search(1, ""))
+        await asyncio.sleep(0)
+        # Слово добавлено, пока загрузка читала старый словарь
+        cache.word_added(1, "dog", "noun", "собака")
+        loaded.set()
+        assert words(await first) == ["cat"]
+        # Устаревший индекс не закеширован - следующий запрос загружает заново
+        assert words(await cache.search(1, "")) == ["cat"]
+        return loads
+
+    assert asyncio.run(scenario()) == [1, 1]
+
+
+def test_cache_updates_loaded_index_and_evicts_lru():
+    async def loader(user_id):
+        return [(f"word{user_id}", "noun", "", 1)]
+
+    async def scenario():
+        cache = SuggestCache(loader, max_users=2)
+        await cache.get(1)
+        await cache.get(2)
+        cache.word_added(1, "new", "noun", "новое")
+        assert words(await cache.search(1, "n")) == ["new"]
+        cache.word_deleted(1, "new")
+        assert await cache.search(1, "n") == []
+        # 1 использован последним - вытесняется 2
+        await cache.get(3)
+        assert set(cache._indexes) == {1, 3}
+        cache.invalidate(1)
+        assert set(cache._indexes) == {3}
+        cache.invalidate()
+        assert not cache._indexes
+
+    asyncio.run(scenario())
+
+
+def test_failed_load_reaches_all_waiters():
+    async def loader(user_id):
+        await asyncio.sleep(0.01)
+        raise ConnectionError("database is down")
+
+    async def scenario():
+        cache = SuggestCache(loader)
+        results = await asyncio.gather(*(cache.get(1) for _ in range(3)), return_exceptions=True)
+        assert not cache._loading and not cache._indexes
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+@pytest.mark.parametrize("prefix", ["", "c", "cat"])
+def test_limit(prefix):
+    assert len(PrefixIndex(ROWS).search(prefix, 1)) == 1
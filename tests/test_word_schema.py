@@ -0,0 +1,41 @@
+"""ensure_schema на базе с уже существующей таблицей words другой раскладки (нужен Postgres, POSTGRES_*)"""
+
+import asyncio
+import logging
+
+import asyncpg
+import pytest
+
+import word_schema
+
+
+def run_in_schema(pg_schema, scenario):
+    """Выполняет scenario(conn) в отдельной временной схеме базы"""
+    async def run():
+        conn = await asyncpg.connect(**pg_schema)
+        try:
+            return await scenario(conn)
+        finally:
+            await conn.close()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("existing, requested", [(0, 4), (8, 16), (8, 0)])
+def test_existing_table_keeps_its_layout(pg_schema, existing, requested, caplog):
+    async def scenario(conn):
+        await conn.execute(word_schema.flat_ddl(existing))
+        await conn.execute("INSERT INTO words (user_id, word, part_of_speech, translation) VALUES (1, 'cat', 'noun', 'кот')")
+        with caplog.at_level(logging.WARNING):
+            await word_schema.ensure_schema(conn, "flat", requested)
+        return await word_schema.current_partitions(conn), await conn.fetchval("SELECT COUNT(*) FROM words")
+
+    assert run_in_schema(pg_schema, scenario) == (existing, 1)
+    assert f"words table has {existing} partitions, WORDS_PARTITIONS={requested}" in caplog.text
+
+
+def test_new_table_is_partitioned(pg_schema):
+    async def scenario(conn):
+        await word_schema.ensure_schema(conn, "flat", 4)
+        return await word_schema.current_partitions(conn)
+
+    assert run_in_schema(pg_schema, scenario) == 4
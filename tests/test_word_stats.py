@@ -0,0 +1,79 @@
+"""Счетчики статистики словаря и их сверка со словами (нужен Postgres, POSTGRES_*)"""
+
+import asyncio
+
+import asyncpg
+
+import word_schema
+import word_stats
+
+
+def run_with_pool(pg_schema, scenario):
+    """Выполняет scenario(pool) на пуле временной схемы с таблицами слов и счетчиков"""
+    async def run():
+        pool = await asyncpg.create_pool(min_size=1, max_size=2, **pg_schema)
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute(word_schema.FLAT_DDL + word_stats.DDL)
+            return await scenario(pool)
+        finally:
+            await pool.close()
+    return asyncio.run(run())
+
+
+async def add_word(conn, user_id, word, pos):
+    async with conn.transaction():
+        await conn.execute(
+            "INSERT INTO words (user_id, word, part_of_speech, translation) VALUES ($1, $2, $3, '')",
+            user_id, word, pos
+        )
+        await word_stats.word_added(conn, user_id, pos)
+
+
+def test_counters_follow_word_changes(pg_schema):
+    async def scenario(pool):
+        async with pool.acquire() as conn:
+            await add_word(conn, 1, "cat", "noun")
+            await add_word(conn, 1, "dog", "noun")
+            await add_word(conn, 1, "run", "verb")
+            created_at = await conn.fetchval("SELECT created_at FROM words WHERE word = 'dog'")
+            await conn.execute("DELETE FROM words WHERE word = 'dog'")
+            await word_stats.word_removed(conn, 1, "noun", created_at)
+            await conn.execute("UPDATE words SET part_of_speech = 'noun' WHERE word = 'run'")
+            await word_stats.pos_changed(conn, 1, "verb", "noun")
+            return await word_stats.get_stats(conn, 1)
+
+    stats = run_with_pool(pg_schema, scenario)
+    assert stats.total == 2
+    assert stats.parts_of_speech == [("noun", 2)]
+    assert len(stats.weeks) == word_stats.WEEKS
+    assert stats.weeks[-1][1] == 2 and sum(count for _, count in stats.weeks) == 2
+
+
+def test_reconciler_fixes_only_drifted_users(pg_schema):
+    async def scenario(pool):
+        async with pool.acquire() as conn:
+            for user_id in range(1, 8):
+                await add_word(conn, user_id, "cat", "noun")
+                await add_word(conn, user_id, "run", "verb")
+            # Расхождения: слово без счетчика, лишний счетчик, счетчик пользователя без слов
+            await conn.execute("INSERT INTO words (user_id, word, part_of_speech, translation) VALUES (2, 'fox', 'noun', '')")
+            await conn.execute("UPDATE word_stats SET words = 5 WHERE user_id = 5 AND part_of_speech = 'verb'")
+            await conn.execute("DELETE FROM words WHERE user_id = 7")
+            expected = {
+                user_id: await word_stats.get_stats(conn, user_id) for user_id in (1, 3, 4, 6)
+            }
+
+        reconciler = word_stats.StatsReconciler(pool, batch_size=2, pause=0, timeout=30)
+        fixed = await reconciler.reconcile()
+        async with pool.acquire() as conn:
+            after = {user_id: await word_stats.get_stats(conn, user_id) for user_id in range(1, 8)}
+        # Повторный проход ничего не находит
+        return fixed, expected, after, await reconciler.reconcile()
+
+    fixed, expected, after, second = run_with_pool(pg_schema, scenario)
+    assert fixed == 3 and second == 0
+    assert all(after[user_id] == stats for user_id, stats in expected.items())
+    assert after[2].parts_of_speech == [("noun", 2), ("verb", 1)]
+    assert after[5].parts_of_speech == [("noun", 1), ("verb", 1)]
+    assert after[7].total == 0 and after[7].parts_of_speech == []
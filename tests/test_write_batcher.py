@@ -0,0 +1,81 @@
+"""WriteBatcher на настоящей базе (нужен Postgres, POSTGRES_*)"""
+
+import asyncio
+
+import asyncpg
+import pytest
+
+import word_schema
+from write_batcher import WriteBatcher
+
+
+def run_batcher(pg_schema, ddl, scenario, **options):
+    """Выполняет scenario(batcher, pool) с запущенным WriteBatcher на пуле временной схемы"""
+    async def run():
+        pool = await asyncpg.create_pool(min_size=1, max_size=4, **pg_schema)
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute(ddl)
+            batcher = WriteBatcher(pool, **options)
+            batcher.start()
+            try:
+                return await scenario(batcher, pool)
+            finally:
+                await batcher.stop()
+        finally:
+            await pool.close()
+    return asyncio.run(run())
+
+
+def test_failed_operation_rolls_back_only_itself(pg_schema):
+    def add(user_id, word):
+        return lambda conn: conn.execute(
+            "INSERT INTO words (user_id, word, part_of_speech, translation) VALUES ($1, $2, 'noun', 'x')",
+            user_id, word
+        )
+
+    async def scenario(batcher, pool):
+        async with pool.acquire() as conn:
+            await conn.execute("INSERT INTO words (user_id, word, part_of_speech, translation) VALUES (1, 'cat', 'noun', 'x')")
+        results = await asyncio.gather(
+            batcher.submit(1, add(1, "dog")),
+            batcher.submit(1, add(1, "cat")),
+            batcher.submit(1, add(1, "fox")),
+            return_exceptions=True,
+        )
+        async with pool.acquire() as conn:
+            words = await conn.fetch("SELECT word FROM words WHERE user_id = 1 ORDER BY word")
+        return results, [row['word'] for row in words]
+
+    results, words = run_batcher(pg_schema, word_schema.FLAT_DDL, scenario, workers=1, max_delay=0.2)
+    assert results[0] == results[2] == "INSERT 0 1"
+    assert isinstance(results[1], asyncpg.UniqueViolationError)
+    assert words == ["cat", "dog", "fox"]
+
+
+@pytest.mark.parametrize("attempt", range(3))
+def test_concurrent_batches_sharing_lexemes_do_not_deadlock(pg_schema, attempt):
+    # Пользователи 1 и 2 попадают к разным исполнителям и добавляют одни и те же новые слова
+    # в противоположном порядке: без prepare обе пачки ждут лексему, созданную другой
+    words = [f"word{i:03}" for i in range(50)]
+
+    def add(user_id, word):
+        return lambda conn: word_schema.insert_word(conn, user_id, word, "noun", "перевод")
+
+    async def scenario(batcher, pool):
+        await asyncio.gather(*(
+            batcher.submit(user_id, add(user_id, word), [(word, "noun", "перевод")])
+            for user_id, order in ((1, words), (2, words[::-1]))
+            for word in order
+        ))
+        async with pool.acquire() as conn:
+            return (
+                await conn.fetchval("SELECT COUNT(*) FROM lexemes"),
+                await conn.fetchval("SELECT COUNT(*) FROM user_words"),
+                await conn.fetchval("SELECT COUNT(*) FROM user_words WHERE translation_override IS NOT NULL"),
+            )
+
+    ddl = word_schema.LEXEMES_DDL + word_schema.LEXEMES_VIEW
+    assert run_batcher(
+        pg_schema, ddl, scenario, workers=2, max_batch=100, max_delay=0.2, prepare=word_schema.insert_shared
+    ) == (50, 100, 0)
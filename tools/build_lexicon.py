@@ -0,0 +1,68 @@
+"""
+СБОРКА ФАЙЛА ОФЛАЙН-СЛОВАРЯ (lexicon.py)
+
+Вход - текстовые файлы со строками "слово<TAB>часть речи<TAB>перевод" (UTF-8).
+Строки, начинающиеся с #, и строки без перевода пропускаются.
+Сокращения частей речи (n, v, adj, adv, ...) приводятся к названиям кнопок бота.
+Если слово встречается несколько раз, остается первая запись - источники
+перечисляются в порядке приоритета.
+
+Файл записывается атомарно (через временный файл), поэтому работающий бот
+можно перезапустить на новой версии без окна с неполным файлом.
+
+Запуск:
+    python tools/build_lexicon.py en-ru.tsv [extra.tsv ...] --output data/lexicon.bin
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexicon import Lexicon, build_lexicon
+
+# Сокращения частей речи -> названия, как в кнопках бота
+POS_ALIASES = {
+    "n": "noun", "noun": "noun", "сущ": "noun",
+    "v": "verb", "verb": "verb", "гл": "verb",
+    "adj": "adjective", "a": "adjective", "adjective": "adjective", "прил": "adjective",
+    "adv": "adverb", "adverb": "adverb", "нар": "adverb",
+}
+
+
+def read_entries(paths):
+    for path in paths:
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                if len(row) < 3 or row[0].startswith("#") or not row[2].strip():
+                    continue
+                pos = row[1].strip().lower().rstrip(".")
+                yield row[0], POS_ALIASES.get(pos, pos or "other"), row[2]
+
+
+def main(args):
+    started = time.perf_counter()
+    data = build_lexicon(list(read_entries(args.sources)))
+
+    directory = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = args.output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, args.output)
+
+    lexicon = Lexicon.open(args.output)
+    print(f"{args.output}: {len(lexicon)} entries, {len(data) / 1024:.1f} KiB, "
+          f"built in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="TSV-файлы: слово, часть речи, перевод")
+    parser.add_argument("--output", default="data/lexicon.bin", help="файл словаря")
+    main(parser.parse_args())
@@ -0,0 +1,108 @@
+"""
+ПЕРЕХОД МЕЖДУ СХЕМАМИ ХРАНЕНИЯ СЛОВ (word_schema.py)
+
+--to lexemes:
+    строки таблицы words переносятся в pos_codes / lexemes / user_words,
+    words переименовывается в words_flat (резервная копия), на ее место встает представление
+--to flat:
+    представление words материализуется обратно в плоскую таблицу words
+    (таблицы схемы lexemes остаются, если не указан --drop-old)
+
+Все выполняется в одной транзакции: при ошибке база остается в прежней схеме.
+На время переноса записи в словари блокируются (чтения продолжают работать),
+поэтому запускать лучше в тихие часы. После миграции - перезапуск бота с новым WORDS_SCHEMA.
+
+Запуск:
+    python tools/migrate_word_schema.py --to lexemes [--drop-old]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import asyncpg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import word_schema
+
+
+async def to_lexemes(conn: asyncpg.Connection, drop_old: bool):
+    # Пишущие транзакции ждут, читающие - нет
+    await conn.execute("LOCK TABLE words IN EXCLUSIVE MODE")
+    await conn.execute(word_schema.LEXEMES_DDL)
+    # Остатки прошлой миграции (лексемы и части речи общие - их оставляем)
+    await conn.execute("TRUNCATE user_words")
+    await word_schema.import_from(conn, "words")
+
+    expected = await conn.fetchval("SELECT COUNT(*) FROM words")
+    migrated = await conn.fetchval("SELECT COUNT(*) FROM user_words")
+    if expected != migrated:
+        raise RuntimeError(f"row count mismatch: words={expected}, user_words={migrated}")
+
+    await conn.execute("DROP TABLE IF EXISTS words_flat")
+    # Имена секций и ограничений освобождаются для будущей плоской таблицы
+    await word_schema.rename_table(conn, "words", "words_flat")
+    await conn.execute(word_schema.LEXEMES_VIEW)
+    if drop_old:
+        await conn.execute("DROP TABLE words_flat")
+    return migrated
+
+
+async def to_flat(conn: asyncpg.Connection, drop_old: bool):
+    await conn.execute("LOCK TABLE user_words IN EXCLUSIVE MODE")
+    await conn.execute(
+        """CREATE TEMP TABLE migrated_words ON COMMIT DROP AS
+        SELECT user_id, word, part_of_speech, translation, created_at FROM words"""
+    )
+    await conn.execute("DROP VIEW words")
+    await conn.execute("DROP TABLE IF EXISTS words_flat")
+    await conn.execute(word_schema.flat_ddl(main.WORDS_PARTITIONS))
+    migrated = await conn.fetchval(
+        """WITH inserted AS (
+            INSERT INTO words (user_id, word, part_of_speech, translation, created_at)
+            SELECT user_id, word, part_of_speech, translation, created_at FROM migrated_words
+            ORDER BY created_at
+            RETURNING 1
+        ) SELECT COUNT(*) FROM inserted"""
+    )
+    if drop_old:
+        await conn.execute("DROP TABLE user_words, lexemes, pos_codes")
+    return migrated
+
+
+async def run(args):
+    conn = await asyncpg.connect(
+        host=main.POSTGRES_HOST, port=main.POSTGRES_PORT, user=main.POSTGRES_USER,
+        password=main.POSTGRES_PASSWORD, database=main.POSTGRES_DB,
+    )
+    try:
+        current = await word_schema.current_layout(conn)
+        if current == args.to:
+            print(f"database already uses the {args.to} schema")
+            return
+        if not current:
+            print("no words table yet: start the bot with WORDS_SCHEMA set instead")
+            return
+        started = time.perf_counter()
+        async with conn.transaction():
+            migrate = to_lexemes if args.to == "lexemes" else to_flat
+            rows = await migrate(conn, args.drop_old)
+            # id слов в новой схеме другие - ротация напоминаний начинается заново
+            if await conn.fetchval("SELECT to_regclass('reminders') IS NOT NULL"):
+                await conn.execute("UPDATE reminders SET last_word_id = NULL")
+        await conn.execute("ANALYZE")
+        print(f"migrated {rows} rows to the {args.to} schema in {time.perf_counter() - started:.1f}s; "
+              f"restart the bot with WORDS_SCHEMA={args.to}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", choices=word_schema.LAYOUTS, required=True, help="целевая схема")
+    parser.add_argument("--drop-old", action="store_true", help="удалить таблицы прежней схемы")
+    asyncio.run(run(parser.parse_args()))
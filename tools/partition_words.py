@@ -0,0 +1,174 @@
+"""
+СЕКЦИОНИРОВАНИЕ ТАБЛИЦЫ words БЕЗ ОСТАНОВКИ БОТА (word_schema.flat_ddl)
+
+--partitions N: words перестраивается в таблицу с N HASH-секциями по user_id
+--partitions 0: обратно в обычную таблицу
+
+Шаги:
+1. Создается новая таблица words_new и триггер на words, который повторяет в ней
+   каждую запись в словари (в той же транзакции, что и сама запись)
+2. Существующие строки копируются пачками по ключу (id сохраняются - напоминания
+   и журнал изменений продолжают ссылаться на те же слова). Строки пачки блокируются
+   FOR SHARE, поэтому параллельное изменение или удаление ждет копирования пачки
+   и затем повторяется триггером
+3. Число строк сравнивается в одном снимке, затем в короткой транзакции
+   words переименовывается в words_old, а words_new - в words
+
+Бот работает все это время; блокировка всей таблицы - только на шаге 3 (миллисекунды).
+Прерванный перенос можно запустить снова - копирование продолжится (повторы пропускаются).
+
+Запуск:
+    python tools/partition_words.py --partitions 16 [--batch 10000] [--pause 0.05] [--drop-old]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import asyncpg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import word_schema
+
+COLUMNS = "id, user_id, word, part_of_speech, translation, created_at"
+
+_MIRROR_SQL = f"""
+    CREATE OR REPLACE FUNCTION words_mirror() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM words_new WHERE user_id = OLD.user_id AND id = OLD.id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO words_new ({COLUMNS})
+            VALUES (NEW.id, NEW.user_id, NEW.word, NEW.part_of_speech, NEW.translation, NEW.created_at)
+            ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END $$;
+    DROP TRIGGER IF EXISTS words_mirror ON words;
+    CREATE TRIGGER words_mirror AFTER INSERT OR UPDATE OR DELETE ON words
+    FOR EACH ROW EXECUTE FUNCTION words_mirror();
+"""
+
+# Пачка по ключу исходной таблицы: id у обычной, (user_id, id) у секционированной
+# (для нее нет индекса по одному id). Возвращает ключ последней строки пачки
+_COPY_SQL = """
+    WITH batch AS (
+        SELECT {columns} FROM words
+        WHERE ({key}) > ({after})
+        ORDER BY {key}
+        LIMIT {limit}
+        FOR SHARE
+    ), copied AS (
+        INSERT INTO words_new ({columns}) SELECT {columns} FROM batch
+        ON CONFLICT DO NOTHING
+    )
+    SELECT {key} FROM batch ORDER BY {key_desc} LIMIT 1
+"""
+
+
+async def prepare(conn: asyncpg.Connection, partitions: int):
+    """Таблица words_new и триггер (повторный запуск продолжает начатый перенос)"""
+    if await conn.fetchval("SELECT to_regclass('words_new') IS NOT NULL"):
+        existing = await word_schema.current_partitions(conn, "words_new")
+        if existing != partitions:
+            raise SystemExit(
+                f"words_new from an unfinished run has {existing} partitions; drop it or pass --partitions {existing}"
+            )
+        print("resuming: words_new already exists")
+    async with conn.transaction():
+        # Сначала ждем завершения текущих записей (блокировка сразу на всех секциях words,
+        # в том же порядке, что и у записей - words, затем words_new): все, что после, уже повторяется
+        await conn.execute("LOCK TABLE words IN SHARE ROW EXCLUSIVE MODE")
+        await conn.execute(word_schema.flat_ddl(partitions, table="words_new"))
+        # Индекс ключа дубликатов - такой же, как у words (неуникальный, если в words уже есть дубликаты)
+        await conn.execute(word_schema.word_key_index_ddl("words_new", await word_schema.word_key_unique(conn)))
+        await conn.execute(_MIRROR_SQL)
+
+
+async def copy_rows(conn: asyncpg.Connection, batch: int, pause: float):
+    key_columns = ["user_id", "id"] if await word_schema.current_partitions(conn) else ["id"]
+    key = ", ".join(key_columns)
+    after = ", ".join(f"${i}" for i in range(1, len(key_columns) + 1))
+    key_desc = ", ".join(f"{column} DESC" for column in key_columns)
+    statement = await conn.prepare(
+        _COPY_SQL.format(columns=COLUMNS, key=key, key_desc=key_desc, after=after, limit=batch)
+    )
+    last = [-1] * len(key_columns)
+    batches, started = 0, time.perf_counter()
+    while True:
+        row = await statement.fetchrow(*last)
+        if row is None:
+            return
+        last = list(row)
+        batches += 1
+        if batches % 100 == 0:
+            print(f"  copied ~{batches * batch} rows in {time.perf_counter() - started:.0f}s")
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def verify(conn: asyncpg.Connection):
+    # Оба подсчета в одном снимке: триггер пишет в words_new в той же транзакции
+    async with conn.transaction(isolation="repeatable_read", readonly=True):
+        old = await conn.fetchval("SELECT COUNT(*) FROM words")
+        new = await conn.fetchval("SELECT COUNT(*) FROM words_new")
+    if old != new:
+        raise SystemExit(f"row count mismatch: words={old}, words_new={new}; rerun to continue copying")
+    return new
+
+
+async def swap(conn: asyncpg.Connection, drop_old: bool):
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE words IN ACCESS EXCLUSIVE MODE")
+        await conn.execute("DROP TRIGGER words_mirror ON words; DROP FUNCTION words_mirror()")
+        sequence = await conn.fetchval("SELECT pg_get_serial_sequence('words', 'id')")
+        new_sequence = await conn.fetchval("SELECT pg_get_serial_sequence('words_new', 'id')")
+        await conn.execute("DROP TABLE IF EXISTS words_old")
+        await word_schema.rename_table(conn, "words", "words_old")
+        await word_schema.rename_table(conn, "words_new", "words")
+        # Новые слова продолжают нумерацию старой таблицы
+        await conn.execute(f"ALTER TABLE words ALTER COLUMN id SET DEFAULT nextval('{sequence}'::regclass)")
+        await conn.execute(f"ALTER SEQUENCE {sequence} OWNED BY words.id")
+        await conn.execute(f"DROP SEQUENCE {new_sequence}")
+        if drop_old:
+            await conn.execute("DROP TABLE words_old")
+
+
+async def run(args):
+    conn = await asyncpg.connect(
+        host=main.POSTGRES_HOST, port=main.POSTGRES_PORT, user=main.POSTGRES_USER,
+        password=main.POSTGRES_PASSWORD, database=main.POSTGRES_DB,
+    )
+    try:
+        if await word_schema.current_layout(conn) != "flat":
+            raise SystemExit("partitioning applies to the flat words table (see tools/migrate_word_schema.py)")
+        if await word_schema.current_partitions(conn) == args.partitions:
+            print(f"words already has {args.partitions} partitions")
+            return
+        if await conn.fetchval("SELECT to_regclass('words_old') IS NOT NULL") and not args.drop_old:
+            raise SystemExit("words_old from a previous run exists: drop it or pass --drop-old")
+
+        started = time.perf_counter()
+        await prepare(conn, args.partitions)
+        await copy_rows(conn, args.batch, args.pause)
+        rows = await verify(conn)
+        await swap(conn, args.drop_old)
+        await conn.execute("ANALYZE words")
+        print(f"words rebuilt with {args.partitions} partitions ({rows} rows) in "
+              f"{time.perf_counter() - started:.1f}s; set WORDS_PARTITIONS={args.partitions}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--partitions", type=int, required=True, help="число HASH-секций (0 - без секционирования)")
+    parser.add_argument("--batch", type=int, default=10_000, help="строк в одной пачке копирования")
+    parser.add_argument("--pause", type=float, default=0.0, help="пауза между пачками, с (снижает нагрузку)")
+    parser.add_argument("--drop-old", action="store_true", help="удалить прежнюю таблицу после переключения")
+    asyncio.run(run(parser.parse_args()))
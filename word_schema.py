@@ -0,0 +1,394 @@
+"""
+СХЕМА ХРАНЕНИЯ СЛОВ: ПЛОСКАЯ ИЛИ С ОБЩИМИ ЛЕКСЕМАМИ
+
+Выбирается переменной WORDS_SCHEMA:
+- flat (по умолчанию) - таблица words, у каждого пользователя своя копия слова,
+  части речи и перевода
+- lexemes - нормализованная схема:
+    pos_codes   части речи (SMALLINT вместо текста в каждой строке)
+    lexemes     слово один раз на всех пользователей + самый частый перевод
+    user_words  (user_id, lexeme_id, pos_id, translation_override) - перевод хранится,
+                только если он отличается от перевода лексемы
+  words в этой схеме - представление с теми же столбцами, что и плоская таблица,
+  поэтому все чтения (словарь, напоминания, синхронизация WebApp) работают без изменений.
+  Отличаются только записи - для них здесь отдельные запросы.
+
+Плоскую таблицу можно секционировать по HASH(user_id) (WORDS_PARTITIONS > 0):
+запросы одного пользователя читают одну небольшую секцию, VACUUM и перестроение индексов
+идут по секциям. Первичный ключ секционированной таблицы - (user_id, id), все запросы
+к словам уже содержат user_id.
+
+Проверка дубликатов (добавление и переименование слова) - один индексный запрос WORD_EXISTS_SQL
+по ключу word_key(word): без регистра и в Unicode NFKC ("Cat", "cat" и "ｃａｔ" - одно слово).
+В плоской схеме ключ еще и уникален по пользователю (индекс words_user_word_norm);
+в схеме lexemes индекс по ключу - у лексем, уникальность не проверяется базой.
+
+Переход между схемами: tools/migrate_word_schema.py
+Секционирование существующей таблицы без остановки бота: tools/partition_words.py
+"""
+
+import logging
+from typing import Dict, Iterable, Tuple
+
+import asyncpg
+
+LAYOUTS = ("flat", "lexemes")
+
+# Физическая таблица со строками пользователей (для массового удаления и статистики)
+USER_ROWS_TABLE = {"flat": "words", "lexemes": "user_words"}
+
+_FLAT_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id SERIAL{id_key},
+        user_id BIGINT NOT NULL,
+        word TEXT NOT NULL,
+        part_of_speech TEXT NOT NULL,
+        translation TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT NOW(),{table_key}
+        UNIQUE (user_id, word)
+    ){partition_by};
+"""
+
+_FLAT_PARTITION = """
+    CREATE TABLE IF NOT EXISTS {table}_p{remainder} PARTITION OF {table}
+    FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder});
+"""
+
+
+def flat_ddl(partitions: int = 0, table: str = "words") -> str:
+    """DDL плоской таблицы; partitions > 0 - секционирование по HASH(user_id) на partitions секций"""
+    if partitions <= 0:
+        return _FLAT_TABLE.format(table=table, id_key=" PRIMARY KEY", table_key="", partition_by="")
+    # Ключ секционирования обязан входить в первичный ключ и уникальные ограничения
+    ddl = _FLAT_TABLE.format(
+        table=table, id_key="", table_key="\n        PRIMARY KEY (user_id, id),",
+        partition_by=" PARTITION BY HASH (user_id)",
+    )
+    return ddl + "".join(
+        _FLAT_PARTITION.format(table=table, partitions=partitions, remainder=remainder)
+        for remainder in range(partitions)
+    )
+
+
+FLAT_DDL = flat_ddl()
+
+# Ключ дубликата. normalize() есть только в базе с кодировкой UTF8 - в остальных только регистр
+_WORD_KEY_FUNCTION = """
+    CREATE FUNCTION word_key(word TEXT) RETURNS TEXT
+    LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    AS $$ SELECT {expression} $$
+"""
+_WORD_KEY_INDEX = "CREATE {unique} INDEX IF NOT EXISTS {table}_user_word_norm ON {table} (user_id, word_key(word))"
+_LEXEMES_KEY_INDEX = "CREATE INDEX IF NOT EXISTS lexemes_word_norm ON lexemes (word_key(word))"
+
+# $1 user_id, $2 слово, $3 слово, которое не считается дубликатом (само переименовываемое слово) или NULL.
+# Один текст для обеих схем: в схеме lexemes words - представление, ключ ищется по индексу лексем
+WORD_EXISTS_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM words
+        WHERE user_id = $1 AND word_key(word) = word_key($2) AND word IS DISTINCT FROM $3
+    )
+"""
+
+
+def word_key_index_ddl(table: str = "words", unique: bool = True) -> str:
+    return _WORD_KEY_INDEX.format(table=table, unique="UNIQUE" if unique else "")
+
+
+async def word_key_unique(conn: asyncpg.Connection, table: str = "words") -> bool:
+    """Уникален ли индекс ключа дубликатов таблицы (False - индекса нет или он не уникален)"""
+    return bool(await conn.fetchval(
+        "SELECT indisunique FROM pg_index WHERE indexrelid = to_regclass($1)", f"{table}_user_word_norm"
+    ))
+
+
+async def ensure_word_key(conn: asyncpg.Connection, layout: str):
+    """Функция word_key и индекс по ключу для выбранной схемы"""
+    if not await conn.fetchval("SELECT to_regprocedure('word_key(text)') IS NOT NULL"):
+        utf8 = await conn.fetchval("SHOW server_encoding") == "UTF8"
+        expression = "lower(normalize(word, NFKC))" if utf8 else "lower(word)"
+        if not utf8:
+            logging.warning("Database encoding is not UTF8: duplicate words are matched case-insensitively only")
+        try:
+            await conn.execute(_WORD_KEY_FUNCTION.format(expression=expression))
+        except asyncpg.DuplicateFunctionError:
+            # Создана параллельно запущенным процессом
+            pass
+    if layout != "flat":
+        await conn.execute(_LEXEMES_KEY_INDEX)
+        return
+    try:
+        await conn.execute(word_key_index_ddl(unique=True))
+    except asyncpg.UniqueViolationError:
+        # Уже есть слова, которые отличаются только регистром: проверка дубликатов все равно по индексу
+        await conn.execute(word_key_index_ddl(unique=False))
+    if not await word_key_unique(conn):
+        logging.warning(
+            "words has duplicates differing only in case or Unicode form, words_user_word_norm is not unique; "
+            "find them with: SELECT user_id, word_key(word) FROM words GROUP BY 1, 2 HAVING COUNT(*) > 1"
+        )
+
+# Порядок столбцов user_words подобран без лишнего выравнивания: 8 + 8 + 4 + 2 байта
+LEXEMES_DDL = """
+    CREATE TABLE IF NOT EXISTS pos_codes (
+        id SMALLSERIAL PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS lexemes (
+        id SERIAL PRIMARY KEY,
+        word TEXT NOT NULL UNIQUE,
+        translation TEXT NOT NULL DEFAULT ''
+    );
+    CREATE TABLE IF NOT EXISTS user_words (
+        user_id BIGINT NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        lexeme_id INTEGER NOT NULL REFERENCES lexemes (id),
+        pos_id SMALLINT NOT NULL REFERENCES pos_codes (id),
+        translation_override TEXT,
+        PRIMARY KEY (user_id, lexeme_id)
+    );
+"""
+
+# id представления - id лексемы (уникален в пределах пользователя)
+LEXEMES_VIEW = """
+    CREATE OR REPLACE VIEW words AS
+    SELECT uw.lexeme_id AS id,
+           uw.user_id,
+           l.word,
+           p.name AS part_of_speech,
+           COALESCE(uw.translation_override, l.translation) AS translation,
+           uw.created_at
+    FROM user_words uw
+    JOIN lexemes l ON l.id = uw.lexeme_id
+    JOIN pos_codes p ON p.id = uw.pos_id;
+"""
+
+# Часть речи и лексема создаются при первом использовании.
+# WHERE NOT EXISTS - чтобы не тратить значения последовательностей на уже существующие строки
+# (ON CONFLICT DO NOTHING вызывает nextval до проверки конфликта)
+_POS_CTE = """
+    pos AS (
+        INSERT INTO pos_codes (name)
+        SELECT $3 WHERE NOT EXISTS (SELECT 1 FROM pos_codes WHERE name = $3)
+        ON CONFLICT (name) DO NOTHING
+        RETURNING id
+    ), pos_row AS (
+        SELECT id FROM pos UNION ALL SELECT id FROM pos_codes WHERE name = $3 LIMIT 1
+    )
+"""
+
+# $1 user_id, $2 слово, $3 часть речи, $4 перевод
+_INSERT_SQL = f"""
+    WITH {_POS_CTE}, lex AS (
+        INSERT INTO lexemes (word, translation)
+        SELECT $2, $4 WHERE NOT EXISTS (SELECT 1 FROM lexemes WHERE word = $2)
+        ON CONFLICT (word) DO NOTHING
+        RETURNING id, translation
+    ), lexeme AS (
+        SELECT id, translation FROM lex
+        UNION ALL SELECT id, translation FROM lexemes WHERE word = $2
+        LIMIT 1
+    )
+    INSERT INTO user_words (user_id, lexeme_id, pos_id, translation_override)
+    SELECT $1, lexeme.id, pos_row.id, NULLIF($4, lexeme.translation)
+    FROM lexeme, pos_row
+"""
+
+# Общие строки пачки заранее (insert_shared): $1 - массив в нужном порядке, WITH ORDINALITY его сохраняет
+_SHARED_POS_SQL = """
+    INSERT INTO pos_codes (name)
+    SELECT t.name FROM unnest($1::text[]) WITH ORDINALITY AS t(name, n)
+    WHERE NOT EXISTS (SELECT 1 FROM pos_codes p WHERE p.name = t.name)
+    ORDER BY t.n
+    ON CONFLICT (name) DO NOTHING
+"""
+
+# $1 слова, $2 их переводы
+_SHARED_LEXEMES_SQL = """
+    INSERT INTO lexemes (word, translation)
+    SELECT t.word, t.translation FROM unnest($1::text[], $2::text[]) WITH ORDINALITY AS t(word, translation, n)
+    WHERE NOT EXISTS (SELECT 1 FROM lexemes l WHERE l.word = t.word)
+    ORDER BY t.n
+    ON CONFLICT (word) DO NOTHING
+"""
+
+# $1 user_id, $2 слово, $3 часть речи, $4 перевод
+_UPDATE_SQL = f"""
+    WITH {_POS_CTE}
+    UPDATE user_words uw
+    SET pos_id = (SELECT id FROM pos_row),
+        translation_override = NULLIF($4, l.translation)
+    FROM lexemes l
+    WHERE uw.user_id = $1 AND uw.lexeme_id = l.id AND l.word = $2
+"""
+
+_DELETE_SQL = """
+    DELETE FROM user_words uw
+    USING lexemes l
+    WHERE uw.user_id = $1 AND uw.lexeme_id = l.id AND l.word = $2
+"""
+
+# Перенос строк из источника со столбцами плоской таблицы (words или временная таблица):
+# перевод лексемы - самый частый перевод слова, он же не хранится в строках пользователей
+_IMPORT_SQL = """
+    INSERT INTO pos_codes (name)
+    SELECT DISTINCT part_of_speech FROM {source} s
+    WHERE NOT EXISTS (SELECT 1 FROM pos_codes p WHERE p.name = s.part_of_speech)
+    ON CONFLICT (name) DO NOTHING;
+
+    INSERT INTO lexemes (word, translation)
+    SELECT DISTINCT ON (word) word, translation
+    FROM (SELECT word, translation, COUNT(*) AS uses FROM {source} GROUP BY word, translation) t
+    WHERE NOT EXISTS (SELECT 1 FROM lexemes l WHERE l.word = t.word)
+    ORDER BY word, uses DESC, translation
+    ON CONFLICT (word) DO NOTHING;
+
+    INSERT INTO user_words (user_id, created_at, lexeme_id, pos_id, translation_override)
+    SELECT s.user_id, COALESCE(s.created_at, NOW()), l.id, p.id, NULLIF(s.translation, l.translation)
+    FROM {source} s
+    JOIN lexemes l ON l.word = s.word
+    JOIN pos_codes p ON p.name = s.part_of_speech;
+"""
+
+
+class LayoutMismatch(Exception):
+    """Схема в базе не совпадает с WORDS_SCHEMA (нужна миграция)"""
+
+
+async def current_layout(conn: asyncpg.Connection) -> str:
+    """Схема, в которой сейчас база: flat, lexemes или "" (таблиц еще нет)"""
+    kind = await conn.fetchval("SELECT relkind::text FROM pg_class WHERE oid = to_regclass('words')")
+    return {"r": "flat", "p": "flat", "v": "lexemes"}.get(kind, "")
+
+
+async def current_partitions(conn: asyncpg.Connection, table: str = "words") -> int:
+    """Число секций таблицы (0 - таблица не секционирована)"""
+    return await conn.fetchval(
+        "SELECT COUNT(*) FROM pg_inherits WHERE inhparent = to_regclass($1)", table
+    )
+
+
+async def rename_table(conn: asyncpg.Connection, old: str, new: str):
+    """
+    Переименовывает таблицу вместе с секциями, индексами и ограничениями (префикс old_ -> new_),
+    чтобы освободить имена для новой таблицы words
+    """
+    relations = [old] + [
+        row["name"] for row in await conn.fetch(
+            "SELECT inhrelid::regclass::text AS name FROM pg_inherits WHERE inhparent = $1::regclass", old
+        )
+    ]
+    prefix = old + "_"
+
+    def renamed(name: str) -> str:
+        return new + "_" + name[len(prefix):]
+
+    # Индексы (вместе с ними переименовываются ограничения PRIMARY KEY / UNIQUE)
+    indexes = await conn.fetch(
+        "SELECT indexrelid::regclass::text AS name FROM pg_index WHERE indrelid = ANY($1::regclass[])", relations
+    )
+    for row in indexes:
+        if row["name"].startswith(prefix):
+            await conn.execute(f'ALTER INDEX "{row["name"]}" RENAME TO "{renamed(row["name"])}"')
+    for relation in relations:
+        constraints = await conn.fetch(
+            "SELECT conname FROM pg_constraint WHERE conrelid = $1::regclass AND conindid = 0", relation
+        )
+        for row in constraints:
+            if row["conname"].startswith(prefix):
+                await conn.execute(
+                    f'ALTER TABLE {relation} RENAME CONSTRAINT "{row["conname"]}" TO "{renamed(row["conname"])}"'
+                )
+    for relation in relations[1:]:
+        if relation.startswith(prefix):
+            await conn.execute(f"ALTER TABLE {relation} RENAME TO {renamed(relation)}")
+    await conn.execute(f"ALTER TABLE {old} RENAME TO {new}")
+
+
+async def ensure_schema(conn: asyncpg.Connection, layout: str, partitions: int = 0):
+    """
+    Создает таблицы выбранной схемы; ошибка, если база в другой схеме
+    partitions - число секций новой плоской таблицы (у существующей не меняется)
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"unknown WORDS_SCHEMA {layout!r}, expected one of {LAYOUTS}")
+    if partitions and layout != "flat":
+        raise ValueError("WORDS_PARTITIONS is supported for the flat words schema only")
+    existing = await current_layout(conn)
+    if existing and existing != layout:
+        raise LayoutMismatch(
+            f"database uses the {existing} words schema, WORDS_SCHEMA={layout}; "
+            f"run tools/migrate_word_schema.py --to {layout}"
+        )
+    if layout == "flat":
+        if not existing:
+            await conn.execute(flat_ddl(partitions))
+        else:
+            # Существующую таблицу не трогаем: секции другой раскладки не создать поверх нее.
+            # Бот работает с любой раскладкой - перестройка идет отдельно, без остановки
+            existing_partitions = await current_partitions(conn)
+            if existing_partitions != partitions:
+                logging.warning(
+                    "words table has %s partitions, WORDS_PARTITIONS=%s; run tools/partition_words.py --partitions %s",
+                    existing_partitions, partitions, partitions,
+                )
+    else:
+        await conn.execute(LEXEMES_DDL)
+        await conn.execute(LEXEMES_VIEW)
+    await ensure_word_key(conn, layout)
+
+
+# = ЗАПИСИ В СХЕМЕ LEXEMES (вызываются внутри транзакции) =
+# Возвращают статус команды, как conn.execute для плоской таблицы ("INSERT 0 1", "DELETE 1", ...)
+
+async def insert_word(conn: asyncpg.Connection, user_id: int, word: str, pos: str, value: str) -> str:
+    result = await conn.execute(_INSERT_SQL, user_id, word, pos, value)
+    if result == "INSERT 0 0":
+        # Ту же лексему или часть речи одновременно создала другая транзакция -
+        # новый запрос уже видит ее строку
+        result = await conn.execute(_INSERT_SQL, user_id, word, pos, value)
+    return result
+
+
+async def insert_shared(conn: asyncpg.Connection, rows: Iterable[Tuple[str, str, str]]):
+    """
+    Заранее создает части речи и лексемы строк (слово, часть речи, перевод) - prepare для WriteBatcher
+    Вставка в порядке сортировки: параллельные транзакции берут блокировки ключей в одном порядке
+    """
+    lexemes: Dict[str, str] = {}
+    pos_names = set()
+    for word, pos, value in rows:
+        lexemes.setdefault(word, value)
+        pos_names.add(pos)
+    words = sorted(lexemes)
+    await conn.execute(_SHARED_POS_SQL, sorted(pos_names))
+    await conn.execute(_SHARED_LEXEMES_SQL, words, [lexemes[word] for word in words])
+
+
+async def update_word(conn: asyncpg.Connection, user_id: int, word: str, pos: str, value: str) -> str:
+    return await conn.execute(_UPDATE_SQL, user_id, word, pos, value)
+
+
+async def delete_word(conn: asyncpg.Connection, user_id: int, word: str) -> str:
+    return await conn.execute(_DELETE_SQL, user_id, word)
+
+
+# = МАССОВАЯ ЗАГРУЗКА =
+
+async def import_from(conn: asyncpg.Connection, source: str):
+    """Переносит строки из плоской таблицы source в схему lexemes"""
+    await conn.execute(_IMPORT_SQL.format(source=source))
+
+
+async def import_words(conn: asyncpg.Connection, layout: str, records: Iterable[Tuple[int, str, str, str]]):
+    """Массовая загрузка (user_id, слово, часть речи, перевод) в выбранной схеме (COPY)"""
+    columns = ["user_id", "word", "part_of_speech", "translation"]
+    if layout == "flat":
+        await conn.copy_records_to_table("words", records=records, columns=columns)
+        return
+    async with conn.transaction():
+        await conn.execute(
+            "CREATE TEMP TABLE import_words (LIKE words) ON COMMIT DROP"
+        )
+        await conn.copy_records_to_table("import_words", records=records, columns=columns)
+        await import_from(conn, "import_words")
@@ -0,0 +1,233 @@
+"""
+СТАТИСТИКА СЛОВАРЯ: /stats И /api/stats
+
+Счетчики меняются вместе со словами (в той же транзакции, что и запись в words),
+поэтому чтение статистики - несколько строк по ключу пользователя при любом размере словаря:
+- word_stats         число слов по частям речи (всего - сумма строк)
+- word_stats_weekly  число слов словаря по неделе добавления
+                     (удаление слова уменьшает счетчик недели, в которую оно было добавлено)
+
+Счетчики могут разойтись со словами: массовая загрузка, ручные правки в базе, перенос схемы.
+StatsReconciler по кругу сверяет их с words пачками пользователей и исправляет расхождения.
+Записи одного пользователя и сверка упорядочены блокировкой pg_advisory_xact_lock(user_id).
+"""
+
+import asyncio
+import logging
+from datetime import date
+from typing import List, NamedTuple, Optional, Tuple
+
+import asyncpg
+from asyncpg.pool import Pool
+
+from metrics import Counter
+
+STATS_DRIFT = Counter("word_stats_drift_total", "Пользователи, у которых сверка исправила счетчики статистики")
+
+DDL = """
+    CREATE TABLE IF NOT EXISTS word_stats (
+        user_id BIGINT NOT NULL,
+        part_of_speech TEXT NOT NULL,
+        words INTEGER NOT NULL,
+        PRIMARY KEY (user_id, part_of_speech)
+    );
+    CREATE TABLE IF NOT EXISTS word_stats_weekly (
+        user_id BIGINT NOT NULL,
+        week DATE NOT NULL,
+        words INTEGER NOT NULL,
+        PRIMARY KEY (user_id, week)
+    );
+"""
+
+# Сколько последних недель показывать
+WEEKS = 8
+
+# Неделя - понедельник недели created_at (слова без created_at в недельную статистику не входят)
+_WEEK = "date_trunc('week', {column})::date"
+
+_POS_DELTA_SQL = """
+    INSERT INTO word_stats (user_id, part_of_speech, words) VALUES ($1, $2, $3)
+    ON CONFLICT (user_id, part_of_speech) DO UPDATE SET words = word_stats.words + EXCLUDED.words
+"""
+
+# $1 user_id, $2 часть речи, $3 +1/-1, $4 created_at слова
+# Новое слово (+1) - текущая неделя; удаленное слово без created_at недельную статистику не меняет
+_WORD_DELTA_SQL = f"""
+    WITH pos AS ({_POS_DELTA_SQL})
+    INSERT INTO word_stats_weekly (user_id, week, words)
+    SELECT $1, {_WEEK.format(column="COALESCE($4::timestamp, LOCALTIMESTAMP)")}, $3
+    WHERE $3 > 0 OR $4::timestamp IS NOT NULL
+    ON CONFLICT (user_id, week) DO UPDATE SET words = word_stats_weekly.words + EXCLUDED.words
+"""
+
+_POS_SQL = """
+    SELECT part_of_speech, words FROM word_stats
+    WHERE user_id = $1 AND words > 0
+    ORDER BY words DESC, part_of_speech
+"""
+
+# Последние $2 недель, включая недели без новых слов
+_WEEKS_SQL = f"""
+    SELECT w::date AS week, COALESCE(s.words, 0) AS words
+    FROM generate_series(
+        {_WEEK.format(column="LOCALTIMESTAMP")} - ($2 - 1) * 7,
+        {_WEEK.format(column="LOCALTIMESTAMP")},
+        INTERVAL '1 week'
+    ) w
+    LEFT JOIN word_stats_weekly s ON s.user_id = $1 AND s.week = w::date
+    ORDER BY w
+"""
+
+# Пересчет с нуля (первое создание таблиц и исправление расхождений); {users} - условие на user_id
+_ACTUAL_POS = "SELECT user_id, part_of_speech, COUNT(*)::int AS words FROM words WHERE {users} GROUP BY 1, 2"
+_ACTUAL_WEEKS = f"""
+    SELECT user_id, {_WEEK.format(column="created_at")} AS week, COUNT(*)::int AS words
+    FROM words WHERE {{users}} AND created_at IS NOT NULL GROUP BY 1, 2
+"""
+_BATCH = "user_id = ANY($1::bigint[])"
+
+# Пользователи пачки, у которых счетчики не совпадают со словами (нулевые счетчики = отсутствующие)
+_DRIFT_SQL = f"""
+    SELECT user_id FROM ({_ACTUAL_POS.format(users=_BATCH)}) a
+    FULL JOIN (SELECT * FROM word_stats WHERE {_BATCH} AND words <> 0) s USING (user_id, part_of_speech)
+    WHERE a.words IS DISTINCT FROM s.words
+    UNION
+    SELECT user_id FROM ({_ACTUAL_WEEKS.format(users=_BATCH)}) a
+    FULL JOIN (SELECT * FROM word_stats_weekly WHERE {_BATCH} AND words <> 0) s USING (user_id, week)
+    WHERE a.words IS DISTINCT FROM s.words
+"""
+
+
+class WordStats(NamedTuple):
+    total: int
+    parts_of_speech: List[Tuple[str, int]]
+    weeks: List[Tuple[date, int]]
+
+
+# = ИЗМЕНЕНИЕ СЧЕТЧИКОВ (внутри транзакции изменения слова, под блокировкой пользователя) =
+
+async def word_added(conn: asyncpg.Connection, user_id: int, pos: str):
+    await conn.execute(_WORD_DELTA_SQL, user_id, pos, 1, None)
+
+
+async def word_removed(conn: asyncpg.Connection, user_id: int, pos: str, created_at):
+    await conn.execute(_WORD_DELTA_SQL, user_id, pos, -1, created_at)
+
+
+async def pos_changed(conn: asyncpg.Connection, user_id: int, old_pos: str, new_pos: str):
+    if old_pos != new_pos:
+        await conn.execute(_POS_DELTA_SQL, user_id, old_pos, -1)
+        await conn.execute(_POS_DELTA_SQL, user_id, new_pos, 1)
+
+
+# = ЧТЕНИЕ =
+
+async def get_stats(conn: asyncpg.Connection, user_id: int, weeks: int = WEEKS) -> WordStats:
+    parts = [(row['part_of_speech'], row['words']) for row in await conn.fetch(_POS_SQL, user_id)]
+    by_week = [(row['week'], row['words']) for row in await conn.fetch(_WEEKS_SQL, user_id, weeks)]
+    return WordStats(sum(count for _, count in parts), parts, by_week)
+
+
+# = ПЕРЕСЧЕТ =
+
+async def rebuild(conn: asyncpg.Connection, user_ids: Optional[List[int]] = None, timeout: Optional[float] = None):
+    """
+    Пересчитывает счетчики по таблице words: для user_ids (под их блокировками) или для всех
+    Вызывать внутри транзакции; timeout - предел каждого запроса (None - command_timeout соединения)
+    """
+    if user_ids is None:
+        await conn.execute("TRUNCATE word_stats, word_stats_weekly", timeout=timeout)
+        await conn.execute(f"INSERT INTO word_stats {_ACTUAL_POS.format(users='TRUE')}", timeout=timeout)
+        await conn.execute(f"INSERT INTO word_stats_weekly {_ACTUAL_WEEKS.format(users='TRUE')}", timeout=timeout)
+        return
+    # Тот же порядок блокировок у всех сверок - без взаимоблокировок
+    await conn.execute(
+        "SELECT pg_advisory_xact_lock(user_id) FROM unnest($1::bigint[]) AS user_id ORDER BY user_id", user_ids,
+        timeout=timeout
+    )
+    await conn.execute("DELETE FROM word_stats WHERE user_id = ANY($1::bigint[])", user_ids, timeout=timeout)
+    await conn.execute("DELETE FROM word_stats_weekly WHERE user_id = ANY($1::bigint[])", user_ids, timeout=timeout)
+    await conn.execute(f"INSERT INTO word_stats {_ACTUAL_POS.format(users=_BATCH)}", user_ids, timeout=timeout)
+    await conn.execute(f"INSERT INTO word_stats_weekly {_ACTUAL_WEEKS.format(users=_BATCH)}", user_ids, timeout=timeout)
+
+
+class StatsReconciler:
+    """
+    Фоновая сверка счетчиков со словами
+
+    Параметры:
+    - pool: пул основного сервера
+    - users_table: таблица со строками слов пользователей (для перебора пользователей по индексу)
+    - batch_size: пользователей в одной пачке
+    - interval: пауза между полными проходами, секунд
+    - pause: пауза между пачками (снижает нагрузку на базу)
+    - timeout: предел каждого запроса сверки, секунд - свой, а не command_timeout пула
+      (запросы обработчиков ограничены короче, а пересчет большой пачки идет дольше)
+    """
+
+    def __init__(self, pool: Pool, users_table: str = "words", batch_size: int = 500,
+                 interval: float = 3600.0, pause: float = 0.1, timeout: Optional[float] = 600.0):
+        self.pool = pool
+        self.users_table = users_table
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self.timeout = timeout
+        self._task: Optional[asyncio.Task] = None
+
+    async def reconcile_batch(self, after: int) -> Tuple[Optional[int], int]:
+        """
+        Сверяет пользователей с user_id > after (одну пачку)
+        Возвращает (последний user_id пачки или None в конце прохода, число исправленных)
+        """
+        async with self.pool.acquire() as conn:
+            users = [row['user_id'] for row in await conn.fetch(
+                f"SELECT DISTINCT user_id FROM {self.users_table} WHERE user_id > $1 ORDER BY user_id LIMIT $2",
+                after, self.batch_size, timeout=self.timeout
+            )]
+            last = users[-1] if len(users) == self.batch_size else None
+            # Пользователи без слов, у которых остались счетчики - в том же диапазоне
+            users += [row['user_id'] for row in await conn.fetch(
+                """SELECT DISTINCT user_id FROM word_stats
+                WHERE user_id > $1 AND ($2::bigint IS NULL OR user_id <= $2) AND words <> 0""",
+                after, last, timeout=self.timeout
+            )]
+            drifted = [row['user_id'] for row in await conn.fetch(_DRIFT_SQL, sorted(set(users)), timeout=self.timeout)]
+            if drifted:
+                # Расхождение могла показать параллельная запись - пересчет под блокировками все равно верен
+                async with conn.transaction():
+                    await rebuild(conn, drifted, self.timeout)
+                STATS_DRIFT.inc(len(drifted))
+        return last, len(drifted)
+
+    async def reconcile(self) -> int:
+        """Полный проход по всем пользователям, возвращает число исправленных"""
+        after, fixed = 0, 0
+        while True:
+            after, drifted = await self.reconcile_batch(after)
+            fixed += drifted
+            if after is None:
+                return fixed
+            await asyncio.sleep(self.pause)
+
+    async def _run(self):
+        while True:
+            # Первый проход - через interval после запуска (при создании таблиц счетчики уже пересчитаны)
+            await asyncio.sleep(self.interval)
+            try:
+                fixed = await self.reconcile()
+                if fixed:
+                    logging.warning("Word stats drift fixed for %s users", fixed)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Word stats reconciliation failed")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="word-stats-reconciler")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
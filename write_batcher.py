@@ -0,0 +1,177 @@
+"""
+ОТЛОЖЕННАЯ ЗАПИСЬ ПАЧКАМИ (WRITE-BEHIND)
+
+Каждое добавление, правка и удаление слова - отдельная транзакция на отдельном соединении.
+Когда сотни учеников добавляют слова одновременно (занятие), время уходит на фиксацию
+(сброс журнала на диск) и ожидание соединения из пула, а не на сами запросы.
+WriteBatcher собирает изменения в пачки и выполняет каждую пачку одной транзакцией:
+1. Изменение - функция operation(conn) (те же _..._tx из main.py), вызывающий ждет ее результат
+2. Пачка отправляется, когда набралось max_batch изменений или прошло max_delay секунд
+   с первого из них; пока пачка пишется, следующая копится
+3. Каждое изменение - в своей точке сохранения (SAVEPOINT): ошибка одного (дубликат слова)
+   откатывает только его, вызывающий получает свое исключение, остальные фиксируются
+4. Изменения одного пользователя всегда попадают в одного исполнителя (user_id % workers)
+   и выполняются в порядке поступления; внутри пачки они упорядочены по user_id, поэтому
+   блокировки _lock_user берутся в том же порядке, что и в word_stats.rebuild (без взаимных блокировок)
+5. Общие для пользователей строки (лексемы и части речи схемы lexemes) изменение передает в shared,
+   а prepare(conn, rows) создает их для всей пачки заранее, отдельной короткой транзакцией
+   в порядке сортировки: иначе два исполнителя, вставляющие одни и те же лексемы в разном порядке
+   внутри длинных транзакций пачек, ждали бы друг друга (взаимная блокировка)
+Результат приходит вызывающему только после фиксации пачки: кеши и WebApp обновляются как раньше.
+Если не удалась сама пачка (потеря соединения, ошибка фиксации) - ошибку получают все ее изменения.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional, Sequence
+
+from asyncpg.pool import Pool
+
+from metrics import Counter, Histogram
+
+WRITE_BATCH_SIZE = Histogram(
+    "write_batch_size", "Изменений в одной транзакции пачки",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+WRITE_BATCH_DURATION = Histogram("write_batch_duration_seconds", "Время записи пачки (от соединения до фиксации)")
+WRITE_BATCH_FAILURES = Counter("write_batch_failures_total", "Пачки, не зафиксированные целиком")
+
+Operation = Callable[[Any], Awaitable[Any]]
+Prepare = Callable[[Any, List[Any]], Awaitable[Any]]
+
+
+class _OperationFailed(Exception):
+    """Ошибка единственного изменения пачки: откатывает транзакцию, но не считается сбоем пачки"""
+
+
+class _Pending(NamedTuple):
+    user_id: int
+    operation: Operation
+    future: asyncio.Future
+    shared: Sequence[Any] = ()
+
+
+class WriteBatcher:
+    """
+    Очередь изменений перед пулом основного сервера
+
+    Параметры:
+    - pool: пул основного сервера
+    - max_batch: не больше изменений в одной транзакции
+    - max_delay: сколько секунд ждать пополнения пачки после первого изменения
+    - workers: одновременно записываемых пачек (соединений пула)
+    - acquire_timeout: предел ожидания соединения для пачки, секунд (None - без предела)
+    - prepare: создает общие строки shared всех изменений пачки до ее транзакции (None - не нужно)
+    """
+
+    def __init__(self, pool: Pool, max_batch: int = 100, max_delay: float = 0.005, workers: int = 4,
+                 acquire_timeout: Optional[float] = None, prepare: Optional[Prepare] = None):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.workers = workers
+        self.acquire_timeout = acquire_timeout
+        self.prepare = prepare
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+    async def submit(self, user_id: int, operation: Operation, shared: Sequence[Any] = ()) -> Any:
+        """
+        Выполняет operation(conn) в транзакции одной из пачек и возвращает ее результат
+        shared - общие строки, которые operation может создать (передаются в prepare)
+        """
+        if not self._tasks:
+            raise RuntimeError("Write batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queues[user_id % self.workers].put_nowait(_Pending(user_id, operation, future, shared))
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue, first: _Pending) -> List[Optional[_Pending]]:
+        """Пачка, начатая с first: до max_batch изменений за max_delay секунд (None - сигнал остановки)"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            if queue.empty():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(queue.get_nowait())
+            if batch[-1] is None:
+                break
+        return batch
+
+    async def _flush(self, batch: List[_Pending]):
+        """Записывает пачку одной транзакцией и передает результаты вызывающим"""
+        # Стабильная сортировка: порядок изменений одного пользователя сохраняется
+        batch.sort(key=lambda item: item.user_id)
+        results = []
+        started = time.perf_counter()
+        try:
+            async with self.pool.acquire(timeout=self.acquire_timeout) as conn:
+                shared = [row for item in batch for row in item.shared]
+                if self.prepare and shared:
+                    async with conn.transaction():
+                        await self.prepare(conn, shared)
+                async with conn.transaction():
+                    if len(batch) == 1:
+                        # Одно изменение - без точки сохранения
+                        try:
+                            results.append((await batch[0].operation(conn), None))
+                        except Exception as e:
+                            raise _OperationFailed() from e
+                    else:
+                        for item in batch:
+                            try:
+                                async with conn.transaction():
+                                    results.append((await item.operation(conn), None))
+                            except Exception as e:
+                                results.append((None, e))
+        except _OperationFailed as e:
+            results = [(None, e.__cause__)]
+        except Exception as e:
+            WRITE_BATCH_FAILURES.inc()
+            logging.error("Write batch of %s operations failed: %s", len(batch), e)
+            results = [(None, e)] * len(batch)
+        WRITE_BATCH_DURATION.observe(time.perf_counter() - started)
+        WRITE_BATCH_SIZE.observe(len(batch))
+        for item, (result, error) in zip(batch, results):
+            # Вызывающий мог не дождаться (отмена обработчика) - изменение все равно записано
+            if item.future.done():
+                continue
+            if error is None:
+                item.future.set_result(result)
+            else:
+                item.future.set_exception(error)
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            first = await queue.get()
+            if first is None:
+                return
+            batch = await self._collect(queue, first)
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            await self._flush(batch)
+            if stop:
+                return
+
+    def start(self):
+        self._queues = [asyncio.Queue() for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._run(queue), name=f"write-batcher-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+
+    async def stop(self):
+        """Дописывает уже принятые изменения и останавливает исполнителей"""
+        tasks, self._tasks = self._tasks, []
+        for queue in self._queues:
+            queue.put_nowait(None)
+        await asyncio.gather(*tasks, return_exceptions=True)